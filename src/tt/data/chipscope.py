@@ -0,0 +1,117 @@
+import re
+
+import polars as pl
+from polars import Expr, Series
+from polars.datatypes import DataTypeClass
+
+# ChipScope appends bus range to the net name, i.e. `aCore/Gen/foo[15:0]`, or bit index for a single wire
+# taken out of a bus, i.e. `aCore/Gen/bar[3]`
+BUS_RANGE_REGEX = re.compile(r"\[(\d+)(?::(\d+))?]$")
+
+INTEGER_DTYPES: list[tuple[int, DataTypeClass, DataTypeClass]] = [
+    (8, pl.Int8, pl.UInt8),
+    (16, pl.Int16, pl.UInt16),
+    (32, pl.Int32, pl.UInt32),
+    (64, pl.Int64, pl.UInt64),
+]
+
+RADIX_BASE: dict[str, int] = {
+    "HEX": 16,
+    "OCTAL": 8,
+    "BIN": 2,
+    "BINARY": 2,
+}
+
+
+def bit_width(column_name: str) -> int | None:
+    """
+    :return: number of bits in the bus as encoded in the column name or None if name does not carry bus range.
+    """
+    m = BUS_RANGE_REGEX.search(column_name.strip())
+    if m is None:
+        return None
+    elif m.group(2) is None:
+        return 1
+    else:
+        return abs(int(m.group(1)) - int(m.group(2))) + 1
+
+
+def narrowest_dtype(width: int | None, signed: bool) -> DataTypeClass:
+    """
+    :return: smallest polars dtype that can hold any value of a bus of a given width. Single unsigned bit is
+    stored as Boolean. If width is not known, then Int64 is used.
+    """
+    if width is None:
+        return pl.Int64
+    elif width == 1 and not signed:
+        return pl.Boolean
+    else:
+        for bits, signed_dtype, unsigned_dtype in INTEGER_DTYPES:
+            if width <= bits:
+                return signed_dtype if signed else unsigned_dtype
+        return pl.Int64
+
+
+def sign_extend(raw: Expr, width: int) -> Expr:
+    """
+    Reinterprets lowest `width` bits of the integer as two's complement value. Values that are already
+    negative are unchanged, so this is safe to apply to SIGNED columns exported in decimal as well as to HEX,
+    OCTAL or BIN values of signed buses. Done with bitwise ops only, so it stays a single pass over the column.
+    """
+    sign_bit = 1 << (width - 1)
+    return ((raw & ((1 << width) - 1)) ^ sign_bit) - sign_bit
+
+
+def narrow(series: Series, dtype: DataTypeClass) -> Series:
+    """
+    Casts integer series to `dtype` if all of its values fit in it, which is expected of values of a bus of the width
+    `dtype` was chosen for. Otherwise, i.e. if core was changed since the net was named, series is cast to the
+    narrowest integer dtype that is at least as wide as `dtype` and holds all of its values, so that width of the bus
+    only decides how values are stored and never makes them unloadable.
+    """
+    if not (series.dtype.is_integer() or series.dtype == pl.Boolean) or \
+            not (dtype.is_integer() or dtype == pl.Boolean):
+        return series.cast(dtype)
+
+    lo, hi = series.min(), series.max()
+    if lo is None or (dtype == pl.Boolean and 0 <= lo and hi <= 1):
+        return series.cast(dtype)
+
+    min_bits = 1 if dtype == pl.Boolean else next(b for b, sd, ud in INTEGER_DTYPES if dtype in (sd, ud))
+    signed = lo < 0 or dtype.is_signed_integer()
+    for bits, signed_dtype, unsigned_dtype in INTEGER_DTYPES:
+        low, high = (-(1 << (bits - 1)), (1 << (bits - 1)) - 1) if signed else (0, (1 << bits) - 1)
+        if bits >= min_bits and low <= lo and hi <= high:
+            return series.cast(signed_dtype if signed else unsigned_dtype)
+    return series
+
+
+def column_dtype(column_name: str, radix: str | None, signed: bool = False) -> DataTypeClass:
+    """
+    :return: dtype of the column decoded by column_decoder(...), which is the narrowest dtype for the bus. Values
+    are decoded as Int64 and narrowed to it once all of them are known, see narrow(...).
+    """
+    width = bit_width(column_name)
+    if radix is None and not signed:
+        return narrowest_dtype(None if width is None else width + 1, signed = True)
+
+    signed = signed or radix == "SIGNED"
+    if signed and width is not None and width < 64:
+        return narrowest_dtype(width, signed = True)
+    else:
+        return narrowest_dtype(width, signed = signed)
+
+
+def column_decoder(column_name: str, radix: str | None, signed: bool = False) -> Expr:
+    """
+    Expression that parses string column, as found in the csv file, into Int64 column; see column_dtype(...) for
+    the dtype it is stored in. If radix is None, i.e. csv file has no radix row, then values are decimal of unknown
+    sign. Column is decoded as two's complement if its radix is SIGNED or if `signed` is True, which is needed for
+    signed buses displayed as HEX, OCTAL or BIN.
+    """
+    width = bit_width(column_name)
+    raw = pl.col(column_name).str.to_integer(base = RADIX_BASE.get(radix or "", 10))
+    if (signed or radix == "SIGNED") and width is not None and width < 64:
+        return sign_extend(raw, width)
+    else:
+        return raw
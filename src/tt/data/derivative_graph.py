@@ -0,0 +1,190 @@
+import hashlib
+import json
+import weakref
+from collections import OrderedDict
+from typing import Any
+
+import numpy as np
+import polars as pl
+
+
+class DerivativeGraph:
+    """
+    Values of the traces of a project, computed over the graph of derivative traces and their sources. Before a
+    trace is computed, it and all traces it depends on, directly or through other derivative traces, are put in
+    topological order, so that each of them is computed once and before any trace that uses it. Cyclic definitions
+    are reported as errors rather than recursing endlessly.
+
+    Computed values are kept by version and definition key of the trace. Key of a trace is a hash of its own
+    definition, that is function, parameters, scale and offset, of the sampling period of the project, and of the
+    keys of its sources. Thus, when definition,
+    scale or offset of a trace is changed, only keys of that trace and traces downstream of it change, and values of
+    all other traces, such as siblings that depend on the same intermediate trace, are still reused.
+
+    Keys of traces that are not derivative include fingerprints of their values, so keys of derivative traces identify
+    their values across restarts of tt. Values of derivative traces are therefore also written to the TraceStore
+    and read back from there, rather than computed, whenever they are not in memory, see TraceStore.read_derived(...).
+    """
+
+    # upper bound on the total size of computed values kept in memory; least recently used ones are dropped first
+    VALUES_BYTES = 1024 * 1024 * 1024
+
+    # part of every key; to be incremented whenever what keys are made of changes, so that values written to the
+    # TraceStore under keys of earlier releases, which might not identify values correctly, are never read back
+    KEY_VERSION = 2
+
+    def __init__(self, config):
+        from tt.data.trace import TracesConfig
+        self.__config: TracesConfig = config
+        self.__values: OrderedDict[tuple[int, str], tuple[np.ndarray, np.ndarray]] = OrderedDict()
+        self.__values_bytes = 0
+        # x values are the same for all traces of a version that have the same length, so they are shared, and
+        # counted once, see x(...); number of cached values referring to each x array by its id
+        self.__xs: weakref.WeakValueDictionary[tuple[int, int, int, str], np.ndarray] = weakref.WeakValueDictionary()
+        self.__x_refs: dict[int, int] = {}
+
+    def source(self, trace, source_name: str):
+        """
+        :return: source trace of the derivative trace; sources are referred to by name or label.
+        :raise ValueError: if there is no such trace in the version of the derivative trace.
+        """
+        candidates = [
+            t for t in [
+                self.__config.get_trace_by_name(trace.version, source_name),
+                self.__config.get_trace_by_label(trace.version, source_name)
+            ] if t is not None
+        ]
+        if candidates == []:
+            raise ValueError(f"Trace {trace.label} refers to unknown trace {source_name}")
+        return min(candidates, key = lambda t: t.index)
+
+    def order(self, trace) -> list:
+        """
+        :return: the trace and all traces it depends on, each once, in order in which they are to be computed.
+        :raise ValueError: if definition of the trace is cyclic.
+        """
+        ordered = []
+        visiting: set[str] = set()
+        visited: set[str] = set()
+
+        def visit(t, path: list[str]) -> None:
+            if t.name in visited:
+                return
+            if t.name in visiting:
+                raise ValueError(f"Trace {t.label} depends on itself: {' -> '.join(path + [t.label])}")
+            visiting.add(t.name)
+            for source_name in t.derivative_sources:
+                visit(self.source(t, source_name), path + [t.label])
+            visiting.remove(t.name)
+            visited.add(t.name)
+            ordered.append(t)
+
+        visit(trace, [])
+        return ordered
+
+    def keys(self, ordered: list) -> dict[str, str]:
+        """
+        :param ordered: traces in topological order, see order(...)
+        :return: definition key of each trace by name
+        """
+        keys: dict[str, str] = {}
+        # functions, i.e. lowpass filter and fourier transform, take sampling period with its unit from the project
+        dt = f"{self.__config.dt()} {self.__config.dt_unit()}"
+        fingerprints: dict[int, dict[str, tuple[str, ...]] | None] = {}
+        for t in ordered:
+            version_fingerprints = None
+            if not t.is_derivative:
+                if t.version not in fingerprints:
+                    fingerprints[t.version] = self.__config.store.fingerprints(t.version)
+                version_fingerprints = fingerprints[t.version]
+            definition: dict[str, Any] = t.definition()
+            keys[t.name] = hashlib.sha256(json.dumps({
+                "key_version": DerivativeGraph.KEY_VERSION,
+                "name": t.name,
+                # versions stored in segments have no fingerprints; values are kept by version, which identifies them
+                "fingerprint": None if version_fingerprints is None else version_fingerprints.get(t.name),
+                "dt": dt,
+                "t0_index": t.t0_index,
+                "y_scale": t.y_scale,
+                "y_offset": t.y_offset,
+                "function": definition["function"],
+                "params": definition["params"],
+                "sources": [keys[self.source(t, s).name] for s in t.derivative_sources]
+            }, sort_keys = True, default = str).encode()).hexdigest()
+        return keys
+
+    def xy(self, project, trace) -> tuple[np.ndarray, np.ndarray]:
+        """
+        :return: x and y values of the trace, with its scale and offset applied. Arrays are read-only, since they are
+        handed to everyone who asks for the same trace.
+        """
+        ordered = self.order(trace)
+        keys = self.keys(ordered)
+        # values of sources are not needed, and might have been dropped, once values of the trace itself are cached
+        cached = self.__values.get((trace.version, keys[trace.name]))
+        if cached is not None:
+            self.__values.move_to_end((trace.version, keys[trace.name]))
+            return cached
+
+        xy = None
+        for t in ordered:
+            value_key = (t.version, keys[t.name])
+            xy = self.__values.get(value_key)
+            if xy is None:
+                xy = self.__load_or_compute(project, t, keys[t.name])
+                for values in xy:
+                    values.flags.writeable = False
+                self.__cache(value_key, xy)
+            else:
+                self.__values.move_to_end(value_key)
+        assert xy is not None
+        return xy
+
+    def x(self, version: int, length: int, t0_index: int) -> np.ndarray:
+        """
+        :return: read-only time of each of the `length` samples of a trace of the version, shared by all traces that
+        have the same length and index of the sample at t = 0, as long as any of them is in use.
+        """
+        dt = self.__config.dt()
+        x_key = (version, length, t0_index, f"{dt} {self.__config.dt_unit()}")
+        x = self.__xs.get(x_key)
+        if x is None:
+            x = np.arange(-t0_index, length - t0_index, dtype = np.float64)
+            x *= dt
+            x.flags.writeable = False
+            self.__xs[x_key] = x
+        return x
+
+    def __cache(self, value_key: tuple[int, str], xy: tuple[np.ndarray, np.ndarray]) -> None:
+        x, y = xy
+        self.__values[value_key] = xy
+        self.__values_bytes += y.nbytes
+        if self.__x_refs.get(id(x), 0) == 0:
+            self.__values_bytes += x.nbytes
+        self.__x_refs[id(x)] = self.__x_refs.get(id(x), 0) + 1
+
+        # last computed values are kept, even if they alone take more than VALUES_BYTES
+        while self.__values_bytes > DerivativeGraph.VALUES_BYTES and len(self.__values) > 1:
+            _, (evicted_x, evicted_y) = self.__values.popitem(last = False)
+            self.__values_bytes -= evicted_y.nbytes
+            self.__x_refs[id(evicted_x)] -= 1
+            if self.__x_refs[id(evicted_x)] == 0:
+                del self.__x_refs[id(evicted_x)]
+                self.__values_bytes -= evicted_x.nbytes
+
+    def __load_or_compute(self, project, trace, key: str) -> tuple[np.ndarray, np.ndarray]:
+        if not trace.is_derivative:
+            return trace._compute_xy(project)
+
+        store = self.__config.store
+        stored = store.read_derived(trace.version, key)
+        if stored is not None:
+            x, y = stored[0].to_numpy(), stored[1].to_numpy()
+            # x values read back are shared, unless they are not time of samples, as for a fourier transform
+            shared_x = self.x(trace.version, len(x), trace.t0_index)
+            return shared_x if np.array_equal(x, shared_x) else x, y
+
+        # sources of the trace are already computed, so the function finds them in memory
+        xs, ys = trace._compute_xy(project)
+        store.write_derived(trace.version, key, pl.Series("x", xs), pl.Series("y", ys))
+        return xs, ys
@@ -0,0 +1,176 @@
+import ast
+import operator
+import re
+from functools import reduce
+from typing import Any, Callable
+
+import polars as pl
+from polars import Expr
+
+# Trace names that are not valid identifiers, i.e. `aCore/Gen/foo[15:0]`, are quoted with backticks
+QUOTED_NAME_REGEX = re.compile(r"`([^`]+)`")
+PLACEHOLDER_PREFIX = "__trace_"
+# Names that could be taken for placeholders of quoted names
+RESERVED_NAME_REGEX = re.compile(rf"\b{PLACEHOLDER_PREFIX}\w*")
+
+BINARY_OPERATORS: dict[type, Callable[[Expr, Expr], Expr]] = {
+    ast.Add: operator.add,
+    ast.Sub: operator.sub,
+    ast.Mult: operator.mul,
+    ast.Div: operator.truediv,
+    ast.FloorDiv: operator.floordiv,
+    ast.Mod: operator.mod,
+    ast.Pow: operator.pow,
+    ast.BitAnd: operator.and_,
+    ast.BitOr: operator.or_,
+    ast.BitXor: operator.xor,
+}
+
+COMPARISON_OPERATORS: dict[type, Callable[[Expr, Expr], Expr]] = {
+    ast.Eq: operator.eq,
+    ast.NotEq: operator.ne,
+    ast.Lt: operator.lt,
+    ast.LtE: operator.le,
+    ast.Gt: operator.gt,
+    ast.GtE: operator.ge,
+}
+
+FUNCTIONS: dict[str, Callable[[Expr], Expr]] = {
+    "abs": Expr.abs,
+    "sqrt": Expr.sqrt,
+    "exp": Expr.exp,
+    "log": Expr.log,
+    "sin": Expr.sin,
+    "cos": Expr.cos,
+}
+
+
+class TraceExpression:
+    """
+    Arithmetic, bitwise and comparison expression over traces, such as `(a - b) * 0.5 + c >> 3`, written in python
+    syntax. Traces are referred to by name or label; names that are not valid identifiers are quoted with backticks.
+    Only operators, numeric constants and functions in FUNCTIONS are allowed, so expression can not do anything but
+    compute values of a trace.
+
+    Shifts are computed as multiplication and floor division by a power of two, which for signed values is the
+    arithmetic shift, and therefore only shift by a constant is supported.
+    """
+
+    def __init__(self, source: str):
+        self.source = source
+        self.trace_names: list[str] = []
+
+        def quote(m: re.Match) -> str:
+            return self.__placeholder(m.group(1).strip())
+
+        reserved = RESERVED_NAME_REGEX.search(QUOTED_NAME_REGEX.sub(" ", source))
+        if reserved is not None:
+            raise ValueError(f"Name {reserved.group(0)} is reserved; quote it with backticks if it is a trace name")
+
+        try:
+            tree = ast.parse(QUOTED_NAME_REGEX.sub(quote, source).strip(), mode = "eval")
+        except SyntaxError as ex:
+            raise ValueError(f"Invalid expression: {ex.msg}")
+        self.__tree = tree.body
+        self.__validate(self.__tree)
+        if self.trace_names == []:
+            raise ValueError("Expression must refer to at least one trace")
+
+    def __placeholder(self, trace_name: str) -> str:
+        if trace_name not in self.trace_names:
+            self.trace_names.append(trace_name)
+        return f"{PLACEHOLDER_PREFIX}{self.trace_names.index(trace_name)}"
+
+    def __validate(self, node: ast.AST) -> None:
+        """
+        Checks that the expression is made of allowed nodes only and collects names of traces it refers to.
+        """
+        match node:
+            case ast.BinOp(left = left, op = op, right = right):
+                if type(op) not in BINARY_OPERATORS and not isinstance(op, (ast.LShift, ast.RShift)):
+                    raise ValueError(f"Unsupported operator: {type(op).__name__}")
+                if isinstance(op, (ast.LShift, ast.RShift)) and TraceExpression.__shift(right) is None:
+                    raise ValueError("Traces can only be shifted by a non-negative integer constant")
+                self.__validate(left)
+                self.__validate(right)
+            case ast.UnaryOp(operand = operand):
+                self.__validate(operand)
+            case ast.BoolOp(values = values):
+                for value in values:
+                    self.__validate(value)
+            case ast.Compare(left = left, ops = ops, comparators = comparators):
+                for op in ops:
+                    if type(op) not in COMPARISON_OPERATORS:
+                        raise ValueError(f"Unsupported comparison: {type(op).__name__}")
+                for operand in [left] + comparators:
+                    self.__validate(operand)
+            case ast.Call(func = ast.Name(id = function_name), args = [arg], keywords = []):
+                if function_name not in FUNCTIONS:
+                    raise ValueError(f"Unknown function: {function_name}")
+                self.__validate(arg)
+            case ast.Constant(value = value):
+                if isinstance(value, str) or not isinstance(value, (bool, int, float)):
+                    raise ValueError(f"Unsupported constant: {value!r}")
+            case ast.Name(id = name):
+                if not name.startswith(PLACEHOLDER_PREFIX):
+                    self.__placeholder(name)
+            case _:
+                raise ValueError(f"Unsupported expression: {ast.unparse(node)}")
+
+    @staticmethod
+    def __shift(node: ast.AST) -> int | None:
+        match node:
+            case ast.Constant(value = int(value)) if not isinstance(value, bool) and value >= 0:
+                return value
+            case _:
+                return None
+
+    def column_name(self, trace_name: str) -> str:
+        """
+        :return: name of the column the trace is expected in by compile(...)
+        """
+        return f"{PLACEHOLDER_PREFIX}{self.trace_names.index(trace_name)}"
+
+    def compile(self) -> Expr:
+        """
+        :return: polars expression computing values of the expression in a single pass over a frame that has
+        column named column_name(trace_name) for each of the `trace_names`.
+        """
+        return self.__compile(self.__tree)
+
+    def __compile(self, node: ast.AST) -> Any:
+        match node:
+            case ast.BinOp(left = left, op = ast.LShift(), right = right):
+                return self.__compile(left) * (2 ** TraceExpression.__shift(right))
+            case ast.BinOp(left = left, op = ast.RShift(), right = right):
+                return self.__compile(left) // (2 ** TraceExpression.__shift(right))
+            case ast.BinOp(left = left, op = op, right = right):
+                return BINARY_OPERATORS[type(op)](self.__compile(left), self.__compile(right))
+            case ast.UnaryOp(op = ast.USub(), operand = operand):
+                return -self.__compile(operand)
+            case ast.UnaryOp(op = ast.UAdd(), operand = operand):
+                return self.__compile(operand)
+            case ast.UnaryOp(op = ast.Invert(), operand = operand):
+                # two's complement bitwise not
+                return -self.__compile(operand) - 1
+            case ast.UnaryOp(op = ast.Not(), operand = operand):
+                return self.__compile(operand).cast(pl.Boolean).not_()
+            case ast.BoolOp(op = op, values = values):
+                operands = [self.__compile(v).cast(pl.Boolean) for v in values]
+                return reduce(operator.and_ if isinstance(op, ast.And) else operator.or_, operands)
+            case ast.Compare(left = left, ops = ops, comparators = comparators):
+                operands = [self.__compile(operand) for operand in [left] + comparators]
+                return reduce(operator.and_, [
+                    COMPARISON_OPERATORS[type(op)](a, b) for op, a, b in zip(ops, operands, operands[1:])
+                ])
+            case ast.Call(func = ast.Name(id = function_name), args = [arg]):
+                return FUNCTIONS[function_name](self.__compile(arg))
+            case ast.Constant(value = value):
+                return pl.lit(value)
+            case ast.Name(id = name):
+                if name.startswith(PLACEHOLDER_PREFIX):
+                    return pl.col(name)
+                else:
+                    return pl.col(self.column_name(name))
+            case _:
+                raise ValueError(f"Unsupported expression: {ast.unparse(node)}")
@@ -1,11 +1,11 @@
 from abc import abstractmethod
-from functools import reduce
-from operator import mul
 from typing import Any
 
 import numpy as np
+import polars as pl
 from scipy import signal
 
+from tt.data.expression import TraceExpression
 from tt.data.punits import Frequency, Duration, FrequencyUnit
 
 
@@ -16,7 +16,7 @@ class Function:
         self.source_traces = derivative_sources
 
     @abstractmethod
-    def xy(self, trace_version: int) -> tuple[list[float], list[float]]:
+    def xy(self, trace_version: int) -> tuple[np.ndarray, np.ndarray]:
         pass
 
     def to_dict(self) -> dict[str, Any]:
@@ -36,6 +36,22 @@ class Function:
     def params(self) -> dict[str, Any]:
         return {}
 
+    def source_arrays(self, trace_version: int) -> tuple[np.ndarray, list[np.ndarray]]:
+        """
+        :return: x values of the first source trace and y values of each source trace.
+        :raise ValueError: if source traces differ in length, since there is no sample to pair the extra ones with.
+        """
+        from tt.data.trace import Trace
+        traces: list[Trace] = [
+            self.project.traces(version = trace_version, trace_name = trace_name)[0]
+            for trace_name in self.source_traces
+        ]
+        ys = [t.y(self.project) for t in traces]
+        if len({len(y) for y in ys}) > 1:
+            lengths = ", ".join(f"{t.label} has {len(y)}" for t, y in zip(traces, ys))
+            raise ValueError(f"Traces of {self.name()} must have the same number of samples, but {lengths}")
+        return traces[0].x(self.project), ys
+
 
 class Functions:
     @staticmethod
@@ -59,32 +75,29 @@ class Functions:
                     frequency_max = fmax,
                     display_frequency_unit = FrequencyUnit.value_of(params["display_frequency_unit"])
                 )
+            case "expression":
+                return Functions.Expression(project, params["expression"])
             case _:
                 raise ValueError(f"Unknown function [{function_name}]")
 
-    NAMES = ["Add", "Subtract", "Multiply", "Divide", "Lowpass Filter", "Fourier Transform"]
+    NAMES = ["Add", "Subtract", "Multiply", "Divide", "Lowpass Filter", "Fourier Transform", "Expression"]
     CONF_NAMES_2_NAME = {
         "add": "Add",
         "subtract": "Subtract",
         "multiply": "Multiply",
         "divide": "Divide",
         "lowpass_filter": "Lowpass Filter",
-        "fourier_transform": "Fourier Transform"
+        "fourier_transform": "Fourier Transform",
+        "expression": "Expression"
     }
 
     class Add(Function):
         def __init__(self, project, source_traces: list[str]):
             super().__init__(project, source_traces)
 
-        def xy(self, trace_version: int) -> tuple[list[float], list[float]]:
-            from tt.data.trace import Trace
-            traces: list[Trace] = [
-                self.project.traces(version = trace_version, trace_name = trace_name)[0]
-                for trace_name in self.source_traces
-            ]
-            ys: list[list[float]] = [t.y(self.project) for t in traces]
-
-            return traces[0].x(self.project), [sum(z) for z in zip(*ys)]
+        def xy(self, trace_version: int) -> tuple[np.ndarray, np.ndarray]:
+            x, ys = self.source_arrays(trace_version)
+            return x, np.sum(ys, axis = 0)
 
         def name(self) -> str:
             return "add"
@@ -95,10 +108,9 @@ class Functions:
             if len(source_traces) != 2:
                 raise ValueError("Subtract only supports 2 traces")
 
-        def xy(self, trace_version: int) -> tuple[list[float], list[float]]:
-            trace0 = self.project.traces(version = trace_version, trace_name = self.source_traces[0])[0]
-            trace1 = self.project.traces(version = trace_version, trace_name = self.source_traces[1])[0]
-            return trace0.x(self.project), [t[0] - t[1] for t in zip(trace0.y(self.project), trace1.y(self.project))]
+        def xy(self, trace_version: int) -> tuple[np.ndarray, np.ndarray]:
+            x, (y0, y1) = self.source_arrays(trace_version)
+            return x, np.subtract(y0, y1)
 
         def name(self) -> str:
             return "subtract"
@@ -107,15 +119,9 @@ class Functions:
         def __init__(self, project, source_traces: list[str]):
             super().__init__(project, source_traces)
 
-        def xy(self, trace_version: int) -> tuple[list[float], list[float]]:
-            from tt.data.trace import Trace
-            traces: list[Trace] = [
-                self.project.traces(version = trace_version, trace_name = trace_name)[0]
-                for trace_name in self.source_traces
-            ]
-            ys: list[list[float]] = [t.y(self.project) for t in traces]
-
-            return traces[0].x(self.project), [reduce(mul, z) for z in zip(*ys)]
+        def xy(self, trace_version: int) -> tuple[np.ndarray, np.ndarray]:
+            x, ys = self.source_arrays(trace_version)
+            return x, np.prod(ys, axis = 0)
 
         def name(self) -> str:
             return "multiply"
@@ -126,10 +132,13 @@ class Functions:
             if len(source_traces) != 2:
                 raise ValueError("Divide only supports 2 traces")
 
-        def xy(self, trace_version: int) -> tuple[list[float], list[float]]:
-            trace0 = self.project.traces(version = trace_version, trace_name = self.source_traces[0])[0]
-            trace1 = self.project.traces(version = trace_version, trace_name = self.source_traces[1])[0]
-            return trace0.x(self.project), [t[0] / t[1] for t in zip(trace0.y(self.project), trace1.y(self.project))]
+        def xy(self, trace_version: int) -> tuple[np.ndarray, np.ndarray]:
+            """
+            Division by zero yields inf, or NaN for 0 / 0, in that sample only; neither is plotted.
+            """
+            x, (y0, y1) = self.source_arrays(trace_version)
+            with np.errstate(divide = "ignore", invalid = "ignore"):
+                return x, np.divide(y0, y1)
 
         def name(self) -> str:
             return "divide"
@@ -142,7 +151,7 @@ class Functions:
 
             self.cutoff_frequency = cutoff_frequency
 
-        def xy(self, trace_version: int) -> tuple[list[float], list[float]]:
+        def xy(self, trace_version: int) -> tuple[np.ndarray, np.ndarray]:
             dt = Duration.value_of(f"{self.project.implied_dt} {self.project.dt_unit}")
             fs = (1 / dt).as_float("Hz")
             fc = self.cutoff_frequency.as_float("Hz")
@@ -150,7 +159,7 @@ class Functions:
 
             x, y = self.project.traces(version = trace_version, trace_name = self.source_traces[0])[0].xy(self.project)
             b, a = signal.butter(N = 10, Wn = w1, btype = "lowpass", analog = False)
-            return x, list(signal.filtfilt(b, a, y))
+            return x, signal.filtfilt(b, a, y)
 
         def name(self) -> str:
             return "lowpass_filter"
@@ -172,16 +181,13 @@ class Functions:
             self.frequency_max = frequency_max
             self.display_frequency_unit = display_frequency_unit
 
-        def xy(self, trace_version: int) -> tuple[list[float], list[float]]:
-            x, y = self.project.traces(version = trace_version, trace_name = self.source_traces[0])[0].xy(self.project)
-            v = np.fft.fft(y)
-            v_len_one_side = int(len(v) / 2)
-            fft_values = [abs(fv) for fv in v[0:v_len_one_side]]
+        def xy(self, trace_version: int) -> tuple[np.ndarray, np.ndarray]:
+            y = self.project.traces(version = trace_version, trace_name = self.source_traces[0])[0].y(self.project)
+            # spectrum of real signal is symmetric; only its first half, without the constant term, is shown
+            ffv = np.abs(np.fft.rfft(y)[1:len(y) // 2])
             f1 = 1 / (Duration.value_of(f"{self.project.implied_dt} {self.project.dt_unit}") * len(y))
             f1_mhz = f1.as_float(self.display_frequency_unit)
-            ffv = fft_values[1:]
-            ffv_sum = sum(ffv)
-            return [f1_mhz * n for n in range(len(fft_values))][1:], [fv / ffv_sum for fv in fft_values[1:]]
+            return f1_mhz * np.arange(1, len(ffv) + 1, dtype = np.float64), ffv / ffv.sum()
 
         def name(self) -> str:
             return "fourier_transform"
@@ -192,3 +198,60 @@ class Functions:
                 "frequency_max": f"{self.frequency_max}",
                 "display_frequency_unit": f"{self.display_frequency_unit.value}"
             }
+
+    class Expression(Function):
+        """
+        Trace computed from an arithmetic, bitwise or comparison expression over other traces, see TraceExpression.
+        Expression is compiled into a single polars expression and evaluated in one pass over columns of the version,
+        so that it takes one multi-threaded scan no matter how many traces and operators it has.
+        """
+
+        def __init__(self, project, expression: str):
+            self.expression = TraceExpression(expression)
+            super().__init__(project, self.expression.trace_names)
+
+        def xy(self, trace_version: int) -> tuple[np.ndarray, np.ndarray]:
+            """
+            Traces with unit scale and zero offset are used as integers, for bitwise operators. They are widened to
+            Int64, so that arithmetic does not wrap around at the width of the bus and that single bit traces, stored
+            as Boolean, can take part in it; only UInt64 traces, which Int64 can not hold, are used as stored. Other
+            traces, as well as derivative ones, are used with their scale and offset applied, the same way as by
+            other functions. Division by zero yields inf or NaN and so does integer division by zero.
+            """
+            from tt.data.trace import Trace
+            columns: list[pl.Series] = []
+            x: np.ndarray | None = None
+            for trace_name in self.source_traces:
+                traces: list[Trace] = self.project.traces(version = trace_version, trace_name = trace_name)
+                if traces == []:
+                    raise ValueError(f"Expression refers to unknown trace {trace_name}")
+                trace = traces[0]
+                column_name = self.expression.column_name(trace_name)
+                if not trace.is_derivative and trace.y_scale == 1.0 and trace.y_offset == 0.0:
+                    column = self.project.store.column(trace.version, trace.name).alias(column_name)
+                    if column.dtype == pl.Boolean or (column.dtype.is_integer() and column.dtype != pl.UInt64):
+                        column = column.cast(pl.Int64)
+                else:
+                    column = pl.Series(column_name, trace.y(self.project))
+                if columns != [] and len(column) != len(columns[0]):
+                    raise ValueError(
+                        f"Traces of expression must have the same number of samples, but {self.source_traces[0]} "
+                        f"has {len(columns[0])} and {trace_name} has {len(column)}"
+                    )
+                if x is None:
+                    x = trace.x(self.project)
+                columns.append(column)
+
+            try:
+                y = pl.DataFrame(columns).select(
+                    self.expression.compile().cast(pl.Float64).fill_null(float("nan"))
+                ).to_series()
+            except pl.exceptions.PolarsError as ex:
+                raise ValueError(f"Unable to evaluate expression {self.expression.source}: {ex}")
+            return x, y.to_numpy()
+
+        def name(self) -> str:
+            return "expression"
+
+        def params(self) -> dict[str, Any]:
+            return {"expression": self.expression.source}
@@ -0,0 +1,233 @@
+import json
+import sqlite3
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Iterator
+
+SCHEMA_VERSION = 1
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS traces (
+    position INTEGER PRIMARY KEY,
+    name TEXT NOT NULL,
+    config TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS notes (
+    version INTEGER NOT NULL,
+    name TEXT NOT NULL,
+    note TEXT NOT NULL,
+    PRIMARY KEY (version, name)
+);
+CREATE TABLE IF NOT EXISTS views (
+    position INTEGER PRIMARY KEY,
+    name TEXT NOT NULL UNIQUE,
+    spec TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS versions (
+    version INTEGER PRIMARY KEY,
+    t0_index INTEGER NOT NULL,
+    trigger_indices TEXT NOT NULL
+);
+"""
+
+
+class MetadataDB:
+    """
+    SQLite database holding metadata of a project that changes while it is in use: traces config, notes of traces in
+    each version, views and trigger of each version. Every lookup and change is a single indexed row operation rather
+    than a rewrite of a json file.
+
+    Database is in WAL mode, so several tt instances can have the same project opened: readers are never blocked and
+    each change is a transaction. Traces config carries a revision number, bumped on every change, by which an
+    instance tells that another one changed it.
+    """
+
+    FILE_NAME = "metadata.sqlite"
+
+    # how long to wait for a lock held by another instance before giving up, in seconds
+    BUSY_TIMEOUT = 10
+
+    def __init__(self, data_dir: Path):
+        self.file = data_dir / MetadataDB.FILE_NAME
+        # connection is shared with the thread that loads traces in background; access is serialized by the lock
+        self.__lock = threading.RLock()
+        self.__connection = sqlite3.connect(
+            self.file, timeout = MetadataDB.BUSY_TIMEOUT, isolation_level = None, check_same_thread = False
+        )
+        self.__connection.execute("PRAGMA journal_mode=WAL")
+        self.__connection.execute("PRAGMA synchronous=NORMAL")
+        self.__connection.executescript(SCHEMA)
+        with self.transaction() as db:
+            db.execute(
+                "INSERT OR IGNORE INTO meta (key, value) VALUES ('schema_version', ?), ('traces_revision', '0')",
+                (str(SCHEMA_VERSION),)
+            )
+
+    @staticmethod
+    def exists(data_dir: Path) -> bool:
+        return (data_dir / MetadataDB.FILE_NAME).exists()
+
+    def close(self) -> None:
+        with self.__lock:
+            self.__connection.close()
+
+    @contextmanager
+    def transaction(self) -> Iterator[sqlite3.Connection]:
+        """
+        Statements executed within are committed at once or not at all. Write lock is taken upfront, so that
+        concurrent writers wait for each other rather than fail midway.
+        """
+        with self.__lock:
+            self.__connection.execute("BEGIN IMMEDIATE")
+            try:
+                yield self.__connection
+            except BaseException:
+                self.__connection.execute("ROLLBACK")
+                raise
+            self.__connection.execute("COMMIT")
+
+    def __query(self, sql: str, params: tuple = ()) -> list[tuple]:
+        with self.__lock:
+            return self.__connection.execute(sql, params).fetchall()
+
+    # traces config
+
+    def traces_revision(self) -> int:
+        return int(self.__query("SELECT value FROM meta WHERE key = 'traces_revision'")[0][0])
+
+    @staticmethod
+    def __bump_traces_revision(db: sqlite3.Connection) -> int:
+        db.execute("UPDATE meta SET value = CAST(value AS INTEGER) + 1 WHERE key = 'traces_revision'")
+        return int(db.execute("SELECT value FROM meta WHERE key = 'traces_revision'").fetchone()[0])
+
+    def has_traces(self) -> bool:
+        return self.__query("SELECT EXISTS (SELECT 1 FROM traces)")[0][0] == 1
+
+    def traces(self) -> tuple[int, list[dict[str, Any]]]:
+        """
+        :return: revision of traces config and config of each trace, in order.
+        """
+        with self.transaction() as db:
+            revision = int(db.execute("SELECT value FROM meta WHERE key = 'traces_revision'").fetchone()[0])
+            rows = db.execute("SELECT config FROM traces ORDER BY position").fetchall()
+        return revision, [json.loads(config) for config, in rows]
+
+    def update_traces(self, entries: dict[int, dict[str, Any]]) -> int:
+        """
+        Replaces config of the traces at given positions.
+        :return: new revision of traces config
+        """
+        with self.transaction() as db:
+            db.executemany(
+                "UPDATE traces SET name = ?, config = ? WHERE position = ?",
+                [(cfg["name"], json.dumps(cfg), position) for position, cfg in entries.items()]
+            )
+            return MetadataDB.__bump_traces_revision(db)
+
+    def replace_traces(self, entries: list[dict[str, Any]]) -> int:
+        """
+        Replaces config of all traces, which is needed when traces are added or removed.
+        :return: new revision of traces config
+        """
+        with self.transaction() as db:
+            db.execute("DELETE FROM traces")
+            db.executemany(
+                "INSERT INTO traces (position, name, config) VALUES (?, ?, ?)",
+                [(position, cfg["name"], json.dumps(cfg)) for position, cfg in enumerate(entries)]
+            )
+            return MetadataDB.__bump_traces_revision(db)
+
+    # notes
+
+    def note(self, version: int, name: str) -> str:
+        rows = self.__query("SELECT note FROM notes WHERE version = ? AND name = ?", (version, name))
+        return "" if rows == [] else rows[0][0]
+
+    def set_note(self, version: int, name: str, note: str) -> None:
+        with self.transaction() as db:
+            db.execute(
+                "INSERT INTO notes (version, name, note) VALUES (?, ?, ?) "
+                "ON CONFLICT (version, name) DO UPDATE SET note = excluded.note",
+                (version, name, note)
+            )
+
+    def notes(self, version: int) -> dict[str, str]:
+        return dict(self.__query("SELECT name, note FROM notes WHERE version = ?", (version,)))
+
+    # views
+
+    def views(self) -> list[dict[str, Any]]:
+        return [json.loads(spec) for spec, in self.__query("SELECT spec FROM views ORDER BY position")]
+
+    def replace_views(self, specs: list[dict[str, Any]]) -> None:
+        with self.transaction() as db:
+            db.execute("DELETE FROM views")
+            db.executemany(
+                "INSERT INTO views (position, name, spec) VALUES (?, ?, ?)",
+                [(position, spec["name"], json.dumps(spec)) for position, spec in enumerate(specs)]
+            )
+
+    # versions
+
+    def version_trigger(self, version: int) -> tuple[int, list[int]] | None:
+        """
+        :return: t0 index and trigger indices of the version or None if version is not recorded here.
+        """
+        rows = self.__query("SELECT t0_index, trigger_indices FROM versions WHERE version = ?", (version,))
+        return None if rows == [] else (rows[0][0], json.loads(rows[0][1]))
+
+    def record_version(self, version: int, t0_index: int, trigger_indices: list[int], columns: list[str]) -> None:
+        """
+        Records trigger of the new version. Notes are carried over from the previous version; traces that are new in
+        this version start with an empty note.
+        """
+        with self.transaction() as db:
+            db.execute(
+                "INSERT OR REPLACE INTO versions (version, t0_index, trigger_indices) VALUES (?, ?, ?)",
+                (version, t0_index, json.dumps(trigger_indices))
+            )
+            db.execute(
+                "INSERT OR REPLACE INTO notes (version, name, note) "
+                "SELECT ?, name, note FROM notes WHERE version = ?",
+                (version, version - 1)
+            )
+            db.executemany(
+                "INSERT OR IGNORE INTO notes (version, name, note) VALUES (?, ?, '')",
+                [(version, c) for c in columns]
+            )
+
+    def load(self,
+             traces: list[dict[str, Any]],
+             views: list[dict[str, Any]],
+             notes: dict[int, dict[str, str]],
+             triggers: dict[int, tuple[int, list[int]]]) -> None:
+        """
+        Replaces all metadata at once. Used to migrate metadata of the project from json files.
+        :param notes: notes of traces by version
+        :param triggers: t0 index and trigger indices by version
+        """
+        with self.transaction() as db:
+            for table in ["traces", "views", "notes", "versions"]:
+                db.execute(f"DELETE FROM {table}")
+            db.executemany(
+                "INSERT INTO traces (position, name, config) VALUES (?, ?, ?)",
+                [(position, cfg["name"], json.dumps(cfg)) for position, cfg in enumerate(traces)]
+            )
+            db.executemany(
+                "INSERT INTO views (position, name, spec) VALUES (?, ?, ?)",
+                [(position, spec["name"], json.dumps(spec)) for position, spec in enumerate(views)]
+            )
+            db.executemany(
+                "INSERT INTO notes (version, name, note) VALUES (?, ?, ?)",
+                [(version, name, note) for version, names in notes.items() for name, note in names.items()]
+            )
+            db.executemany(
+                "INSERT INTO versions (version, t0_index, trigger_indices) VALUES (?, ?, ?)",
+                [(version, t0_index, json.dumps(indices)) for version, (t0_index, indices) in triggers.items()]
+            )
+            MetadataDB.__bump_traces_revision(db)
@@ -1,6 +1,7 @@
 from abc import ABC, abstractmethod
 from typing import Any, override
 
+import numpy as np
 from scipy import signal
 from scipy.signal import savgol_filter
 
@@ -17,7 +18,7 @@ class Overlay(ABC):
         }
 
     @abstractmethod
-    def apply(self, dt: Duration, x: list[float], y: list[float]) -> list[float] | None:
+    def apply(self, dt: Duration, x: np.ndarray, y: np.ndarray) -> np.ndarray | None:
         pass
 
 
@@ -26,7 +27,7 @@ class OverlayNone(Overlay):
         super().__init__("None")
 
     @override
-    def apply(self, dt: Duration, x: list[float], y: list[float]) -> list[float] | None:
+    def apply(self, dt: Duration, x: np.ndarray, y: np.ndarray) -> np.ndarray | None:
         return None
 
 
@@ -44,13 +45,13 @@ class OverlayLowpass(Overlay):
         self.frequency = F(cutoff_frequency)
 
     @override
-    def apply(self, dt: Duration, x: list[float], y: list[float]) -> list[float]:
+    def apply(self, dt: Duration, x: np.ndarray, y: np.ndarray) -> np.ndarray:
         fs = (1 / dt).as_float("Hz")
         fc = self.frequency.as_float("Hz")
         w1 = fc / (fs / 2)
 
         b, a = signal.butter(N = 10, Wn = w1, btype = "lowpass", analog = False)
-        return list(signal.filtfilt(b, a, y))
+        return signal.filtfilt(b, a, y)
 
     @staticmethod
     def default() -> "OverlayLowpass":
@@ -86,15 +87,15 @@ class OverlaySavitzkyGolay(Overlay):
         return retval
 
     @override
-    def apply(self, dt: Duration, x: list[float], y: list[float]) -> list[float] | None:
+    def apply(self, dt: Duration, x: np.ndarray, y: np.ndarray) -> np.ndarray | None:
         if self.window_length_percentage is not None:
-            return list(savgol_filter(
+            return savgol_filter(
                 y, window_length = int(len(x) * self.window_length_percentage / 100),
                 polyorder = self.polyorder, mode = "nearest"
-            ))
+            )
         elif self.window_length_points is not None:
-            return list(savgol_filter(
+            return savgol_filter(
                 y, window_length = self.window_length_points, polyorder = self.polyorder, mode = "nearest"
-            ))
+            )
         else:
             return None
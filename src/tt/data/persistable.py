@@ -1,6 +1,38 @@
+import os
+import tempfile
+from pathlib import Path
 from typing import Protocol
 
 
 class Persistable(Protocol):
     def persist(self) -> None:
         ...
+
+
+class NoPersistence:
+    """
+    For objects that are not part of any project and have nothing to persist.
+    """
+
+    def persist(self) -> None:
+        pass
+
+
+def write_text_atomically(file: Path, text: str) -> None:
+    """
+    Writes text into a temporary file next to the target and renames it over the target, so that the file is never
+    seen half-written, even if application crashes while writing it. Each writer has its own temporary file, so that
+    concurrent writers do not overwrite each other's temporary file, and text is flushed to the disk before rename.
+    """
+    tmp = tempfile.NamedTemporaryFile(
+        "w", dir = file.parent, prefix = f".{file.name}.", suffix = ".tmp", delete = False
+    )
+    try:
+        with tmp:
+            tmp.write(text)
+            tmp.flush()
+            os.fsync(tmp.fileno())
+        os.replace(tmp.name, file)
+    except BaseException:
+        Path(tmp.name).unlink(missing_ok = True)
+        raise
@@ -2,32 +2,86 @@
 import json
 import os
 import shutil
+import threading
+from dataclasses import dataclass, asdict
+from datetime import datetime
 from functools import cache
 from pathlib import Path
-from typing import Any
+from typing import Any, Callable
 
 import numpy
+import polars as pl
 
 from tt.data.function import Function
 from tt.data.jsonable import JsonSerializable
+from tt.data.metadata_db import MetadataDB
+from tt.data.persistable import write_text_atomically
+from tt.data.project_registry import ProjectRegistry
 from tt.data.trace import Trace, TracesConfig, TraceState
-from tt.data.trace_source import TraceSource, NullTraceSource, CSVFileTraceSource
+from tt.data.trace_source import TraceSource, NullTraceSource, CSVFileTraceSource, MultiCSVTraceSource, \
+    VCDTraceSource
+from tt.data.trace_store import TraceStore, IngestCancelled
 from tt.data.view import Views
 
 
+@dataclass(frozen = True)
+class RetentionPolicy:
+    """
+    How old versions of traces are kept, see Project.compact(...). The latest `keep_latest` versions stay in the
+    storage format of the project. Older ones are recompressed with zstd and, if `delta_encode` is set, their integer
+    traces are stored as difference from the previous version. If `disk_budget_mb` is set, the oldest versions that are
+    not pinned are pruned, i.e. their traces removed, until the project fits in the budget. If `automatic` is set,
+    compaction runs each time traces are loaded.
+    """
+    keep_latest: int = 10
+    delta_encode: bool = False
+    disk_budget_mb: int | None = None
+    automatic: bool = False
+
+    def __post_init__(self):
+        # the latest and the previous versions are compared all the time, so they are always kept as they are
+        if self.keep_latest < 2:
+            raise ValueError("At least two latest versions must be kept")
+        if self.disk_budget_mb is not None and self.disk_budget_mb <= 0:
+            raise ValueError("Disk budget must be positive")
+
+    def to_dict(self) -> dict[str, Any]:
+        return asdict(self)
+
+    @staticmethod
+    def from_dict(data: dict[str, Any]) -> "RetentionPolicy":
+        return RetentionPolicy(**data)
+
+
 class Project(JsonSerializable):
     """
     Project tracks and records traces from an external source (usually csv file generated by Vivado).
     When external source changes it can record new version; thus keeping all previous versions available.
     """
 
+    METADATA_STORES = ["json", "sqlite"]
+    # traces config written into the first staged version, see __publish_version(...)
+    INITIAL_TRACES_CONFIG_FILE = "traces_config.json"
+
     def __init__(self, *,
                  projects_dir: Path,
                  name: str,
                  implied_dt: float,
                  latest_traces_version: int,
                  description: str,
-                 dt_unit: str):
+                 dt_unit: str,
+                 storage_format: str = "parquet",
+                 metadata_store: str = "json",
+                 retention: RetentionPolicy | None = None,
+                 pinned_versions: list[int] | None = None,
+                 last_ingest: str | None = None):
+        """
+        :param storage_format: format in which traces are stored, see TraceStore.BLOB_FORMATS
+        :param metadata_store: where traces config, notes, views and triggers are kept, see Project.metadata_store
+        :param retention: how old versions are kept, see Project.compact(...)
+        :param pinned_versions: versions that are never pruned
+        :param last_ingest: time, in ISO format, at which the latest version was loaded
+        """
         self.project_dir = projects_dir / name
         self.project_json_file = self.project_dir / "project.json"
 
@@ -35,13 +89,49 @@ class Project(JsonSerializable):
         if not data_dir.exists():
             data_dir.mkdir(parents = True, exist_ok = True)
 
-        self.views = Views.from_json_file(data_dir / "views.json")
+        self.db = MetadataDB(data_dir) if metadata_store == "sqlite" else None
+        self.views = Views.from_json_file(data_dir / "views.json") if self.db is None else Views.from_db(self.db)
+        self.store = TraceStore(data_dir, storage_format)
         self.__name = name
         self.trace_source = NullTraceSource(self)
         self.__implied_dt = implied_dt
         self.__dt_unit = dt_unit
-        self.latest_traces_version = latest_traces_version
+        self.__latest_traces_version = latest_traces_version
         self.__description = description
+        self.__retention = RetentionPolicy() if retention is None else retention
+        self.__pinned_versions: set[int] = set() if pinned_versions is None else set(pinned_versions)
+        self.__last_ingest = last_ingest
+        # entry of the project in the registry, as it was last written there
+        self.__registry_entry: dict[str, Any] | None = None
+        # project is persisted by background workers once they load traces, as well as by GUI thread
+        self.__persist_lock = threading.Lock()
+        self.traces_config = self.__mk_traces_config()
+
+    def __mk_traces_config(self) -> TracesConfig:
+        return TracesConfig(
+            config_file = self.project_dir / "data" / "config.json",
+            latest_traces_version = self.__latest_traces_version,
+            dt = lambda: self.__implied_dt,
+            dt_unit = lambda: self.__dt_unit,
+            store = self.store,
+            db = self.db
+        )
+
+    def __reopen_traces_config(self) -> None:
+        self.traces_config.flush()
+        write_behind = self.traces_config.write_behind
+        self.traces_config = self.__mk_traces_config()
+        self.traces_config.write_behind = write_behind
+
+    @property
+    def latest_traces_version(self) -> int:
+        return self.__latest_traces_version
+
+    @latest_traces_version.setter
+    def latest_traces_version(self, version: int) -> None:
+        with self.traces_config.lock:
+            self.__latest_traces_version = version
+            self.traces_config.latest_traces_version = version
 
     @cache
     def apply_stat_function(self,
@@ -49,18 +139,19 @@ class Project(JsonSerializable):
                             trace_name: str,
                             trace_version: int,
                             cache_id: str) -> float:
+        ys = self.traces(version = trace_version, trace_name = trace_name)[0].y(self)
         match function_name:
+            # missing samples are NaN and are left out, same as they are not plotted
             case "min":
-                return min(self.traces(version = trace_version, trace_name = trace_name)[0].y(self))
+                return float(numpy.nanmin(ys))
             case "max":
-                return max(self.traces(version = trace_version, trace_name = trace_name)[0].y(self))
+                return float(numpy.nanmax(ys))
             case "range":
-                ys = self.traces(version = trace_version, trace_name = trace_name)[0].y(self)
-                return max(ys) - min(ys)
+                return float(numpy.nanmax(ys) - numpy.nanmin(ys))
             case "mean":
-                return float(numpy.mean(self.traces(version = trace_version, trace_name = trace_name)[0].y(self)))
+                return float(numpy.nanmean(ys))
             case "stdev":
-                return float(numpy.std(self.traces(version = trace_version, trace_name = trace_name)[0].y(self)))
+                return float(numpy.nanstd(ys))
             case _:
                 raise RuntimeError(f"Unsupported function name: {function_name}")
 
@@ -68,10 +159,17 @@ class Project(JsonSerializable):
         """
         When changes are made to the project properties this function is called to save it (persist) to the disk.
         """
-        if not self.project_dir.exists():
-            self.project_dir.mkdir(parents = True, exist_ok = True)
+        with self.__persist_lock:
+            if not self.project_dir.exists():
+                self.project_dir.mkdir(parents = True, exist_ok = True)
 
-        self.project_json_file.write_text(self.to_json())
+            data = self.to_dict()
+            write_text_atomically(self.project_json_file, json.dumps(data, indent = 2))
+
+            registry_entry = ProjectRegistry.entry(data)
+            if registry_entry != self.__registry_entry:
+                ProjectRegistry(self.project_dir.parent).update(registry_entry)
+                self.__registry_entry = registry_entry
 
     @property
     def dt_unit(self) -> str:
@@ -102,12 +200,192 @@ class Project(JsonSerializable):
             raise RuntimeError(f"Project named '{name}' already exists!")
         else:
             new_project_dir = self.project_dir.parent / name
+            ProjectRegistry(self.project_dir.parent).remove(self.__name)
+            self.__registry_entry = None
+            self.traces_config.flush()
+            if self.db is not None:
+                # database file can not be moved while it is open on some platforms
+                self.db.close()
             os.rename(self.project_dir, new_project_dir)
             self.project_dir = new_project_dir
             self.__name = name
             self.project_json_file = self.project_dir / "project.json"
+            self.store = TraceStore(self.project_dir / "data", self.store.blob_format)
+            if self.db is not None:
+                self.db = MetadataDB(self.project_dir / "data")
+                self.views = Views.from_db(self.db)
+            self.__reopen_traces_config()
             self.persist()
 
+    @property
+    def storage_format(self) -> str:
+        """
+        Format in which traces are stored. With "ipc" traces are memory mapped rather than decompressed into memory
+        when read, which makes switching between versions faster, at the cost of more disk space. Traces stored
+        before format was changed are converted to it by compact(...).
+        """
+        return self.store.blob_format
+
+    @storage_format.setter
+    def storage_format(self, storage_format: str) -> None:
+        if storage_format not in TraceStore.BLOB_FORMATS:
+            raise ValueError(f"Unsupported storage format: {storage_format}")
+        self.store.blob_format = storage_format
+        self.persist()
+
+    @property
+    def metadata_store(self) -> str:
+        """
+        Where traces config, notes, views and triggers of the project are kept: "json" files or "sqlite" database,
+        see MetadataDB. Database keeps lookups and changes cheap in projects with many traces or versions and lets
+        several tt instances work on the same project at once.
+        """
+        return "json" if self.db is None else "sqlite"
+
+    @metadata_store.setter
+    def metadata_store(self, metadata_store: str) -> None:
+        if metadata_store not in Project.METADATA_STORES:
+            raise ValueError(f"Unsupported metadata store: {metadata_store}")
+        elif metadata_store == self.metadata_store:
+            return
+
+        self.traces_config.flush()
+        data_dir = self.project_dir / "data"
+        match metadata_store:
+            case "sqlite":
+                db = MetadataDB(data_dir)
+                self.__migrate_metadata_to_db(db)
+                self.db = db
+                self.views = Views.from_db(db)
+            case _:
+                self.__migrate_metadata_to_json()
+                self.db.close()
+                self.db = None
+                (data_dir / MetadataDB.FILE_NAME).unlink(missing_ok = True)
+                self.views = Views.from_json_file(data_dir / "views.json")
+        self.__reopen_traces_config()
+        self.persist()
+
+    def __migrate_metadata_to_db(self, db: MetadataDB) -> None:
+        """
+        Moves metadata from json files into the database in a single transaction. Files are left as they are, but are
+        no longer read or updated.
+        """
+        config_file = self.project_dir / "data" / "config.json"
+        notes, triggers = {}, {}
+        for version in range(1, self.latest_traces_version + 1):
+            versioned_config_file = self.store.version_dir(version) / "config.json"
+            if versioned_config_file.exists():
+                notes[version] = {
+                    name: cfg.get("note", "") for name, cfg in json.loads(versioned_config_file.read_text()).items()
+                }
+            triggers[version] = (self.traces_config.t0_index(version), self.traces_config.trigger_indices(version))
+
+        db.load(
+            traces = json.loads(config_file.read_text())["traces"] if config_file.exists() else [],
+            views = self.views.to_list(),
+            notes = notes,
+            triggers = triggers
+        )
+
+    def __migrate_metadata_to_json(self) -> None:
+        """
+        Writes metadata from the database back into json files. Triggers need not be written, since manifest of
+        every version has them as well.
+        """
+        _, traces = self.db.traces()
+        if traces != []:
+            write_text_atomically(self.project_dir / "data" / "config.json", json.dumps({"traces": traces}, indent = 2))
+        write_text_atomically(self.project_dir / "data" / "views.json", json.dumps(self.views.to_list(), indent = 2))
+        for version in range(1, self.latest_traces_version + 1):
+            if self.store.version_dir(version).exists():
+                write_text_atomically(
+                    self.store.version_dir(version) / "config.json",
+                    json.dumps({name: {"note": note} for name, note in self.db.notes(version).items()}, indent = 2)
+                )
+
+    @property
+    def retention(self) -> RetentionPolicy:
+        return self.__retention
+
+    @retention.setter
+    def retention(self, retention: RetentionPolicy) -> None:
+        self.__retention = retention
+        self.persist()
+
+    @property
+    def pinned_versions(self) -> list[int]:
+        """
+        Versions that are never pruned. Versions shown in views are not pruned either, whether pinned or not.
+        """
+        return sorted(self.__pinned_versions)
+
+    @pinned_versions.setter
+    def pinned_versions(self, versions: list[int]) -> None:
+        self.__pinned_versions = set(versions)
+        self.persist()
+
+    def available_versions(self) -> list[int]:
+        """
+        :return: versions that have traces, i.e. were not pruned, in ascending order.
+        """
+        return [v for v in range(1, self.latest_traces_version + 1) if not self.store.is_pruned(v)]
+
+    def compact(self,
+                progress: Callable[[int, str], None] = lambda percent, message: None,
+                cancelled: Callable[[], bool] = lambda: False) -> bool:
+        """
+        Converts traces to the storage format of the project, if it was changed, and applies retention policy of the
+        project to versions older than the latest `keep_latest` ones. Traces that are shared with the latest versions
+        are left as they are. Safe to call from a background thread while the rest of the application reads traces,
+        since files of published versions are only replaced or removed while holding the lock of the store, but not
+        while traces are being loaded.
+
+        :param progress: called with percentage of completed work and description of the current step.
+        :param cancelled: polled while compacting; if it returns True, compaction stops and False is returned.
+        Versions compacted so far stay compacted.
+        """
+        latest_version = self.latest_traces_version
+        first_kept = latest_version - self.retention.keep_latest + 1
+        old_versions = [v for v in range(1, first_kept) if not self.store.is_pruned(v)]
+
+        kept_blobs = set()
+        for version in range(max(first_kept, 1), latest_version + 1):
+            kept_blobs |= self.store.version_blobs(version)
+
+        try:
+            progress(0, "Converting traces")
+            self.store.convert_blobs(lambda fraction: progress(int(20 * fraction), "Converting traces"), cancelled)
+
+            progress(20, "Recompressing old versions")
+            self.store.archive_blobs(
+                old_versions, kept_blobs, self.retention.delta_encode,
+                lambda fraction: progress(20 + int(60 * fraction), "Recompressing old versions"), cancelled
+            )
+
+            if self.retention.disk_budget_mb is not None:
+                progress(80, "Pruning old versions")
+                pinned = self.__pinned_versions | {
+                    latest_version + 1 + v if v < 0 else v for v in self.views.trace_versions()
+                }
+                disk_usage = self.store.disk_usage()
+                for version in old_versions:
+                    if disk_usage <= self.retention.disk_budget_mb * 1024 * 1024:
+                        break
+                    elif cancelled():
+                        raise IngestCancelled()
+                    elif version not in pinned:
+                        # readers see the version either with all of its traces or pruned
+                        with self.store.lock:
+                            blobs = self.store.version_blobs(version)
+                            disk_usage -= self.store.prune_version(version)
+                            disk_usage -= self.store.remove_unreferenced_blobs(blobs, latest_version)
+        except IngestCancelled:
+            return False
+
+        progress(100, "Done")
+        return True
+
     @property
     def implied_dt(self) -> float:
         """
@@ -128,6 +406,11 @@ class Project(JsonSerializable):
             "dir": f"{self.project_dir}",
             "implied_dt": self.__implied_dt,
             "dt_unit": self.dt_unit,
+            "storage_format": self.storage_format,
+            "metadata_store": self.metadata_store,
+            "retention": self.retention.to_dict(),
+            "pinned_versions": self.pinned_versions,
+            "last_ingest": self.__last_ingest,
             "latest_traces_version": self.latest_traces_version,
             "trace_source": self.trace_source.to_dict(),
             "description": self.__description
@@ -140,66 +423,247 @@ class Project(JsonSerializable):
         elif self.trace_source != CSVFileTraceSource(file = file, persistence = self):
             raise RuntimeError("Trace source is already set and loaded. You will need to create a new project.")
 
+    def set_trace_source_from_csv_files(self, files: list[Path]) -> None:
+        """
+        Same as set_trace_source_from_csv_file(...) but for traces split across several csv files.
+        """
+        if len(files) == 1:
+            self.set_trace_source_from_csv_file(files[0])
+        elif self.trace_source.is_null_trace_source() or self.latest_traces_version == 0:
+            self.trace_source = MultiCSVTraceSource(files = files, persistence = self)
+            self.persist()
+        elif self.trace_source != MultiCSVTraceSource(files = files, persistence = self):
+            raise RuntimeError("Trace source is already set and loaded. You will need to create a new project.")
+
+    def set_trace_source_from_vcd_file(self, file: Path, clock: str | None = None) -> None:
+        """
+        :param clock: name of the clock variable to sample on; if None, every timestamp in the file is a sample.
+        """
+        if self.trace_source.is_null_trace_source() or self.latest_traces_version == 0:
+            self.trace_source = VCDTraceSource(file = file, persistence = self, clock = clock)
+            self.persist()
+        elif self.trace_source != VCDTraceSource(file = file, persistence = self):
+            raise RuntimeError("Trace source is already set and loaded. You will need to create a new project.")
+
     def set_trace_source_from_config(self) -> None:
         data = json.loads(self.project_json_file.read_text())
         self.trace_source = TraceSource.from_config(data["trace_source"], self)
         self.persist()
 
-    def load_traces(self) -> tuple[bool, float]:
+    def load_traces(self,
+                    progress: Callable[[int, str], None] = lambda percent, message: None,
+                    cancelled: Callable[[], bool] = lambda: False) -> tuple[bool, str]:
         """
         Loads traces into project persistent store and updates "latest_traces_version". If traces were
         previously loaded and source did not change, then nothing will be loaded and False returned.
-        False is also returned if trace source is NullTraceSource.
+        False is also returned if trace source is NullTraceSource. If content of the source is identical to
+        the one of an earlier version, new version is recorded as a duplicate of it and nothing is parsed.
+
+        New version is prepared in a staging directory and becomes visible, i.e. "latest_traces_version" is
+        advanced, only once all of its files are on the disk. So, it is safe to call this function from a background
+        thread while the rest of the application keeps reading the current version.
+
+        :param progress: called with percentage of completed work and description of the current step.
+        :param cancelled: polled while loading; if it returns True, staged files are discarded and False returned.
         """
         if self.trace_source.is_null_trace_source():
             return False, self.trace_source.change_id()
 
         elif self.latest_traces_version == 0 or self.trace_source.has_changed():
-            df = self.trace_source.load_data()
-            prev_data_dir = self.project_dir / "data" / f"{self.latest_traces_version:05}"
-            self.latest_traces_version += 1  # advance version
-            target_dir = self.project_dir / "data" / f"{self.latest_traces_version:05}"
-            target_dir.mkdir(parents = True, exist_ok = True)
-            df.write_parquet(file = target_dir / "traces.parquet.lz4", compression = "lz4")
+            version = self.latest_traces_version + 1
+            try:
+                self.__stage_version(version, progress, cancelled)
+            except IngestCancelled:
+                self.store.discard_staged(version)
+                return False, self.trace_source.change_id()
+            except Exception:
+                self.store.discard_staged(version)
+                raise
+
+            progress(95, "Publishing new version")
+            self.__publish_version(version)
             self.trace_source.update_signature()
-            if "TRIGGER" in df.columns:
-                res = df.get_column("TRIGGER").to_list()
-
-                def get_tdata():
-                    if len(res) > 2:
-                        try:
-                            float(res[1])
-                            return [a[0] for a in enumerate(res[1:]) if a[1] != 0]
-                        except ValueError:
-                            return [a[0] for a in enumerate(res[2:]) if a[1] != 0]
-                    else:
-                        return []
-
-                trigger_index = get_tdata()
-                t0_index = trigger_index[0] if len(trigger_index) > 0 else 0
-                (target_dir / "trigger.json").write_text(json.dumps({"t0_index": t0_index}))
+            progress(100, "Done")
+            return True, self.trace_source.change_id()
+
+        else:
+            return False, self.trace_source.change_id()
+
+    def __stage_version(self,
+                        version: int,
+                        progress: Callable[[int, str], None],
+                        cancelled: Callable[[], bool]) -> None:
+        def check_cancelled() -> None:
+            if cancelled():
+                raise IngestCancelled()
+
+        prev_version = version - 1
+        progress(0, "Checking trace source")
+        source_id = self.trace_source.change_id(live = True)
+        duplicate_of = self.store.find_version(source_id, prev_version)
+        appended = None
+        if duplicate_of is None and self.__is_append_base(prev_version):
+            appended = self.trace_source.scan_appended_data()
+            if appended is not None and appended.collect_schema().names() != self.store.columns(prev_version):
+                appended = None
+        check_cancelled()
+
+        self.store.stage(version)
+        progress(10, "Reading traces")
+        blobs_progress = lambda fraction: progress(10 + int(70 * fraction), "Storing traces")
+        if duplicate_of is not None:
+            self.store.link_version(version, duplicate_of, source_id)
+        elif appended is None or not self.store.append_version(
+                version, prev_version, appended, self.trace_source.scanned_change_id(), blobs_progress, cancelled
+        ):
+            # unless source only grew, and new rows fit in dtypes of the previous version, it is read in full
+            self.__write_version(version, blobs_progress, cancelled)
+        check_cancelled()
+
+        progress(80, "Summarizing traces")
+        self.__stage_version_metadata(version)
+        check_cancelled()
+
+    def __write_version(self, version: int, progress: Callable[[float], None], cancelled: Callable[[], bool]) -> None:
+        if (columns := self.trace_source.scan_columns(cancelled)) is not None:
+            self.store.write_version_from_columns(
+                version, columns, self.trace_source.scanned_change_id(), progress, cancelled
+            )
+        else:
+            prev_manifest = self.store.manifest(version - 1) if version > 1 else {}
+            if "source_id" in prev_manifest and not self.store.is_pruned(version - 1):
+                # parts of the source that did not change since previous version are taken from it
+                prev_columns = set(self.store.columns(version - 1))
+                lf = self.trace_source.scan_changed_data(
+                    prev_manifest["source_id"],
+                    lambda names: self.store.scan(version - 1, names) if set(names) <= prev_columns else None
+                )
             else:
-                (target_dir / "trigger.json").write_text(json.dumps({"t0_index": 0}))
-            self.persist()
+                lf = self.trace_source.scan_data()
+            self.store.write_version(
+                version, lf, self.trace_source.scanned_change_id(), progress, cancelled,
+                self.trace_source.column_dtypes()
+            )
 
-            # copy notes from prev
-            if prev_data_dir.exists():
-                shutil.copy(prev_data_dir / "config.json", target_dir / "config.json")
+    def __is_append_base(self, version: int) -> bool:
+        """
+        :return: True if samples appended to the trace source can be stored as continuation of the version, that is
+        if the version holds the very content of the trace source that was loaded last time. Source id of the content
+        stored in a version is recorded in its manifest.
+        """
+        if version <= 0 or not self.store.can_append_to(version):
+            return False
+        manifest = self.store.manifest(version)
+        return not manifest.get("imported", False) and manifest.get("source_id") == self.trace_source.change_id()
 
-            data_config_file = self.project_dir / "data" / "config.json"
-            if not data_config_file.exists():
-                data_config_file.write_text(json.dumps({
-                    "traces": [{"name": c, "label": c, "state": "Active"} for c in df.columns]
-                }, indent = 2))
-                versioned_config = {
-                    c: {"note": ""} for c in df.columns
-                }
-                (target_dir / "config.json").write_text(json.dumps(versioned_config, indent = 2))
+    def import_version(self, source_id: str, columns: dict[str, list[str]]) -> int:
+        """
+        Records traces that were already written into blobs, see TraceStore.write_blobs(...), as the new latest
+        version. Used for bulk import of traces that do not come from the trace source of the project.
+        :param source_id: change id of the file traces came from.
+        :return: the new version
+        """
+        version = self.latest_traces_version + 1
+        try:
+            self.store.stage(version)
+            duplicate_of = self.store.find_version(source_id, self.latest_traces_version)
+            if duplicate_of is not None:
+                self.store.link_version(version, duplicate_of, source_id)
+            else:
+                self.store.write_version_from_blobs(version, columns, source_id)
+            # traces of the project source are never appended to traces that came from elsewhere
+            self.store.update_staged_manifest(version, imported = True)
+            self.__stage_version_metadata(version)
+        except Exception:
+            self.store.discard_staged(version)
+            raise
+
+        self.__publish_version(version)
+        return version
+
+    def __stage_version_metadata(self, version: int) -> None:
+        """
+        Records trigger, summaries and notes for the traces of the staged version. Only traces that changed since
+        the previous version, or since the version this one duplicates, are read to be summarized.
+        """
+        target_dir = self.store.version_dir(version, staged = True)
+        columns = self.store.columns(version, staged = True)
+        trigger_indices, t0_index = [], 0
+        if "TRIGGER" in columns:
+            trigger = self.store.column(version, "TRIGGER", staged = True).cast(pl.Boolean).fill_null(False)
+            # samples at which trigger asserts, i.e. start of each run of non-zero values
+            trigger_indices = (trigger & ~trigger.shift(1, fill_value = False)).arg_true().to_list()
+            # t0 is position of the first trigger among samples following the first one, as it always was, so that
+            # time axes of traces in earlier versions do not shift
+            after_first = trigger.slice(1).arg_true()
+            t0_index = after_first[0] if len(trigger) > 2 and len(after_first) > 0 else 0
+
+        staged_manifest = self.store.manifest(version, staged = True)
+        known_summaries = {}
+        for known_version in [version - 1, staged_manifest.get("duplicate_of", 0)]:
+            if known_version > 0:
+                fingerprints = self.store.fingerprints(known_version) or {}
+                for name, summary in self.store.summaries(known_version).items():
+                    if name in fingerprints:
+                        known_summaries[fingerprints[name]] = summary
+        summaries = {}
+        for name in columns:
+            fingerprint = tuple(staged_manifest.get("columns", {}).get(name, []))
+            if fingerprint in known_summaries:
+                summaries[name] = known_summaries[fingerprint]
+            else:
+                summaries[name] = TraceStore.column_summary(self.store.column(version, name, staged = True))
 
-            return True, self.trace_source.change_id()
+        self.store.update_staged_manifest(
+            version, trigger_indices = trigger_indices, t0_index = t0_index, summaries = summaries
+        )
+
+        if self.db is not None:
+            # notes are carried over once version is published, see MetadataDB.record_version(...)
+            return
+
+        # copy notes from prev
+        prev_data_dir = self.store.version_dir(version - 1)
+        if prev_data_dir.exists():
+            shutil.copy(prev_data_dir / "config.json", target_dir / "config.json")
+
+        if not (self.project_dir / "data" / "config.json").exists():
+            versioned_config = {
+                c: {"note": ""} for c in columns
+            }
+            (target_dir / "config.json").write_text(json.dumps(versioned_config, indent = 2))
+            # traces config of the project is published along with its first version, see __publish_version(...)
+            initial_traces = [{"name": c, "label": c, "state": "Active"} for c in columns]
+            (target_dir / Project.INITIAL_TRACES_CONFIG_FILE).write_text(
+                json.dumps({"traces": initial_traces}, indent = 2)
+            )
 
+    def __publish_version(self, version: int) -> None:
+        """
+        Makes the staged version visible. Traces config is in place before "latest_traces_version" is advanced, so
+        that the version is never seen without config of its traces, even if application crashes meanwhile.
+        """
+        self.store.publish(version)
+        columns = self.store.columns(version)
+        if self.db is not None:
+            manifest = self.store.manifest(version)
+            self.db.record_version(version, manifest["t0_index"], manifest["trigger_indices"], columns)
+            if not self.db.has_traces():
+                self.db.replace_traces([{"name": c, "label": c, "state": "Active"} for c in columns])
         else:
-            return False, self.trace_source.change_id()
+            initial_config_file = self.store.version_dir(version) / Project.INITIAL_TRACES_CONFIG_FILE
+            data_config_file = self.project_dir / "data" / "config.json"
+            if initial_config_file.exists():
+                if data_config_file.exists():
+                    initial_config_file.unlink()
+                else:
+                    # staged file was already flushed to the disk by publish(...)
+                    os.replace(initial_config_file, data_config_file)
+                    TraceStore.sync(data_config_file.parent)
+
+        self.latest_traces_version = version
+        self.__last_ingest = datetime.now().isoformat(timespec = "seconds")
+        self.persist()
 
     def traces(self, version: int, state: TraceState | None = None, trace_name: str | None = None) -> list[Trace]:
         """
@@ -208,44 +672,68 @@ class Project(JsonSerializable):
         the latest version, version -2 to the previous one and so on. Argument trace_name refers to
         both name and label.
         """
-        traces = TracesConfig(
-            config_file = self.project_dir / "data" / "config.json",
-            latest_traces_version = self.latest_traces_version,
-            dt = lambda: self.__implied_dt
-        ).get_traces(version)
-        traces = traces if state is None else [t for t in traces if t.state == state]
         if trace_name is None:
-            return traces
+            traces = self.traces_config.get_traces(version)
         else:
-            return [t for t in traces if t.name == trace_name or t.label == trace_name]
+            by_name = self.traces_config.get_trace_by_name(version, trace_name)
+            by_label = self.traces_config.get_trace_by_label(version, trace_name)
+            traces = sorted({t.index: t for t in [by_name, by_label] if t is not None}.values(), key = lambda t: t.index)
+        return traces if state is None else [t for t in traces if t.state == state]
+
+    def changed_traces(self, version_a: int, version_b: int) -> list[str]:
+        """
+        Finds traces that differ between two versions from fingerprints and summaries recorded when versions were
+        loaded, without reading traces themselves. Versions can be negative, same as in traces(...).
+
+        :return: names of traces which values differ between the versions, of traces present in only one of them and
+        of derivative traces computed from any of these. Versions loaded by older releases have no fingerprints;
+        all of their traces are reported as changed.
+        """
+        version_a, version_b = [self.latest_traces_version + 1 + v if v < 0 else v for v in [version_a, version_b]]
+        fingerprints_a = self.store.fingerprints(version_a)
+        fingerprints_b = self.store.fingerprints(version_b)
+        if fingerprints_a is None or fingerprints_b is None:
+            changed = set(self.store.columns(version_a)) | set(self.store.columns(version_b))
+        else:
+            changed = {
+                name for name in fingerprints_a.keys() | fingerprints_b.keys()
+                if fingerprints_a.get(name) != fingerprints_b.get(name)
+            }
+
+        # derivative traces can be computed from other derivative traces, so repeat until nothing is added
+        traces = self.traces_config.get_traces(-1)
+        labels = {t.name: t.label for t in traces}
+        while True:
+            # sources are referred to by name or by label
+            changed_sources = changed | {labels[name] for name in changed if name in labels}
+            newly_changed = {
+                t.name for t in traces
+                if t.is_derivative and t.name not in changed
+                and any(source in changed_sources for source in t.derivative_sources)
+            }
+            if newly_changed == set():
+                return sorted(changed)
+            changed |= newly_changed
+
+    def trace_summary(self, version: int, trace_name: str) -> dict[str, Any] | None:
+        """
+        :return: summary of the trace recorded when version was loaded, see TraceStore.column_summary(...), or None
+        if there is none, i.e. for derivative traces and for versions loaded by older releases.
+        """
+        version = self.latest_traces_version + 1 + version if version < 0 else version
+        return self.store.summaries(version).get(trace_name)
 
     def add_derivative_trace(self, name: str, function: Function) -> None:
-        TracesConfig(
-            config_file = self.project_dir / "data" / "config.json",
-            latest_traces_version = self.latest_traces_version,
-            dt = lambda: self.__implied_dt
-        ).add_trace(name, function)
+        self.traces_config.add_trace(name, function)
 
     def make_derivative_trace(self, name: str, function: Function) -> Trace:
-        return TracesConfig(
-            config_file = self.project_dir / "data" / "config.json",
-            latest_traces_version = self.latest_traces_version,
-            dt = lambda: self.__implied_dt
-        ).mk_trace(name, function)
+        return self.traces_config.mk_trace(name, function)
 
     def update_derivative_trace(self, name: str, function: Function) -> None:
-        TracesConfig(
-            config_file = self.project_dir / "data" / "config.json",
-            latest_traces_version = self.latest_traces_version,
-            dt = lambda: self.__implied_dt
-        ).update_derivative_trace(name, function)
+        self.traces_config.update_derivative_trace(name, function)
 
     def delete_derivative_trace(self, name: str) -> None:
-        TracesConfig(
-            config_file = self.project_dir / "data" / "config.json",
-            latest_traces_version = self.latest_traces_version,
-            dt = lambda: self.__implied_dt
-        ).delete_derivative_trace(name)
+        self.traces_config.delete_derivative_trace(name)
 
 
 class ProjectManager:
@@ -258,12 +746,19 @@ class ProjectManager:
         :param projects_dir: Directory where projects will be located on the disk. This usually will be ~/.tt/projects/
         """
         self.__projects_dir = projects_dir
+        self.__registry = ProjectRegistry(projects_dir)
 
     def list_project_names(self) -> list[str]:
         """
         :return: list of all available project names
         """
-        return [x.parent.name for x in sorted(self.__projects_dir.glob("**/project.json"))]
+        return [e["name"] for e in self.__registry.entries()]
+
+    def list_projects(self) -> list[dict[str, Any]]:
+        """
+        :return: registry entries of all available projects, see ProjectRegistry.entry(...)
+        """
+        return self.__registry.entries()
 
     def open_existing_project(self, project_name: str) -> Project:
         """
@@ -282,6 +777,11 @@ class ProjectManager:
                 latest_traces_version = data["latest_traces_version"],
                 description = data["description"],
                 dt_unit = data.get("dt_unit", "ms"),
+                storage_format = data.get("storage_format", "parquet"),
+                metadata_store = data.get("metadata_store", "json"),
+                retention = RetentionPolicy.from_dict(data["retention"]) if "retention" in data else None,
+                pinned_versions = data.get("pinned_versions", []),
+                last_ingest = data.get("last_ingest")
             )
             project.set_trace_source_from_config()
             return project
@@ -311,3 +811,4 @@ class ProjectManager:
         project_dir = self.__projects_dir / project_name
         if project_dir.exists():
             shutil.rmtree(project_dir)
+        self.__registry.remove(project_name)
@@ -0,0 +1,98 @@
+import json
+import os
+from pathlib import Path
+from typing import Any
+
+from tt.data.persistable import write_text_atomically
+from tt.data.trace_source import TraceSource
+
+
+class ProjectRegistry:
+    """
+    Index of the projects in the projects directory, kept in "registry.json" in that directory. For each project it
+    records name, directory, uri of the trace source, number of versions and time traces were last loaded, so that
+    projects can be listed without reading anything in their directories.
+
+    Entries are updated whenever projects are created, renamed, deleted or loaded with new traces. Projects created
+    by older releases of tt, or copied into the projects directory by hand, are added the first time projects are
+    listed, and projects deleted by hand are dropped.
+    """
+
+    FILE_NAME = "registry.json"
+
+    def __init__(self, projects_dir: Path):
+        self.projects_dir = projects_dir
+        self.registry_file = projects_dir / ProjectRegistry.FILE_NAME
+
+    @staticmethod
+    def entry(data: dict[str, Any]) -> dict[str, Any]:
+        """
+        :param data: content of the project.json file, see Project.to_dict()
+        :return: registry entry of the project
+        """
+        return {
+            "name": data["name"],
+            "dir": data["dir"],
+            "source": TraceSource.uri_of(data["trace_source"]),
+            "versions": data["latest_traces_version"],
+            "last_ingest": data.get("last_ingest")
+        }
+
+    def __read(self) -> dict[str, dict[str, Any]]:
+        try:
+            return {e["name"]: e for e in json.loads(self.registry_file.read_text())["projects"]}
+        except (FileNotFoundError, ValueError, KeyError):
+            # missing or damaged registry is rebuilt from the projects
+            return {}
+
+    def __write(self, entries: dict[str, dict[str, Any]]) -> None:
+        self.projects_dir.mkdir(parents = True, exist_ok = True)
+        write_text_atomically(
+            self.registry_file,
+            json.dumps({"projects": sorted(entries.values(), key = lambda e: e["name"])}, indent = 2)
+        )
+
+    def entries(self) -> list[dict[str, Any]]:
+        """
+        :return: entries of all projects, ordered by name. Only the projects directory itself is listed to find
+        projects the registry does not know of.
+        """
+        if not self.projects_dir.exists():
+            return []
+
+        entries = self.__read()
+        with os.scandir(self.projects_dir) as it:
+            project_dirs = {e.name for e in it if e.is_dir()}
+
+        changed = False
+        for name in list(entries):
+            if name not in project_dirs:
+                del entries[name]
+                changed = True
+        for name in project_dirs - entries.keys():
+            project_json_file = self.projects_dir / name / "project.json"
+            if project_json_file.exists():
+                try:
+                    entry = ProjectRegistry.entry(json.loads(project_json_file.read_text()))
+                    # directory is what project is opened by, even if project.json says otherwise
+                    entries[name] = entry | {"name": name, "dir": f"{self.projects_dir / name}"}
+                    changed = True
+                except Exception:
+                    # not a valid project; it can not be opened anyway
+                    pass
+
+        if changed:
+            self.__write(entries)
+        return sorted(entries.values(), key = lambda e: e["name"])
+
+    def update(self, entry: dict[str, Any]) -> None:
+        entries = self.__read()
+        if entries.get(entry["name"]) != entry:
+            entries[entry["name"]] = entry
+            self.__write(entries)
+
+    def remove(self, name: str) -> None:
+        entries = self.__read()
+        if name in entries:
+            del entries[name]
+            self.__write(entries)
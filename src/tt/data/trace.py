@@ -1,18 +1,24 @@
 import json
+import threading
+from contextlib import contextmanager
 from enum import StrEnum
-from functools import cache, lru_cache
 from pathlib import Path
-from typing import Any, Callable, Optional
+from typing import Any, Callable, Iterator, Optional
 
-import polars
+import numpy as np
+import polars as pl
 from PySide6.QtCore import QRect
 from polars import DataFrame
 from pytide6 import MainWindow
 
+from tt.data.derivative_graph import DerivativeGraph
 from tt.data.domain_type import DomainType
 from tt.data.function import Function, Functions
 from tt.data.jsonable import JsonSerializable
+from tt.data.metadata_db import MetadataDB
 from tt.data.overlays import Overlay, OverlayNone, OverlaySavitzkyGolay, OverlayLowpass
+from tt.data.persistable import write_text_atomically
+from tt.data.trace_store import TraceStore
 from tt.gui.trace.figure import PlotFigure
 
 
@@ -52,47 +58,228 @@ class TraceConfig:
 
 
 class TracesConfig(JsonSerializable):
-    def __init__(self, config_file: Path, latest_traces_version: int, dt: Callable[[], float]):
+    """
+    Catalog of the traces of a project. It is meant to live as long as the project is opened. Config file is parsed
+    once, and again only if it was changed by something other than this catalog. Trace objects are created once per
+    version and indexed by name and label, so the same Trace is handed back on every lookup.
+
+    Changes are kept in memory and written to the config file by flush(). Unless `write_behind` is set, flush()
+    follows every change, or every batch() of changes. Otherwise, `write_behind` is called with flush, so that it
+    can be deferred and many changes coalesced into a single write.
+
+    If project keeps its metadata in MetadataDB, traces config is kept there instead of the config file and flush()
+    updates only the rows of the traces that were changed.
+
+    Values of traces are computed and memoized by the DerivativeGraph of the catalog, see `derivatives`.
+    """
+
+    def __init__(self,
+                 config_file: Path,
+                 latest_traces_version: int,
+                 dt: Callable[[], float],
+                 dt_unit: Callable[[], str],
+                 store: TraceStore | None = None,
+                 db: MetadataDB | None = None):
         self.config_file = config_file
+        self.db = db
         self.latest_traces_version = latest_traces_version
         self.traces: list[Trace] = []
         self.dt = dt
+        self.dt_unit = dt_unit
+        self.store = TraceStore(config_file.parent) if store is None else store
+        # latest_traces_version is advanced by background workers loading traces while GUI thread looks traces up
+        self.lock = threading.RLock()
+
+        # incremented on every change to the traces config; values derived from traces are cached against it
+        self.generation = 0
+        # modification time and size of the config file or revision of traces config in db, as last read or written
+        self.__source_stamp: tuple[int, int] | int | None = None
+        self.__entries: list[dict[str, Any]] = []
+        self.__versions: dict[int, list[Trace]] = {}
+        self.__by_name: dict[int, dict[str, Trace]] = {}
+        self.__by_label: dict[int, dict[str, Trace]] = {}
+
+        self.write_behind: Callable[[Callable[[], None]], None] | None = None
+        self.__dirty = False
+        # positions of traces changed since the last flush; None if traces were added or removed
+        self.__dirty_positions: set[int] | None = set()
+        self.__batch_depth = 0
+        # index of the sample at t = 0 by version, see t0_index(...)
+        self.__t0_indices: dict[int, int] = {}
+
+        # values of traces outlive Trace objects, which are created anew whenever traces config changes
+        self.derivatives = DerivativeGraph(self)
 
-    @cache
     def df(self, version: int) -> DataFrame:
-        return polars.read_parquet(self.config_file.parent / f"{version:05}" / "traces.parquet.lz4")
+        return self.store.read(version)
+
+    def t0_index(self, version: int) -> int:
+        """
+        :return: index of the sample that is at t = 0. It is found when version is loaded and recorded in its
+        manifest. Versions loaded by older releases have it in "trigger.json" instead. Only indices of published
+        versions are kept, until config is flushed or re-read.
+        """
+        with self.lock:
+            if version in self.__t0_indices:
+                return self.__t0_indices[version]
+
+            t0_index = self.__read_t0_index(version)
+            if 0 < version <= self.latest_traces_version:
+                self.__t0_indices[version] = t0_index
+            return t0_index
+
+    def __read_t0_index(self, version: int) -> int:
+        if self.db is not None and (trigger := self.db.version_trigger(version)) is not None:
+            return trigger[0]
+
+        manifest = self.store.manifest(version)
+        if "t0_index" in manifest:
+            return manifest["t0_index"]
+
+        trigger_json_file = self.store.version_dir(version) / "trigger.json"
+        if trigger_json_file.exists():
+            return json.loads(trigger_json_file.read_text())["t0_index"]
+        else:
+            return 0
+
+    def trigger_indices(self, version: int) -> list[int]:
+        """
+        :return: indices of all samples at which trigger asserts; empty if not known.
+        """
+        if self.db is not None and (trigger := self.db.version_trigger(version)) is not None:
+            return trigger[1]
+        return self.store.manifest(version).get("trigger_indices", [])
 
     def to_dict(self) -> dict[str, Any]:
         return {"traces": [t.to_dict() for t in self.traces]}
 
     def persist(self) -> None:
-        self.config_file.write_text(self.to_json())
+        if self.db is None:
+            write_text_atomically(self.config_file, self.to_json())
+        else:
+            self.__source_stamp = self.db.replace_traces(self.to_dict()["traces"])
+
+    @contextmanager
+    def batch(self) -> Iterator[None]:
+        """
+        Changes made to traces within the batch are written to the config file at once, when the batch ends.
+        """
+        self.__batch_depth += 1
+        try:
+            yield
+        finally:
+            self.__batch_depth -= 1
+            if self.__batch_depth == 0 and self.__dirty:
+                self.flush()
+
+    def flush(self) -> None:
+        """
+        Writes pending changes, if any, to the config file. Nothing is written if project was deleted meanwhile.
+        """
+        with self.lock:
+            self.__t0_indices.clear()
+            if self.__dirty and self.config_file.parent.exists():
+                if self.db is None:
+                    write_text_atomically(self.config_file, json.dumps({"traces": self.__entries}, indent = 2))
+                elif self.__dirty_positions is None:
+                    self.db.replace_traces(self.__entries)
+                else:
+                    self.db.update_traces({p: self.__entries[p] for p in self.__dirty_positions})
+                self.__source_stamp = self.__stamp()
+                self.__dirty = False
+                self.__dirty_positions = set()
+
+    def __stamp(self) -> tuple[int, int] | int | None:
+        if self.db is not None:
+            return self.db.traces_revision()
+        try:
+            stat = self.config_file.stat()
+            return stat.st_mtime_ns, stat.st_size
+        except FileNotFoundError:
+            return None
+
+    def __refresh(self) -> None:
+        """
+        Re-reads traces config if it was changed since it was last read or written here.
+        """
+        if self.__dirty:
+            # changes not yet written take precedence
+            return
+
+        stamp = self.__stamp()
+        if stamp != self.__source_stamp:
+            if self.db is not None:
+                stamp, self.__entries = self.db.traces()
+            else:
+                self.__entries = [] if stamp is None else json.loads(self.config_file.read_text())["traces"]
+            self.__source_stamp = stamp
+            self.__invalidate()
+
+    def __invalidate(self) -> None:
+        self.__t0_indices.clear()
+        self.__versions.clear()
+        self.__by_name.clear()
+        self.__by_label.clear()
+        self.generation += 1
+
+    def __index(self, version: int) -> None:
+        self.__by_name[version] = {}
+        self.__by_label[version] = {}
+        for t in self.__versions[version]:
+            self.__by_name[version].setdefault(t.name, t)
+            self.__by_label[version].setdefault(t.label, t)
+
+    def __write(self, traces: list["Trace"], structure_changed: bool, position: int | None = None) -> None:
+        """
+        :param structure_changed: True if traces were added, removed or their functions were changed, in which case
+        Trace objects are created anew on the next lookup.
+        :param position: position of the only trace that was changed, if that is the case.
+        """
+        with self.lock:
+            self.__entries = [t.to_dict() for t in traces]
+            self.__dirty = True
+            if position is None or self.__dirty_positions is None:
+                self.__dirty_positions = None
+            else:
+                self.__dirty_positions.add(position)
+
+            if structure_changed:
+                self.__invalidate()
+            else:
+                for version in self.__versions:
+                    self.__index(version)
+                self.generation += 1
+
+            if self.__batch_depth == 0:
+                if self.write_behind is None:
+                    self.flush()
+                else:
+                    self.write_behind(self.flush)
 
     def save(self, trace: "Trace") -> None:
         traces = self.get_traces(-1)
-        t = traces[trace.index]
-        t._label = trace.label
-        t._state = trace.state
-        t.show_legend = trace.show_legend
-        t.legend_location = trace.legend_location
-        t.x_label = trace.x_label
-        t.y_label = trace.y_label
-        t.title = trace.title
-        t.show_grid = trace.show_grid
-        t.y_scale = trace.y_scale
-        t.y_offset = trace.y_offset
-        t.overlay = trace.overlay
-        t.stat_functions = trace.stat_functions.copy()
-
-        self.config_file.write_text(json.dumps({
-            "traces": [t.to_dict() for t in traces]
-        }, indent = 2))
+        # the same trace in every version that was looked up so far shares the settings
+        for version_traces in [traces] + [vt for v, vt in self.__versions.items() if v != self.latest_traces_version]:
+            t = version_traces[trace.index]
+            if t is not trace:
+                t._label = trace.label
+                t._state = trace.state
+                t.show_legend = trace.show_legend
+                t.legend_location = trace.legend_location
+                t.x_label = trace.x_label
+                t.y_label = trace.y_label
+                t.title = trace.title
+                t.show_grid = trace.show_grid
+                t.y_scale = trace.y_scale
+                t.y_offset = trace.y_offset
+                t.overlay = trace.overlay
+                t.stat_functions = trace.stat_functions.copy()
+
+        self.__write(traces, structure_changed = False, position = trace.index)
 
     def delete_derivative_trace(self, name: str) -> None:
         traces = [t for t in self.get_traces(-1) if not t.is_derivative or t.name != name]
-        self.config_file.write_text(json.dumps({
-            "traces": [t.to_dict() for t in traces]
-        }, indent = 2))
+        self.__write(traces, structure_changed = True)
 
     def mk_trace(self, name: str, function: Function) -> "Trace":
         derivative_function = function.name()
@@ -119,12 +306,9 @@ class TracesConfig(JsonSerializable):
             raise RuntimeError(f"Trace [{name}] already exists")
 
         new_trace = self.mk_trace(name, function)
-        new_trace.index = len(self.traces)
+        new_trace.index = len(traces)
         traces.append(new_trace)
-
-        self.config_file.write_text(json.dumps({
-            "traces": [t.to_dict() for t in traces]
-        }, indent = 2))
+        self.__write(traces, structure_changed = True)
 
     def update_derivative_trace(self, name: str, function: Function) -> None:
         traces = self.get_traces(-1)
@@ -133,30 +317,40 @@ class TracesConfig(JsonSerializable):
                 t.set_function(function)
                 break
 
-        self.config_file.write_text(json.dumps({
-            "traces": [t.to_dict() for t in traces]
-        }, indent = 2))
-
-    def get_traces(self, version: int) -> list["Trace"]:
-        if version == 0:
-            return []
+        self.__write(traces, structure_changed = True)
 
+    def __version_traces(self, version: int) -> int | None:
+        """
+        Makes sure traces of the version are in the catalog.
+        :return: version number with negative version resolved or None if there is no such version.
+        """
         version = (self.latest_traces_version + 1 + version) if version < 0 else version
-        if version > self.latest_traces_version or version == 0:
-            return []
-        tr_config = json.loads(self.config_file.read_text())
-        traces = []
-        for tr in enumerate(tr_config["traces"]):
-            traces.append(Trace(version = version, config = self, tcf = TraceConfig(tr[1]), index = tr[0]))
-        return traces
+        if version > self.latest_traces_version or version <= 0:
+            return None
+
+        self.__refresh()
+        if version not in self.__versions:
+            self.__versions[version] = [
+                Trace(version = version, config = self, tcf = TraceConfig(cfg), index = i)
+                for i, cfg in enumerate(self.__entries)
+            ]
+            self.__index(version)
+        return version
+
+    def get_traces(self, version: int) -> list["Trace"]:
+        with self.lock:
+            version = self.__version_traces(version)
+            return [] if version is None else list(self.__versions[version])
 
     def get_trace_by_name(self, version: int, name: str) -> Optional["Trace"]:
-        trs = [tr for tr in self.get_traces(version) if tr.name == name]
-        return None if trs == [] else trs[0]
+        with self.lock:
+            version = self.__version_traces(version)
+            return None if version is None else self.__by_name[version].get(name)
 
     def get_trace_by_label(self, version: int, label: str) -> Optional["Trace"]:
-        trs = [tr for tr in self.get_traces(version) if tr.label == label]
-        return None if trs == [] else trs[0]
+        with self.lock:
+            version = self.__version_traces(version)
+            return None if version is None else self.__by_label[version].get(label)
 
 
 class Trace(JsonSerializable):
@@ -186,11 +380,7 @@ class Trace(JsonSerializable):
         self.version = version
         self.__config = config
         self.__versioned_config_file = self.__config.config_file.parent / f"{self.version:05}" / "config.json"
-        trigger_json_file = self.__config.config_file.parent / f"{self.version:05}" / "trigger.json"
-        if trigger_json_file.exists():
-            self.t0_index: int = json.loads(trigger_json_file.read_text())["t0_index"]
-        else:
-            self.t0_index: int = 0
+        self.t0_index: int = self.__config.t0_index(self.version)
 
         self.__derivative = tcf.get_value("derivative", False)
         self.__derivative_sources = tcf.get_value("derivative_sources", [])
@@ -198,6 +388,10 @@ class Trace(JsonSerializable):
         self.__derivative_params = tcf.get_value("derivative_params", {})
 
     def get_version(self, version: int) -> "Trace":
+        if self.index >= 0:
+            traces = self.__config.get_traces(version)
+            if self.index < len(traces) and traces[self.index].name == self.name:
+                return traces[self.index]
         return Trace(version, self.__config, self.tcf, self.index)
 
     @property
@@ -288,6 +482,19 @@ class Trace(JsonSerializable):
     def is_derivative(self) -> bool:
         return self.__derivative
 
+    @property
+    def derivative_sources(self) -> list[str]:
+        """
+        Names of traces this derivative trace is computed from; empty for traces that are not derivative.
+        """
+        return self.__derivative_sources
+
+    def definition(self) -> dict[str, Any]:
+        """
+        :return: function and parameters this trace is computed with; both are empty for traces that are not derivative.
+        """
+        return {"function": self.__derivative_func, "params": self.__derivative_params}
+
     def get_function(self, project) -> Function:
         return Functions.value_of(
             project, self.__derivative_func, self.__derivative_sources, self.__derivative_params
@@ -323,42 +530,55 @@ class Trace(JsonSerializable):
 
     @property
     def note(self) -> str:
+        if self.__config.db is not None:
+            return self.__config.db.note(self.version, self.__name)
         return json.loads(self.__versioned_config_file.read_text())[self.__name]["note"]
 
     @note.setter
     def note(self, note: str) -> None:
-        data = json.loads(self.__versioned_config_file.read_text())
-        data[self.__name]["note"] = note
-        self.__versioned_config_file.write_text(json.dumps(data, indent = 2))
-
-    @cache
-    def y(self, project) -> list[float]:
-        if self.__derivative:
-            _, ys = Functions.value_of(
-                project, self.__derivative_func, self.__derivative_sources, self.__derivative_params
-            ).xy(self.version)
-            return [(self.y_scale * v + self.y_offset) for v in ys]
+        if self.__config.db is not None:
+            self.__config.db.set_note(self.version, self.__name, note)
         else:
-            df: DataFrame = self.__config.df(self.version)
-            y_values = df.get_column(self.name).to_list()
-            return [(self.y_scale * v + self.y_offset) for v in y_values]
-
-    @lru_cache(maxsize = 10)
-    def __t(self, dt: float, len: int) -> list[float]:
-        return [dt * (i - self.t0_index) for i in range(len)]
-
-    def xy(self, project) -> tuple[list[float], list[float]]:
+            data = json.loads(self.__versioned_config_file.read_text())
+            data[self.__name]["note"] = note
+            self.__versioned_config_file.write_text(json.dumps(data, indent = 2))
+
+    def y(self, project) -> np.ndarray:
+        return self.xy(project)[1]
+
+    def _compute_xy(self, project) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Computes values of this trace. For derivative traces, values of source traces are expected to be already
+        computed by the DerivativeGraph, which is what calls this.
+        """
         if self.__derivative:
             xs, ys = Functions.value_of(
                 project, self.__derivative_func, self.__derivative_sources, self.__derivative_params
             ).xy(self.version)
-            return xs, [(self.y_scale * v + self.y_offset) for v in ys]
         else:
-            dt = self.__config.dt()
-            return self.__t(dt, len(self.y(project))), self.y(project)
-
-    def x(self, project) -> list[float]:
-        return self.__t(self.__config.dt(), len(self.y(project)))
+            # Boolean column with nulls would be turned into array of objects
+            ys = self.__config.store.column(self.version, self.name).cast(pl.Float64).fill_null(float("nan")).to_numpy()
+            xs = self.__config.derivatives.x(self.version, len(ys), self.t0_index)
+        return xs, self.__scaled(ys)
+
+    def __scaled(self, ys: np.ndarray) -> np.ndarray:
+        """
+        :return: new float64 array with scale and offset of the trace applied to `ys`.
+        """
+        y = np.multiply(ys, self.y_scale, dtype = np.float64)
+        y += self.y_offset
+        return y
+
+    def xy(self, project) -> tuple[np.ndarray, np.ndarray]:
+        """
+        :return: x and y values of the trace as float64, with its scale and offset applied, memoized by the
+        DerivativeGraph. Arrays are shared and must not be modified; they are plotted as they are, without a copy.
+        :raise ValueError: if derivative trace refers to unknown traces or, through other traces, to itself.
+        """
+        return self.__config.derivatives.xy(project, self)
+
+    def x(self, project) -> np.ndarray:
+        return self.xy(project)[0]
 
     def show_in_new_window(self, main_window: MainWindow, prev_trace = None):
         main_window_geometry = main_window.geometry()
@@ -1,15 +1,22 @@
 # from src.tt.data.project import TraceSource
+import hashlib
 import os
 from abc import ABC, abstractmethod
 from io import BytesIO
 from pathlib import Path
-from typing import Any, override
+from typing import Any, Callable, override
 
 import polars as pl
-from polars import DataFrame, Expr
+from polars import DataFrame, Expr, LazyFrame, Series
+from polars.datatypes import DataTypeClass
 
+from tt.data.chipscope import column_decoder, column_dtype
 from tt.data.jsonable import JsonSerializable
 from tt.data.persistable import Persistable
+from tt.data.vcd import read_vcd, sample_vcd
+
+# Blank lines of csv files are read as rows with all columns null; they are not samples
+NOT_BLANK_LINE = ~pl.all_horizontal(pl.all().is_null())
 
 
 class TraceSource(JsonSerializable, ABC):
@@ -21,11 +28,51 @@ class TraceSource(JsonSerializable, ABC):
         pass
 
     @abstractmethod
-    def load_data(self) -> DataFrame:
+    def scan_data(self) -> LazyFrame:
+        """
+        :return: Lazy query over the traces in the source. Nothing is read until it is collected or sunk.
+        """
         pass
 
+    def load_data(self) -> DataFrame:
+        return self.scan_data().collect()
+
+    def scan_columns(self,
+                     cancelled: Callable[[], bool] = lambda: False) -> list[tuple[str, Callable[[], Series]]] | None:
+        """
+        :param cancelled: polled while reading; if it returns True, IngestCancelled is raised.
+        :return: name of each trace in the source and function that reads its values, for sources that can read
+        traces one at a time without reading all of them, or None if traces are to be read through scan_data().
+        """
+        return None
+
+    def scan_changed_data(self, loaded_id: str, scan_loaded: Callable[[list[str]], LazyFrame | None]) -> LazyFrame:
+        """
+        :param loaded_id: change id of the content of the source that was loaded last time.
+        :param scan_loaded: returns lazy query over given traces, as they were loaded last time, or None if any of
+        them was not loaded.
+        :return: same as scan_data(), but sources made of several parts may take parts that did not change since
+        they were loaded from `scan_loaded` rather than read them again.
+        """
+        return self.scan_data()
+
+    def scan_appended_data(self) -> LazyFrame | None:
+        """
+        :return: Lazy query over only the samples appended to the source since it was last loaded or None if
+        source was changed in some other way (or does not support appending) and has to be loaded in full.
+        """
+        return None
+
+    def column_dtypes(self) -> dict[str, DataTypeClass]:
+        """
+        :return: dtype in which traces read by scan_data() and scan_appended_data() are meant to be stored, by
+        name, for traces that are read in a wider dtype, i.e. before all of their values are known. Traces are
+        narrowed to it when stored, unless their values do not fit, see tt.data.chipscope.narrow(...).
+        """
+        return {}
+
     @abstractmethod
-    def has_changed(self, change_id_ref: float | None = None) -> bool:
+    def has_changed(self, change_id_ref: str | None = None) -> bool:
         """
         :param change_id_ref: change id to compare against. If None (default), compare against last loaded.
         :return: Indication if source has changed in relation to the last time it was loaded or against change_id_ref.
@@ -40,9 +87,26 @@ class TraceSource(JsonSerializable, ABC):
         pass
 
     @abstractmethod
-    def change_id(self, live: bool = False) -> float:
+    def change_id(self, live: bool = False) -> str:
+        """
+        :param live: if True, return change id of the source as it is now rather than as it was last loaded.
+        :return: identifier of the content of the source. Sources with the same content have the same change id.
+        """
         pass
 
+    def scanned_change_id(self) -> str:
+        """
+        :return: change id of the content read by the last scan, which becomes the loaded content once
+        update_signature() is called.
+        """
+        return self.change_id(live = True)
+
+    def watched_files(self) -> list[Path]:
+        """
+        :return: files that need to be watched in order to detect changes to this source.
+        """
+        return []
+
     def persist(self) -> None:
         self.persistence.persist()
 
@@ -58,11 +122,48 @@ class TraceSource(JsonSerializable, ABC):
                 return CSVFileTraceSource(
                     file = Path(data["path"]),
                     persistence = persistence,
-                    last_modified = data["last_modified"]
+                    last_modified = data["last_modified"],
+                    signed_columns = data.get("signed_columns", []),
+                    size = data.get("size"),
+                    digest = data.get("digest")
+                )
+            case "VCDFile":
+                return VCDTraceSource(
+                    file = Path(data["path"]),
+                    persistence = persistence,
+                    last_modified = data["last_modified"],
+                    clock = data.get("clock"),
+                    sample_period = data.get("sample_period"),
+                    signed_columns = data.get("signed_columns", []),
+                    size = data.get("size"),
+                    digest = data.get("digest")
+                )
+            case "MultiCSVFile":
+                return MultiCSVTraceSource(
+                    files = [Path(path) for path in data["paths"]],
+                    persistence = persistence,
+                    signatures = data["signatures"],
+                    signed_columns = data.get("signed_columns", [])
                 )
             case _:
                 raise RuntimeError(f"Unknown trace source type: {data['type']}")
 
+    @staticmethod
+    def uri_of(data) -> str:
+        """
+        :param data: config of the trace source, see to_dict()
+        :return: uri of the trace source, same as uri(), found without looking at the files of the source.
+        """
+        match data["type"]:
+            case "NullTraceSource":
+                return "Null"
+            case "CSVFile" | "VCDFile":
+                return f"{Path(data['path']).absolute()}"
+            case "MultiCSVFile":
+                return "; ".join(f"{Path(path).absolute()}" for path in data["paths"])
+            case _:
+                raise RuntimeError(f"Unknown trace source type: {data['type']}")
+
 
 class NullTraceSource(TraceSource):
     def to_dict(self) -> dict[str, Any]:
@@ -75,7 +176,7 @@ class NullTraceSource(TraceSource):
         return "Null"
 
     @override
-    def has_changed(self, change_id_ref: float | None = None) -> bool:
+    def has_changed(self, change_id_ref: str | None = None) -> bool:
         return False
 
     @override
@@ -83,85 +184,463 @@ class NullTraceSource(TraceSource):
         pass
 
     @override
-    def change_id(self, live: bool = False) -> float:
-        return 0
+    def change_id(self, live: bool = False) -> str:
+        return ""
 
     @override
-    def load_data(self) -> DataFrame:
+    def scan_data(self) -> LazyFrame:
         raise RuntimeError("NullTraceSource does not have any traces and cannot be loaded")
 
     def __eq__(self, other):
         return isinstance(other, NullTraceSource)
 
 
-class CSVFileTraceSource(TraceSource):
-    def __init__(self, *, file: Path, persistence: Persistable, last_modified: float | None = None):
+class FileTraceSource(TraceSource, ABC):
+    """
+    Trace source backed by a single file. Tracks size and digest of the file content that was loaded last time.
+    """
+
+    DIGEST_CHUNK_SIZE = 4 * 1024 * 1024
+
+    def __init__(self, *,
+                 file: Path,
+                 persistence: Persistable,
+                 last_modified: float | None = None,
+                 size: int | None = None,
+                 digest: str | None = None):
+        """
+        :param size: number of bytes at the start of the file that were loaded last time.
+        :param digest: digest of those bytes. Together with size it identifies loaded content, see change_id(...),
+        and is used to tell if file was only appended to.
+        """
         super().__init__(persistence)
         self.file = file
         self.__last_modified = os.path.getmtime(file) if last_modified is None else last_modified
+        self.__size = size
+        self.__digest = digest
+        self.scanned_size: int | None = None  # number of bytes covered by the last scan
+
+        # (mtime, size, prefix length) of the file and digests computed for it by live_digests()
+        self.__digests: tuple[tuple[float, int, int | None], str | None, str] | None = None
+
+    @property
+    def loaded_size(self) -> int | None:
+        return self.__size
+
+    @property
+    def loaded_digest(self) -> str | None:
+        return self.__digest
 
     @override
     def uri(self) -> str:
         return f"{self.file.absolute()}"
 
     @override
-    def change_id(self, live: bool = False) -> float:
+    def watched_files(self) -> list[Path]:
+        return [self.file]
+
+    @override
+    def change_id(self, live: bool = False) -> str:
+        """
+        Change id is formed from size and digest of the content, so that re-writing file with identical content or
+        just touching it is not seen as a change.
+        """
         if live:
-            return os.path.getmtime(self.file)
+            size, _, digest = self.live_digests()
+            return f"{size}:{digest}"
         else:
-            return self.__last_modified
+            self.__adopt_legacy_signature()
+            return f"{self.__size}:{self.__digest}"
 
     @override
-    def has_changed(self, change_id_ref: float | None = None) -> bool:
-        file_mtime = os.path.getmtime(self.file)
+    def has_changed(self, change_id_ref: str | None = None) -> bool:
         if change_id_ref is None:
-            return file_mtime != self.__last_modified
-        else:
-            return file_mtime != change_id_ref
+            if os.path.getmtime(self.file) == self.__last_modified and os.path.getsize(self.file) == self.__size:
+                return False
+            change_id_ref = self.change_id()
+        return self.change_id(live = True) != change_id_ref
 
     @override
     def update_signature(self) -> None:
         self.__last_modified = os.path.getmtime(self.file)
+        size, _, digest = self.live_digests()
+        if self.scanned_size is None or self.scanned_size == size:
+            self.__size, self.__digest = size, digest
+            # prefix that will be checked next time is the whole file as it is now
+            self.__digests = ((self.__last_modified, size, size), digest, digest)
+        else:
+            # file grew while it was being loaded
+            self.__size = self.scanned_size
+            self.__digest, _ = FileTraceSource.file_digests(self.file, self.__size)
+        self.scanned_size = None
         self.persist()
 
     @override
-    def load_data(self) -> DataFrame:
-        text = [l for l in self.file.read_text().replace(r'\r', '').split("\n") if l != ""]
-        t = [text[0]]
-        header = pl.read_csv(BytesIO("\n".join(t).encode()), infer_schema = False)
-
-        def get_ctrs() -> list[Expr]:
-            if "Radix" not in text[1]:
-                # second to may contain radix; if not, then add
-                t.append(text[1])
-                return [pl.col(cname).str.to_integer(base = 10) for cname in header.columns]
-            else:
-                # we have radix defined.
-                columns_transform = []
-                for cr in zip(header.columns, text[1].replace("Radix - ", "").split(",")):
-                    cname = cr[0]  # column name
-                    radix = cr[1].upper()  # radix
-                    match radix:
-                        case "HEX":
-                            columns_transform.append(pl.col(cname).str.to_integer(base = 16))
-                        case "OCTAL":
-                            columns_transform.append(pl.col(cname).str.to_integer(base = 8))
-                        case "BIN":
-                            columns_transform.append(pl.col(cname).str.to_integer(base = 2))
-                        case _:
-                            columns_transform.append(pl.col(cname).str.to_integer())
-                return columns_transform
-
-        column_transforms = get_ctrs()
-        t.extend(text[2:])
-        return pl.read_csv(BytesIO("\n".join(t).encode()), infer_schema = False).with_columns(column_transforms)
+    def scanned_change_id(self) -> str:
+        size, _, digest = self.live_digests()
+        if self.scanned_size is None or self.scanned_size == size:
+            return f"{size}:{digest}"
+        else:
+            # file grew while it was being scanned or its last line was not complete yet
+            prefix_digest, _ = FileTraceSource.file_digests(self.file, self.scanned_size)
+            return f"{self.scanned_size}:{prefix_digest}"
+
+    def signature(self) -> dict[str, Any]:
+        return {"last_modified": self.__last_modified, "size": self.__size, "digest": self.__digest}
+
+    def __adopt_legacy_signature(self) -> None:
+        """
+        Projects created before content digests were introduced record only mtime. If file was not modified since
+        then, we can take its current content as the one that was loaded.
+        """
+        if self.__digest is None and os.path.getmtime(self.file) == self.__last_modified:
+            self.__size, _, self.__digest = self.live_digests()
+            self.persist()
+
+    def live_digests(self) -> tuple[int, str | None, str]:
+        """
+        Digests are cached by file mtime and size, so file is read again only after it was written to.
+        :return: current size of the file, digest of its first `size` bytes that were loaded last time (None if
+        file is shorter than that) and digest of the whole file.
+        """
+        stat = os.stat(self.file)
+        key = (stat.st_mtime, stat.st_size, self.__size)
+        if self.__digests is None or self.__digests[0] != key:
+            prefix_digest, digest = FileTraceSource.file_digests(self.file, self.__size)
+            self.__digests = (key, prefix_digest, digest)
+        return stat.st_size, self.__digests[1], self.__digests[2]
+
+    @staticmethod
+    def file_digests(file: Path, prefix_length: int | None) -> tuple[str | None, str]:
+        """
+        Reads file once, in chunks, without holding more than one chunk in memory.
+        :return: digest of the first `prefix_length` bytes of the file (None if file is shorter or prefix_length is
+        None) and digest of the whole file.
+        """
+        digest = hashlib.blake2b(digest_size = 16)
+        prefix_digest = None
+        with file.open("rb") as f:
+            if prefix_length is not None:
+                if FileTraceSource.__digest_update(digest, f, prefix_length) == prefix_length:
+                    prefix_digest = digest.copy().hexdigest()
+            FileTraceSource.__digest_update(digest, f, None)
+        return prefix_digest, digest.hexdigest()
+
+    @staticmethod
+    def __digest_update(digest, f, length: int | None) -> int:
+        """
+        Feeds up to `length` bytes (or until the end of the file if None) into digest.
+        :return: number of bytes read
+        """
+        read = 0
+        while length is None or read < length:
+            chunk_size = FileTraceSource.DIGEST_CHUNK_SIZE if length is None else \
+                min(length - read, FileTraceSource.DIGEST_CHUNK_SIZE)
+            chunk = f.read(chunk_size)
+            if chunk == b"":
+                break
+            digest.update(chunk)
+            read += len(chunk)
+        return read
+
+
+class CSVFileTraceSource(FileTraceSource):
+    def __init__(self, *,
+                 file: Path,
+                 persistence: Persistable,
+                 last_modified: float | None = None,
+                 signed_columns: list[str] | None = None,
+                 size: int | None = None,
+                 digest: str | None = None):
+        """
+        :param signed_columns: names of columns holding signed buses. Such columns are decoded as two's
+        complement regardless of their radix. Columns with SIGNED radix are always decoded as signed.
+        """
+        super().__init__(
+            file = file, persistence = persistence, last_modified = last_modified, size = size, digest = digest
+        )
+        self.signed_columns: list[str] = [] if signed_columns is None else signed_columns
+
+    def read_header(self) -> tuple[list[str], list[str] | None]:
+        """
+        Reads only the first two rows of the file.
+        :return: column names and radix for each column or None if second row does not contain radix.
+        """
+        with self.file.open("rb") as f:
+            header_line = f.readline()
+            second_line = f.readline().decode().strip()
+
+        columns = pl.read_csv(BytesIO(header_line), infer_schema = False).columns
+        if "Radix" not in second_line:
+            return columns, None
+        else:
+            return columns, [r.strip().upper() for r in second_line.replace("Radix - ", "").split(",")]
+
+    def column_transforms(self, columns: list[str], radixes: list[str] | None) -> list[Expr]:
+        """
+        :return: expressions decoding every column; all of them are applied in a single `with_columns` pass.
+        """
+        radixes = [None] * len(columns) if radixes is None else radixes
+        return [
+            column_decoder(cname, radix, signed = cname in self.signed_columns)
+            for cname, radix in zip(columns, radixes)
+        ]
+
+    @override
+    def column_dtypes(self) -> dict[str, DataTypeClass]:
+        columns, radixes = self.read_header()
+        radixes = [None] * len(columns) if radixes is None else radixes
+        return {
+            cname: column_dtype(cname, radix, signed = cname in self.signed_columns)
+            for cname, radix in zip(columns, radixes)
+        }
+
+    @override
+    def scan_data(self) -> LazyFrame:
+        # Radix row is parsed separately so that polars can scan the rest of the file directly, using its
+        # multithreaded reader, instead of us reading whole file into python strings.
+        self.scanned_size = os.path.getsize(self.file)
+        columns, radixes = self.read_header()
+        return pl.scan_csv(
+            self.file,
+            infer_schema = False,
+            skip_rows_after_header = 0 if radixes is None else 1
+        ).filter(NOT_BLANK_LINE).with_columns(self.column_transforms(columns, radixes))
+
+    @override
+    def scan_appended_data(self) -> LazyFrame | None:
+        loaded_size = self.loaded_size
+        if loaded_size is None or self.loaded_digest is None:
+            return None
+
+        current_size, prefix_digest, _ = self.live_digests()
+        if current_size <= loaded_size or prefix_digest != self.loaded_digest:
+            return None
+
+        with self.file.open("rb") as f:
+            header_line = f.readline()
+            f.seek(loaded_size - 1)
+            if f.read(1) != b"\n":
+                # last time we loaded file up to the middle of the line
+                return None
+            tail = f.read(current_size - loaded_size)
+
+        # the last line might still be in the process of being written; it will be picked up next time
+        tail = tail[:tail.rfind(b"\n") + 1]
+        if tail.strip() == b"":
+            return None
+
+        self.scanned_size = loaded_size + len(tail)
+        columns, radixes = self.read_header()
+        return pl.read_csv(
+            BytesIO(header_line + tail), infer_schema = False
+        ).lazy().filter(NOT_BLANK_LINE).with_columns(self.column_transforms(columns, radixes))
 
     def to_dict(self) -> dict[str, Any]:
         return {
             "type": "CSVFile",
             "path": f"{self.file}",
-            "last_modified": self.__last_modified
+            "signed_columns": self.signed_columns,
+            **self.signature()
         }
 
     def __eq__(self, other):
         return isinstance(other, CSVFileTraceSource) and self.file == other.file
+
+
+class VCDTraceSource(FileTraceSource):
+    """
+    Value change dump written by a simulator. Value changes are streamed from the file and sampled into
+    traces, see tt.data.vcd.read_vcd(...), so that simulation and hardware traces can be kept in the same project.
+    """
+
+    def __init__(self, *,
+                 file: Path,
+                 persistence: Persistable,
+                 last_modified: float | None = None,
+                 clock: str | None = None,
+                 sample_period: int | None = None,
+                 signed_columns: list[str] | None = None,
+                 size: int | None = None,
+                 digest: str | None = None):
+        """
+        :param clock: name of the variable, i.e. "top/clk", on rising edge of which samples are taken.
+        :param sample_period: if clock is not given, take samples every so many VCD time units.
+        :param signed_columns: names of columns holding signed buses.
+        """
+        super().__init__(
+            file = file, persistence = persistence, last_modified = last_modified, size = size, digest = digest
+        )
+        self.clock = clock
+        self.sample_period = sample_period
+        self.signed_columns: list[str] = [] if signed_columns is None else signed_columns
+
+    @override
+    def scan_data(self) -> LazyFrame:
+        self.scanned_size = os.path.getsize(self.file)
+        return read_vcd(
+            self.file, clock = self.clock, sample_period = self.sample_period, signed_columns = self.signed_columns
+        ).lazy()
+
+    @override
+    def scan_columns(self, cancelled: Callable[[], bool] = lambda: False) -> list[tuple[str, Callable[[], Series]]]:
+        self.scanned_size = os.path.getsize(self.file)
+        return sample_vcd(
+            self.file, clock = self.clock, sample_period = self.sample_period, signed_columns = self.signed_columns,
+            cancelled = cancelled
+        )
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            "type": "VCDFile",
+            "path": f"{self.file}",
+            "clock": self.clock,
+            "sample_period": self.sample_period,
+            "signed_columns": self.signed_columns,
+            **self.signature()
+        }
+
+    def __eq__(self, other):
+        return isinstance(other, VCDTraceSource) and self.file == other.file
+
+
+class MultiCSVTraceSource(TraceSource):
+    """
+    Several csv files, typically one per ILA core, joined on the "Sample in Buffer" column into a single set of
+    traces. Columns other than the join column that appear in more than one file, such as "TRIGGER", are
+    suffixed with the name of the file they came from (all but the first one).
+    """
+
+    JOIN_COLUMN = "Sample in Buffer"
+
+    def __init__(self, *,
+                 files: list[Path],
+                 persistence: Persistable,
+                 signatures: list[dict[str, Any]] | None = None,
+                 signed_columns: list[str] | None = None):
+        """
+        :param signatures: signature of each file, as recorded by CSVFileTraceSource, when it was last loaded.
+        """
+        super().__init__(persistence)
+        if len(files) < 2:
+            raise ValueError("MultiCSVTraceSource requires at least 2 files")
+
+        self.signed_columns: list[str] = [] if signed_columns is None else signed_columns
+        signatures = [{} for _ in files] if signatures is None else signatures
+        self.sources = [
+            CSVFileTraceSource(
+                file = file,
+                persistence = self,
+                signed_columns = self.signed_columns,
+                last_modified = signature.get("last_modified"),
+                size = signature.get("size"),
+                digest = signature.get("digest")
+            )
+            for file, signature in zip(files, signatures)
+        ]
+
+    @property
+    def files(self) -> list[Path]:
+        return [source.file for source in self.sources]
+
+    @override
+    def uri(self) -> str:
+        return "; ".join(source.uri() for source in self.sources)
+
+    @override
+    def watched_files(self) -> list[Path]:
+        return self.files
+
+    @override
+    def change_id(self, live: bool = False) -> str:
+        return "|".join(source.change_id(live) for source in self.sources)
+
+    @override
+    def has_changed(self, change_id_ref: str | None = None) -> bool:
+        if change_id_ref is None:
+            return any(source.has_changed() for source in self.sources)
+        else:
+            return self.change_id(live = True) != change_id_ref
+
+    @override
+    def update_signature(self) -> None:
+        for source in self.sources:
+            source.update_signature()
+
+    @override
+    def scanned_change_id(self) -> str:
+        return "|".join(source.scanned_change_id() for source in self.sources)
+
+    def __renamed_columns(self) -> list[dict[str, str]]:
+        """
+        Reads only headers of the files.
+        :return: for each file, name of each of its columns in the joined traces.
+        """
+        renamed: list[dict[str, str]] = []
+        joined: set[str] = set()
+        for source in self.sources:
+            columns, _ = source.read_header()
+            if MultiCSVTraceSource.JOIN_COLUMN not in columns:
+                raise RuntimeError(f"File {source.file} has no \"{MultiCSVTraceSource.JOIN_COLUMN}\" column")
+            renamed.append({
+                c: f"{c} [{source.file.stem}]" if c != MultiCSVTraceSource.JOIN_COLUMN and c in joined else c
+                for c in columns
+            })
+            joined.update(renamed[-1].values())
+        return renamed
+
+    @override
+    def column_dtypes(self) -> dict[str, DataTypeClass]:
+        return {
+            renamed[c]: dtype
+            for source, renamed in zip(self.sources, self.__renamed_columns())
+            for c, dtype in source.column_dtypes().items()
+        }
+
+    @override
+    def scan_data(self) -> LazyFrame:
+        return MultiCSVTraceSource.__join([
+            source.scan_data().rename(renamed) for source, renamed in zip(self.sources, self.__renamed_columns())
+        ])
+
+    @override
+    def scan_changed_data(self, loaded_id: str, scan_loaded: Callable[[list[str]], LazyFrame | None]) -> LazyFrame:
+        """
+        Files that did not change since they were loaded are not read again; their traces are taken from
+        `scan_loaded` instead, without samples that only other files have.
+        """
+        loaded_ids = loaded_id.split("|")
+        if len(loaded_ids) != len(self.sources):
+            return self.scan_data()
+
+        lfs = []
+        for source, renamed, source_loaded_id in zip(self.sources, self.__renamed_columns(), loaded_ids):
+            traces = [c for c in renamed.values() if c != MultiCSVTraceSource.JOIN_COLUMN]
+            loaded = None
+            if source.change_id(live = True) == source_loaded_id and traces != []:
+                loaded = scan_loaded([MultiCSVTraceSource.JOIN_COLUMN] + traces)
+            if loaded is None:
+                lfs.append(source.scan_data().rename(renamed))
+            else:
+                lfs.append(loaded.filter(
+                    pl.any_horizontal(pl.col(traces).is_not_null())
+                ).with_columns(pl.col(MultiCSVTraceSource.JOIN_COLUMN).cast(pl.Int64)))
+        return MultiCSVTraceSource.__join(lfs)
+
+    @staticmethod
+    def __join(lfs: list[LazyFrame]) -> LazyFrame:
+        joined = lfs[0]
+        for lf in lfs[1:]:
+            joined = joined.join(lf, on = MultiCSVTraceSource.JOIN_COLUMN, how = "full", coalesce = True)
+        return joined.sort(MultiCSVTraceSource.JOIN_COLUMN)
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            "type": "MultiCSVFile",
+            "paths": [f"{file}" for file in self.files],
+            "signatures": [source.signature() for source in self.sources],
+            "signed_columns": self.signed_columns
+        }
+
+    def __eq__(self, other):
+        return isinstance(other, MultiCSVTraceSource) and self.files == other.files
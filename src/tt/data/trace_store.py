@@ -0,0 +1,758 @@
+import hashlib
+import json
+import os
+import shutil
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Callable
+
+import polars as pl
+from polars import LazyFrame, DataFrame, Series
+from polars.datatypes import DataTypeClass
+
+from tt.data.chipscope import narrow
+
+
+class IngestCancelled(Exception):
+    pass
+
+
+class TraceStore:
+    """
+    Persistent store of trace versions located in the project "data" directory.
+
+    Each column (trace) is stored once per distinct content in "data/blobs/xx/<hash>.parquet", where <hash> is
+    a digest of column values. Each version has its own directory "data/NNNNN" with "manifest.json" that maps
+    trace names to the list of blobs holding its values. Concatenated together these blobs form all samples of
+    the trace in this version. Usually there is one blob per trace. Version created from data appended to the
+    source refers to the blobs of the version it was appended to followed by blobs holding only new samples.
+    Since traces that did not change between versions hash to the same blob, each version only adds blobs for
+    traces that actually changed. Manifest also records change id of the source the version was loaded from.
+    Hashes of the blobs double as fingerprints of the traces, by which versions are compared without reading them,
+    see fingerprints(...).
+
+    Older projects have versions stored as whole-version parquet files (segments). Manifests of such versions
+    list "segments" instead of "columns", and versions without manifest consist of "data/NNNNN/traces.parquet.lz4".
+
+    New version is first written into staging directory "data/.NNNNN.staging" and then published, i.e. renamed
+    into "data/NNNNN", once all of its files are flushed to the disk.
+
+    Blobs are written either as lz4 compressed parquet files or as uncompressed Arrow IPC files ("<hash>.arrow"),
+    see BLOB_FORMATS. The latter are memory mapped when read, so that columns are views into the page cache rather
+    than copies decompressed into memory.
+
+    Blobs referenced only by old versions can be archived, i.e. rewritten as zstd compressed parquet files
+    ("<hash>.zst"), see archive_blobs(...). Integer blob can be archived as difference from a blob of the previous
+    version (its base), in which case its only column is named "delta <base hash>". Old versions can also be pruned,
+    see prune_version(...); manifest of pruned version is kept, but its traces are gone.
+
+    Computed values of derivative traces are cached in "data/NNNNN/derived/<key>" files of the version, in the same
+    format as blobs, so that they are read, or memory mapped, instead of computed again each time tt is started. Key
+    identifies definition of the trace and values of all of its sources, see read_derived(...). Files that were not
+    used for the longest time are removed once all of them take more than DERIVED_CACHE_BYTES.
+    """
+
+    TRACES_FILE = "traces.parquet.lz4"
+    MANIFEST_FILE = "manifest.json"
+    BLOBS_DIR = "blobs"
+    BLOB_COLUMN = "values"
+
+    # blob format name -> suffix of blob files in that format
+    BLOB_FORMATS: dict[str, str] = {
+        "parquet": ".parquet",
+        "ipc": ".arrow",
+    }
+
+    ARCHIVE_SUFFIX = ".zst"
+    ARCHIVE_COMPRESSION_LEVEL = 19
+    DELTA_COLUMN_PREFIX = "delta "
+    # longest chain of delta blobs, each one based on the next, that is read to restore values of a blob
+    MAX_DELTA_CHAIN = 8
+
+    # upper bound on the total size of columns kept in memory by column(...)
+    COLUMN_CACHE_BYTES = 512 * 1024 * 1024
+
+    DERIVED_DIR = "derived"
+    # upper bound on the total size of files holding values of derivative traces, see write_derived(...)
+    DERIVED_CACHE_BYTES = 2 * 1024 * 1024 * 1024
+
+    def __init__(self, data_dir: Path, blob_format: str = "parquet"):
+        if blob_format not in TraceStore.BLOB_FORMATS:
+            raise ValueError(f"Unsupported blob format: {blob_format}")
+        self.data_dir = data_dir
+        self.blob_format = blob_format
+        # manifests of published versions, which never change once written
+        self.__manifests: dict[int, dict[str, Any]] = {}
+        # recently read columns of published versions, least recently used first
+        self.__columns: OrderedDict[tuple[int, str], Series] = OrderedDict()
+        self.__columns_bytes = 0
+        # background workers load and compact versions while GUI thread reads them; cached manifests and columns, as
+        # well as files of published versions, are only changed and read while holding the lock
+        self.lock = threading.RLock()
+
+    def version_dir(self, version: int, staged: bool = False) -> Path:
+        return self.data_dir / (f".{version:05}.staging" if staged else f"{version:05}")
+
+    def stage(self, version: int) -> Path:
+        """
+        Creates empty staging directory for the version. All write_*, append_* and link_* functions write into it.
+        """
+        self.discard_staged(version)
+        staging_dir = self.version_dir(version, staged = True)
+        staging_dir.mkdir(parents = True)
+        return staging_dir
+
+    def discard_staged(self, version: int) -> None:
+        """
+        Removes staged version. Blobs it might have written are left in place; they are reused if the same
+        content is loaded again.
+        """
+        shutil.rmtree(self.version_dir(version, staged = True), ignore_errors = True)
+
+    def publish(self, version: int) -> None:
+        """
+        Makes staged version durable and moves it into its final place.
+        """
+        staging_dir = self.version_dir(version, staged = True)
+        for file in staging_dir.iterdir():
+            TraceStore.sync(file)
+
+        version_dir = self.version_dir(version)
+        if version_dir.exists():
+            # left behind by an earlier attempt that never completed
+            shutil.rmtree(version_dir)
+        os.replace(staging_dir, version_dir)
+        TraceStore.sync(self.data_dir)
+
+    @staticmethod
+    def sync(path: Path) -> None:
+        """
+        Flushes file to the disk. For directories, flushes directory entries, which is only possible on POSIX.
+        """
+        if path.is_dir():
+            if os.name == "nt":
+                return
+            fd = os.open(path, os.O_RDONLY)
+        else:
+            fd = os.open(path, os.O_RDWR)
+        try:
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+
+    def manifest(self, version: int, staged: bool = False) -> dict[str, Any]:
+        with self.lock:
+            if not staged and version in self.__manifests:
+                return self.__manifests[version]
+
+            manifest_file = self.version_dir(version, staged) / TraceStore.MANIFEST_FILE
+            if manifest_file.exists():
+                manifest = json.loads(manifest_file.read_text())
+                if not staged:
+                    self.__manifests[version] = manifest
+                return manifest
+            else:
+                return {"segments": [f"{version:05}/{TraceStore.TRACES_FILE}"]}
+
+    def update_staged_manifest(self, version: int, **kwargs) -> None:
+        """
+        Adds entries to the manifest of the staged version, i.e. information derived from its traces.
+        """
+        manifest = self.manifest(version, staged = True)
+        manifest.update(kwargs)
+        (self.version_dir(version, staged = True) / TraceStore.MANIFEST_FILE).write_text(
+            json.dumps(manifest, indent = 2)
+        )
+
+    def __write_manifest(self, version: int, manifest: dict[str, Any], source_id: str, **kwargs) -> None:
+        manifest = {k: v for k, v in manifest.items() if k in {"columns", "segments"}}
+        manifest["source_id"] = source_id
+        manifest.update(kwargs)
+        (self.version_dir(version, staged = True) / TraceStore.MANIFEST_FILE).write_text(
+            json.dumps(manifest, indent = 2)
+        )
+
+    def blob_file(self, blob_hash: str) -> Path:
+        """
+        :return: file holding the blob. Blobs written before format was changed are found in their old format, and
+        archived blobs are found in archive format.
+        """
+        blob_file = self.__blob_files(blob_hash)[0]
+        if not blob_file.exists():
+            for file in self.__blob_files(blob_hash)[1:]:
+                if file.exists():
+                    return file
+        return blob_file
+
+    def __blob_files(self, blob_hash: str) -> list[Path]:
+        """
+        :return: files the blob could be held in, whether they exist or not; the one in current format goes first.
+        """
+        blob_dir = self.data_dir / TraceStore.BLOBS_DIR / blob_hash[:2]
+        suffixes = [TraceStore.BLOB_FORMATS[self.blob_format]] + list(TraceStore.BLOB_FORMATS.values())
+        return [blob_dir / f"{blob_hash}{suffix}" for suffix in dict.fromkeys(suffixes)] + [
+            blob_dir / f"{blob_hash}{TraceStore.ARCHIVE_SUFFIX}"
+        ]
+
+    @staticmethod
+    def read_blob(file: Path, column_name: str = BLOB_COLUMN) -> Series:
+        if file.suffix == TraceStore.BLOB_FORMATS["ipc"]:
+            # zero-copy; values are paged in from the file as they are accessed
+            return pl.read_ipc(file, columns = [column_name], memory_map = True).to_series()
+        else:
+            return pl.read_parquet(file, columns = [column_name]).to_series()
+
+    def __read_blob(self, blob_hash: str) -> Series:
+        return self.__read_blob_file(self.blob_file(blob_hash), TraceStore.BLOB_COLUMN)
+
+    def __read_blob_file(self, file: Path, column_name: str) -> Series:
+        """
+        Same as read_blob(...), but also restores values of delta blobs from their base.
+        """
+        base_hash = self.__delta_base(file)
+        if base_hash is None:
+            return TraceStore.read_blob(file, column_name)
+        else:
+            base = self.__read_blob(base_hash)
+            delta = pl.read_parquet(file).to_series()
+            return (base.cast(pl.Int64) + delta).cast(base.dtype).rename(TraceStore.BLOB_COLUMN)
+
+    def __delta_base(self, file: Path) -> str | None:
+        """
+        :return: hash of the base blob if file holds delta blob, otherwise None.
+        """
+        if file.suffix == TraceStore.ARCHIVE_SUFFIX:
+            column_name = pl.scan_parquet(file).collect_schema().names()[0]
+            if column_name.startswith(TraceStore.DELTA_COLUMN_PREFIX):
+                return column_name.removeprefix(TraceStore.DELTA_COLUMN_PREFIX)
+        return None
+
+    def __delta_chain(self, blob_hash: str) -> list[str]:
+        """
+        :return: the blob followed by blobs it is based on, if it is a delta blob, up to MAX_DELTA_CHAIN + 1 blobs.
+        """
+        chain = [blob_hash]
+        while len(chain) <= TraceStore.MAX_DELTA_CHAIN:
+            base_hash = self.__delta_base(self.blob_file(chain[-1]))
+            if base_hash is None or base_hash in chain:
+                break
+            chain.append(base_hash)
+        return chain
+
+    def __blob_dtype(self, blob_hash: str) -> pl.DataType:
+        chain = self.__delta_chain(blob_hash)
+        return TraceStore.blob_dtype(self.blob_file(chain[-1]))
+
+    @staticmethod
+    def blob_dtype(file: Path) -> pl.DataType:
+        """
+        Reads only metadata of the blob.
+        """
+        if file.suffix == TraceStore.BLOB_FORMATS["ipc"]:
+            return pl.scan_ipc(file).collect_schema()[TraceStore.BLOB_COLUMN]
+        else:
+            return pl.scan_parquet(file).collect_schema()[TraceStore.BLOB_COLUMN]
+
+    def convert_blobs(self,
+                      progress: Callable[[float], None] = lambda _: None,
+                      cancelled: Callable[[], bool] = lambda: False) -> None:
+        """
+        Rewrites blobs that are not in the current format of the store. Values of derivative traces that are not in
+        the current format are removed instead, since they are only cached, see write_derived(...).
+
+        :param progress: called with fraction of blobs converted so far.
+        :param cancelled: checked between blobs; if it returns True, IngestCancelled is raised. Blobs converted so
+        far stay converted.
+        """
+        suffix = TraceStore.BLOB_FORMATS[self.blob_format]
+        with self.lock:
+            for file in self.data_dir.glob(f"[0-9]*/{TraceStore.DERIVED_DIR}/*"):
+                if file.suffix in TraceStore.BLOB_FORMATS.values() and file.suffix != suffix:
+                    TraceStore.__remove_file(file)
+
+        blob_files = [
+            file for file in sorted((self.data_dir / TraceStore.BLOBS_DIR).glob("*/*"))
+            if file.suffix in TraceStore.BLOB_FORMATS.values() and file.suffix != suffix
+        ]
+        for i, blob_file in enumerate(blob_files):
+            if cancelled():
+                raise IngestCancelled()
+            self.__write_blob_file(TraceStore.read_blob(blob_file), blob_file.with_suffix(suffix))
+            with self.lock:
+                TraceStore.__remove_file(blob_file)
+            progress((i + 1) / len(blob_files))
+
+    def __column_files(self, version: int, staged: bool = False) -> dict[str, tuple[list[Path], str]]:
+        """
+        :return: for each trace in the version, files holding its values and name of the column in these files.
+        """
+        manifest = self.manifest(version, staged)
+        if manifest.get("pruned", False):
+            return {}
+        elif "columns" in manifest:
+            return {
+                name: ([self.blob_file(h) for h in blob_hashes], TraceStore.BLOB_COLUMN)
+                for name, blob_hashes in manifest["columns"].items()
+            }
+        else:
+            segments = [self.data_dir / segment for segment in manifest["segments"]]
+            return {name: (segments, name) for name in pl.scan_parquet(segments[0]).collect_schema().names()}
+
+    def columns(self, version: int, staged: bool = False) -> list[str]:
+        return list(self.__column_files(version, staged).keys())
+
+    def column(self, version: int, name: str, staged: bool = False) -> Series:
+        """
+        Reads only the blobs (or, for older versions, only the column of the segments) holding the trace.
+        Columns of published versions are cached, up to COLUMN_CACHE_BYTES in total.
+        """
+        if staged:
+            # staged version is only seen by the worker writing it
+            return self.__read_column(version, name, staged = True)
+
+        key = (version, name)
+        with self.lock:
+            if key in self.__columns:
+                self.__columns.move_to_end(key)
+                return self.__columns[key]
+
+            series = self.__read_column(version, name)
+            self.__columns[key] = series
+            self.__columns_bytes += series.estimated_size()
+            while self.__columns_bytes > TraceStore.COLUMN_CACHE_BYTES and len(self.__columns) > 1:
+                _, evicted = self.__columns.popitem(last = False)
+                self.__columns_bytes -= evicted.estimated_size()
+            return series
+
+    def __read_column(self, version: int, name: str, staged: bool = False) -> Series:
+        column_files = self.__column_files(version, staged)
+        if name not in column_files and self.is_pruned(version):
+            raise RuntimeError(f"Traces of version {version} were removed to save disk space")
+
+        files, column_name = column_files[name]
+        chunks = [self.__read_blob_file(file, column_name) for file in files]
+        return (chunks[0] if len(chunks) == 1 else pl.concat(chunks, rechunk = False)).alias(name)
+
+    def scan(self, version: int, names: list[str]) -> LazyFrame:
+        """
+        Lazy query over some traces of a published version. Blobs are scanned rather than read, so that only what
+        the query needs is read, except for delta blobs, which are restored from their base right away.
+        """
+        column_files = self.__column_files(version)
+        if self.is_pruned(version):
+            raise RuntimeError(f"Traces of version {version} were removed to save disk space")
+
+        scans = []
+        for name in names:
+            files, column_name = column_files[name]
+            chunks = [self.__scan_blob_file(file, column_name) for file in files]
+            scans.append(pl.concat(chunks).select(pl.col(column_name).alias(name)))
+        return pl.concat(scans, how = "horizontal")
+
+    def __scan_blob_file(self, file: Path, column_name: str) -> LazyFrame:
+        if self.__delta_base(file) is not None:
+            return self.__read_blob_file(file, column_name).to_frame(column_name).lazy()
+        elif file.suffix == TraceStore.BLOB_FORMATS["ipc"]:
+            return pl.scan_ipc(file, memory_map = True).select(column_name)
+        else:
+            # parquet, which archived blobs are as well
+            return pl.scan_parquet(file).select(column_name)
+
+    def read(self, version: int) -> DataFrame:
+        """
+        Reads all traces of the version. Prefer column(...) when only some of them are needed.
+        """
+        return pl.DataFrame([self.column(version, name) for name in self.columns(version)])
+
+    def find_version(self, source_id: str, latest_version: int) -> int | None:
+        """
+        :return: latest version loaded from the source with given change id or None if there is no such version.
+        """
+        for version in range(latest_version, 0, -1):
+            if self.manifest(version).get("source_id") == source_id:
+                return version
+        return None
+
+    def fingerprints(self, version: int) -> dict[str, tuple[str, ...]] | None:
+        """
+        :return: for each trace in the version, fingerprint of its values; traces with the same fingerprint in two
+        versions have the same values. None for versions stored in segments, which have no fingerprints.
+        """
+        columns = self.manifest(version).get("columns")
+        return None if columns is None else {name: tuple(blob_hashes) for name, blob_hashes in columns.items()}
+
+    def summaries(self, version: int) -> dict[str, dict[str, Any]]:
+        """
+        :return: summary of each trace in the version, see column_summary(...); empty if version has none recorded.
+        """
+        return self.manifest(version).get("summaries", {})
+
+    @staticmethod
+    def column_summary(series: Series) -> dict[str, Any]:
+        """
+        :return: number of samples and nulls in the column and, for numeric columns, min, max and mean of values.
+        """
+        summary: dict[str, Any] = {"len": len(series), "null_count": series.null_count()}
+        if series.dtype.is_numeric() or series.dtype == pl.Boolean:
+            values = series.cast(pl.Float64)
+            summary.update(min = values.min(), max = values.max(), mean = values.mean())
+        return summary
+
+    def derived_file(self, version: int, key: str) -> Path:
+        return self.version_dir(version) / TraceStore.DERIVED_DIR / f"{key}{TraceStore.BLOB_FORMATS[self.blob_format]}"
+
+    def read_derived(self, version: int, key: str) -> tuple[Series, Series] | None:
+        """
+        :param key: digest of everything values of the derivative trace depend on; function, its parameters and
+        fingerprints of the source traces.
+        :return: x and y values of the derivative trace written by write_derived(...) or None if there are none.
+        """
+        file = self.derived_file(version, key)
+        try:
+            if file.suffix == TraceStore.BLOB_FORMATS["ipc"]:
+                df = pl.read_ipc(file, memory_map = True)
+            else:
+                df = pl.read_parquet(file)
+            # modification time is what least recently used files are found by
+            os.utime(file)
+        except FileNotFoundError:
+            return None
+        except Exception:
+            # written by a process that did not finish, or damaged otherwise; it is computed and written again
+            TraceStore.__remove_file(file)
+            return None
+        return df.get_column("x"), df.get_column("y")
+
+    def write_derived(self, version: int, key: str, x: Series, y: Series) -> None:
+        """
+        Writes values of the derivative trace, see read_derived(...), and removes least recently used values of
+        derivative traces of all versions beyond DERIVED_CACHE_BYTES. Values are only cached; if they can not be
+        written, i.e. because disk is full, they are not.
+        """
+        file = self.derived_file(version, key)
+        tmp_file = file.parent / f"{file.name}.{os.getpid()}.tmp"
+        try:
+            file.parent.mkdir(exist_ok = True)
+            df = pl.DataFrame([x.rename("x"), y.rename("y")])
+            if file.suffix == TraceStore.BLOB_FORMATS["ipc"]:
+                df.write_ipc(tmp_file, compression = "uncompressed")
+            else:
+                df.write_parquet(tmp_file, compression = "lz4")
+            os.replace(tmp_file, file)
+        except OSError:
+            TraceStore.__remove_file(tmp_file)
+            return
+        self.__evict_derived()
+
+    def __evict_derived(self) -> None:
+        files = []
+        for file in self.data_dir.glob(f"[0-9]*/{TraceStore.DERIVED_DIR}/*"):
+            try:
+                stat = file.stat()
+                files.append((stat.st_mtime_ns, stat.st_size, file))
+            except FileNotFoundError:
+                # removed by another instance
+                pass
+
+        total_size = sum(size for _, size, _ in files)
+        for _, size, file in sorted(files):
+            if total_size <= TraceStore.DERIVED_CACHE_BYTES:
+                break
+            TraceStore.__remove_file(file)
+            total_size -= size
+
+    def can_append_to(self, version: int) -> bool:
+        return "columns" in self.manifest(version)
+
+    @staticmethod
+    def column_hash(series: Series) -> str:
+        """
+        :return: digest of dtype and values of the column; columns with equal values hash to the same digest.
+        """
+        digest = hashlib.blake2b(digest_size = 16)
+        digest.update(f"{series.dtype}:{len(series)}:".encode())
+        if series.null_count() > 0:
+            digest.update(series.is_null().to_numpy().tobytes())
+        if series.dtype.is_numeric() or series.dtype == pl.Boolean:
+            digest.update(series.fill_null(False if series.dtype == pl.Boolean else 0).to_numpy().tobytes())
+        else:
+            digest.update(series.hash(seed = 0).to_numpy().tobytes())
+        return digest.hexdigest()
+
+    def __write_blob(self, series: Series) -> str:
+        """
+        Writes values of the series into a blob, unless blob with the same content already exists.
+        :return: hash of the blob
+        """
+        blob_hash = TraceStore.column_hash(series)
+        blob_file = self.blob_file(blob_hash)
+        if not blob_file.exists() or blob_file.suffix == TraceStore.ARCHIVE_SUFFIX:
+            # archived blob is in use again, by the newest version, so it gets a copy that is fast to read
+            self.__write_blob_file(series, self.__blob_files(blob_hash)[0])
+        return blob_hash
+
+    def __write_blob_file(self, series: Series, blob_file: Path, column_name: str = BLOB_COLUMN) -> None:
+        blob_file.parent.mkdir(parents = True, exist_ok = True)
+        # blobs are shared between versions, so they must never be seen half-written; several import workers
+        # might be writing the same blob at once, hence temp file name unique to the process
+        tmp_file = blob_file.parent / f"{blob_file.name}.{os.getpid()}.tmp"
+        df = series.rename(column_name).to_frame()
+        if blob_file.suffix == TraceStore.BLOB_FORMATS["ipc"]:
+            df.write_ipc(tmp_file, compression = "uncompressed")
+        elif blob_file.suffix == TraceStore.ARCHIVE_SUFFIX:
+            df.write_parquet(tmp_file, compression = "zstd", compression_level = TraceStore.ARCHIVE_COMPRESSION_LEVEL)
+        else:
+            df.write_parquet(tmp_file, compression = "lz4")
+        TraceStore.sync(tmp_file)
+        os.replace(tmp_file, blob_file)
+
+    @staticmethod
+    def __write_blobs(columns: list[tuple[str, Callable[[], Series]]],
+                      write_blob: Callable[[Series], str],
+                      progress: Callable[[float], None],
+                      cancelled: Callable[[], bool]) -> dict[str, str]:
+        """
+        :param columns: name of each column and function that reads it; columns are read one at a time.
+        """
+        blob_hashes = {}
+        for i, (name, read_column) in enumerate(columns):
+            if cancelled():
+                raise IngestCancelled()
+            blob_hashes[name] = write_blob(read_column())
+            progress((i + 1) / len(columns))
+        return blob_hashes
+
+    def write_version(self,
+                      version: int,
+                      lf: LazyFrame,
+                      source_id: str,
+                      progress: Callable[[float], None] = lambda _: None,
+                      cancelled: Callable[[], bool] = lambda: False,
+                      dtypes: dict[str, DataTypeClass] | None = None) -> None:
+        """
+        :param progress: called with fraction of columns written so far.
+        :param cancelled: checked between columns; if it returns True, IngestCancelled is raised.
+        :param dtypes: dtype to store columns in, for columns of `lf` that are wider; see TraceSource.column_dtypes()
+        """
+        self.write_version_from_blobs(version, self.write_blobs(lf, progress, cancelled, dtypes), source_id)
+
+    def write_blobs(self,
+                    lf: LazyFrame,
+                    progress: Callable[[float], None] = lambda _: None,
+                    cancelled: Callable[[], bool] = lambda: False,
+                    dtypes: dict[str, DataTypeClass] | None = None) -> dict[str, list[str]]:
+        """
+        Writes blobs for all columns without creating a version. Safe to call from several processes at once.
+        See write_version(...) for `progress`, `cancelled` and `dtypes`.
+        :return: blobs of each column, as expected by write_version_from_blobs(...)
+        """
+        dtypes = {} if dtypes is None else dtypes
+        # Each column has to be hashed before we know if it needs to be written. Frame is sunk, streaming, into
+        # a temporary uncompressed Arrow file which is then memory mapped and read one column at a time, so that
+        # memory needed does not grow with the size of the whole frame. Several processes might be writing blobs at
+        # once, hence temp file name unique to the process and thread.
+        tmp_file = self.data_dir / f".ingest.{os.getpid()}.{threading.get_ident()}.arrow"
+        try:
+            try:
+                lf.sink_ipc(tmp_file, compression = None)
+            except pl.exceptions.InvalidOperationError:
+                # query can not be run by the streaming engine
+                lf.collect().write_ipc(tmp_file, compression = "uncompressed")
+
+            names = pl.scan_ipc(tmp_file).collect_schema().names()
+            blob_hashes = TraceStore.__write_blobs(
+                [(name, lambda name = name: TraceStore.__narrow(TraceStore.read_blob(tmp_file, name), dtypes.get(name)))
+                 for name in names],
+                self.__write_blob, progress, cancelled
+            )
+        finally:
+            TraceStore.__remove_file(tmp_file)
+        return {name: [h] for name, h in blob_hashes.items()}
+
+    def write_version_from_columns(self,
+                                   version: int,
+                                   columns: list[tuple[str, Callable[[], Series]]],
+                                   source_id: str,
+                                   progress: Callable[[float], None] = lambda _: None,
+                                   cancelled: Callable[[], bool] = lambda: False) -> None:
+        """
+        Same as write_version(...), but for sources that read their traces one column at a time, see
+        TraceSource.scan_columns(...).
+        """
+        blob_hashes = TraceStore.__write_blobs(columns, self.__write_blob, progress, cancelled)
+        self.write_version_from_blobs(version, {name: [h] for name, h in blob_hashes.items()}, source_id)
+
+    def write_version_from_blobs(self, version: int, columns: dict[str, list[str]], source_id: str) -> None:
+        """
+        Creates new version out of blobs that were already written, see write_blobs(...).
+        """
+        self.__write_manifest(version, {"columns": columns}, source_id)
+
+    def link_version(self, version: int, duplicate_of: int, source_id: str) -> None:
+        """
+        Creates new version that has exactly the same data as version `duplicate_of`, without copying it.
+        """
+        self.__write_manifest(version, self.manifest(duplicate_of), source_id, duplicate_of = duplicate_of)
+
+    def append_version(self,
+                       version: int,
+                       base_version: int,
+                       lf: LazyFrame,
+                       source_id: str,
+                       progress: Callable[[float], None] = lambda _: None,
+                       cancelled: Callable[[], bool] = lambda: False) -> bool:
+        """
+        Creates new version out of samples of the base version followed by samples in `lf`. Only `lf` is written,
+        samples of base version are referenced from where they are already stored. Base version must be stored in
+        blobs, see can_append_to(...). See write_version(...) for `progress` and `cancelled`.
+        :return: False, with nothing written, if appended samples do not fit in dtypes traces of the base version
+        are stored in, in which case version has to be written in full.
+        """
+        base_columns: dict[str, list[str]] = self.manifest(base_version)["columns"]
+        df = lf.collect()
+        tail_columns = []
+        for name, blob_hashes in base_columns.items():
+            # base version could have been written with different dtypes, i.e. before columns were narrowed
+            base_dtype = self.__blob_dtype(blob_hashes[0])
+            tail = TraceStore.__narrow(df.get_column(name), base_dtype)
+            if tail.dtype != base_dtype:
+                return False
+            tail_columns.append((name, lambda tail = tail: tail))
+
+        tail_hashes = TraceStore.__write_blobs(tail_columns, self.__write_blob, progress, cancelled)
+        columns = {name: blob_hashes + [tail_hashes[name]] for name, blob_hashes in base_columns.items()}
+        self.__write_manifest(version, {"columns": columns}, source_id, appended_to = base_version)
+        return True
+
+    @staticmethod
+    def __narrow(series: Series, dtype: pl.DataType | DataTypeClass | None) -> Series:
+        return series if dtype is None or series.dtype == dtype else narrow(series, dtype)
+
+    def version_blobs(self, version: int) -> set[str]:
+        """
+        :return: hashes of all blobs the version refers to; empty for versions stored in segments.
+        """
+        return {h for blob_hashes in self.manifest(version).get("columns", {}).values() for h in blob_hashes}
+
+    def is_pruned(self, version: int) -> bool:
+        return self.manifest(version).get("pruned", False)
+
+    def archive_blobs(self,
+                      versions: list[int],
+                      keep: set[str],
+                      delta_encode: bool,
+                      progress: Callable[[float], None] = lambda _: None,
+                      cancelled: Callable[[], bool] = lambda: False) -> None:
+        """
+        Archives blobs of given versions, except for blobs in `keep`, which are meant to stay fast to read. Archived
+        blob takes less space, but is slower to read. Versions stored in segments are left as they are.
+
+        :param delta_encode: archive integer blobs as difference from the same trace in the previous version, which
+        takes a lot less space for traces that change little between versions.
+        :param progress: called with fraction of versions archived so far.
+        :param cancelled: checked between blobs; if it returns True, IngestCancelled is raised. Blobs archived so far
+        stay archived.
+        """
+        archived: set[str] = set()
+        for i, version in enumerate(versions):
+            prev_columns = self.manifest(version - 1).get("columns", {}) if version > 1 else {}
+            for name, blob_hashes in self.manifest(version).get("columns", {}).items():
+                for blob_hash in blob_hashes:
+                    if cancelled():
+                        raise IngestCancelled()
+                    if blob_hash in keep or blob_hash in archived:
+                        continue
+                    # only traces stored in a single blob are diffed, since blobs of appended versions do not align
+                    prev_hashes = prev_columns.get(name, [])
+                    base_hash = prev_hashes[0] if delta_encode and len(blob_hashes) == len(prev_hashes) == 1 else None
+                    self.__archive_blob(blob_hash, base_hash)
+                    archived.add(blob_hash)
+            progress((i + 1) / len(versions))
+
+    def __archive_blob(self, blob_hash: str, base_hash: str | None) -> None:
+        archive_file = self.__blob_files(blob_hash)[-1]
+        if not archive_file.exists():
+            series = self.__read_blob(blob_hash)
+            delta = None
+            if base_hash is not None and base_hash != blob_hash and series.dtype.is_integer() \
+                    and series.dtype != pl.UInt64 and series.null_count() == 0:
+                chain = self.__delta_chain(base_hash)
+                # base must not be based on this blob, and chain must stay short enough to be read quickly
+                if blob_hash not in chain and len(chain) < TraceStore.MAX_DELTA_CHAIN:
+                    base = self.__read_blob(base_hash)
+                    if base.dtype == series.dtype and len(base) == len(series):
+                        delta = series.cast(pl.Int64) - base.cast(pl.Int64)
+
+            if delta is None:
+                self.__write_blob_file(series, archive_file)
+            else:
+                self.__write_blob_file(delta, archive_file, f"{TraceStore.DELTA_COLUMN_PREFIX}{base_hash}")
+
+        with self.lock:
+            for file in self.__blob_files(blob_hash)[:-1]:
+                TraceStore.__remove_file(file)
+
+    @staticmethod
+    def __remove_file(file: Path) -> int:
+        """
+        :return: size of the removed file; 0 if there was no such file or it could not be removed.
+        """
+        try:
+            size = file.stat().st_size
+            file.unlink()
+            return size
+        except FileNotFoundError:
+            return 0
+        except PermissionError:
+            # memory mapped blob can not be removed on Windows while it is in use; it is removed next time
+            return 0
+
+    def prune_version(self, version: int) -> int:
+        """
+        Removes traces of the version. Its manifest is replaced by one that marks it as pruned, so that the version
+        is still known, but has no traces. Blobs are not removed, since other versions might refer to them, see
+        remove_unreferenced_blobs(...).
+        :return: number of bytes freed
+        """
+        with self.lock:
+            version_dir = self.version_dir(version)
+            tmp_file = version_dir / f"{TraceStore.MANIFEST_FILE}.tmp"
+            tmp_file.write_text(json.dumps({"pruned": True}, indent = 2))
+            TraceStore.sync(tmp_file)
+            os.replace(tmp_file, version_dir / TraceStore.MANIFEST_FILE)
+            freed = TraceStore.__remove_file(version_dir / TraceStore.TRACES_FILE)
+            freed += sum(TraceStore.__remove_file(file) for file in version_dir.glob(f"{TraceStore.DERIVED_DIR}/*"))
+
+            self.__manifests.pop(version, None)
+            for key in [k for k in self.__columns if k[0] == version]:
+                self.__columns_bytes -= self.__columns.pop(key).estimated_size()
+            return freed
+
+    def remove_unreferenced_blobs(self, candidates: set[str], latest_version: int) -> int:
+        """
+        Removes those of the `candidates` blobs that no version, including staged ones, refers to and that are not
+        base of any delta blob that is still referred to.
+        :return: number of bytes freed
+        """
+        referenced = set()
+        for version in range(1, latest_version + 1):
+            referenced |= self.version_blobs(version)
+        for manifest_file in self.data_dir.glob(f".*.staging/{TraceStore.MANIFEST_FILE}"):
+            manifest = json.loads(manifest_file.read_text())
+            referenced |= {h for blob_hashes in manifest.get("columns", {}).values() for h in blob_hashes}
+        for blob_hash in list(referenced):
+            referenced.update(self.__delta_chain(blob_hash))
+
+        with self.lock:
+            return sum(
+                TraceStore.__remove_file(file)
+                for blob_hash in candidates - referenced
+                for file in self.__blob_files(blob_hash)
+            )
+
+    def disk_usage(self) -> int:
+        """
+        :return: size, in bytes, of all files of the store.
+        """
+        return sum(f.stat().st_size for f in self.data_dir.rglob("*") if f.is_file())
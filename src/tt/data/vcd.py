@@ -0,0 +1,263 @@
+from array import array
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import BinaryIO, Callable, Iterator
+
+import numpy
+import polars as pl
+from polars import DataFrame, Series
+
+from tt.data.chipscope import BUS_RANGE_REGEX, narrowest_dtype, sign_extend
+from tt.data.trace_store import IngestCancelled
+
+SAMPLE_COLUMN = "Sample in Buffer"
+
+# Value types that can not be represented as a trace
+UNSUPPORTED_VAR_TYPES = {b"event", b"string"}
+
+# Value types that are read as floats
+REAL_VAR_TYPES = {b"real", b"realtime"}
+
+SCALAR_VALUES = {ord("0"): 0, ord("1"): 1, ord("x"): 0, ord("X"): 0, ord("z"): 0, ord("Z"): 0}
+
+# Unknown and high impedance bits of vector values are read as 0
+UNKNOWN_BITS = bytes.maketrans(b"xXzZ", b"0000")
+
+# Number of timestamps between checks for cancellation
+CANCEL_CHECK_INTERVAL = 100_000
+
+
+@dataclass
+class VCDVar:
+    """
+    Variable declared in the VCD header. Several variables can share the same identifier code, in which case they
+    all refer to the same signal.
+    """
+    name: str
+    id_code: bytes
+    width: int
+    is_real: bool
+
+
+@dataclass
+class RunLengthColumn:
+    """
+    Values of a signal at each sample, run-length encoded: value `values[i]` starts at sample `starts[i]` and lasts
+    until the start of the next run. Only changes of the sampled value are recorded, so memory grows with the
+    number of such changes rather than with the size of the file.
+    """
+    is_real: bool
+    starts: array = field(default_factory = lambda: array("Q"))
+    values: array = field(init = False)
+
+    def __post_init__(self):
+        self.values = array("d" if self.is_real else "Q")
+
+    def append(self, start: int, value: int | float) -> None:
+        if len(self.values) == 0 or self.values[-1] != value:
+            self.starts.append(start)
+            self.values.append(value)
+
+    def materialize(self, length: int) -> numpy.ndarray:
+        """
+        :return: value at each of the `length` samples.
+        """
+        starts = numpy.frombuffer(self.starts, dtype = numpy.uint64).astype(numpy.int64)
+        run_lengths = numpy.diff(starts, append = length)
+        return numpy.repeat(numpy.frombuffer(self.values, dtype = self.values.typecode), run_lengths)
+
+
+def tokens(f: BinaryIO) -> Iterator[bytes]:
+    """
+    Whitespace separated tokens of the file. File is read line by line, so it never has to fit in memory.
+    """
+    for line in f:
+        yield from line.split()
+
+
+def skip_to_end(ts: Iterator[bytes]) -> list[bytes]:
+    """
+    :return: tokens up to the closing $end keyword, which is consumed as well.
+    """
+    skipped = []
+    for token in ts:
+        if token == b"$end":
+            break
+        skipped.append(token)
+    return skipped
+
+
+def read_header(ts: Iterator[bytes]) -> list[VCDVar]:
+    """
+    Reads declarations up to and including $enddefinitions. Names of the variables are made of the scope they are
+    declared in and their reference name joined with "/", same as ChipScope does for nets. Buses get bit range
+    appended to the name, if it is not already there, so that column width is known. Real variables are not buses
+    and keep their names.
+    """
+    scopes: list[str] = []
+    variables: list[VCDVar] = []
+    for token in ts:
+        match token:
+            case b"$scope":
+                _, name = skip_to_end(ts)[:2]
+                scopes.append(name.decode())
+            case b"$upscope":
+                skip_to_end(ts)
+                scopes.pop()
+            case b"$var":
+                var_type, width, id_code, *reference = skip_to_end(ts)
+                if var_type in UNSUPPORTED_VAR_TYPES:
+                    continue
+                name = "".join(r.decode() for r in reference)
+                is_real = var_type in REAL_VAR_TYPES
+                # width of real variables is the size of the float, they are not buses
+                if not is_real and int(width) > 1 and BUS_RANGE_REGEX.search(name) is None:
+                    name = f"{name}[{int(width) - 1}:0]"
+                variables.append(VCDVar(
+                    name = "/".join(scopes + [name]),
+                    id_code = id_code,
+                    width = int(width),
+                    is_real = is_real
+                ))
+            case b"$enddefinitions":
+                skip_to_end(ts)
+                return variables
+            case _ if token.startswith(b"$"):
+                # $date, $version, $timescale, $comment
+                skip_to_end(ts)
+    raise RuntimeError("VCD file has no $enddefinitions section")
+
+
+def read_vcd(file: Path,
+             clock: str | None = None,
+             sample_period: int | None = None,
+             signed_columns: list[str] | None = None,
+             cancelled: Callable[[], bool] = lambda: False) -> DataFrame:
+    """
+    :return: all columns of the VCD file, see sample_vcd(...) for the meaning of parameters.
+    """
+    return pl.DataFrame([
+        read_column() for _, read_column in sample_vcd(file, clock, sample_period, signed_columns, cancelled)
+    ])
+
+
+def sample_vcd(file: Path,
+               clock: str | None = None,
+               sample_period: int | None = None,
+               signed_columns: list[str] | None = None,
+               cancelled: Callable[[], bool] = lambda: False) -> list[tuple[str, Callable[[], Series]]]:
+    """
+    Streams value changes from the VCD file and samples them into columns, one per declared variable. Sampled
+    values are kept run-length encoded and each column is expanded only when it is read, so that only one column at
+    a time has to fit in memory.
+
+    If `clock` is given, samples are taken at each rising edge of that variable, capturing values just before the
+    edge, which is what an ILA core would have captured. Otherwise, if `sample_period` is given, samples are taken
+    every `sample_period` time units starting from the first timestamp. Otherwise, each timestamp in the file is
+    one sample. Unknown and high impedance bits (x and z) are read as 0. Buses wider than 64 bits are not loaded.
+
+    :param signed_columns: names of columns holding signed buses; these are decoded as two's complement.
+    :param cancelled: polled while reading; if it returns True, reading stops and IngestCancelled is raised.
+    :return: name of each column and function that reads its values.
+    """
+    signed_columns = [] if signed_columns is None else signed_columns
+    with file.open("rb") as f:
+        ts = tokens(f)
+        variables = [v for v in read_header(ts) if v.width <= 64 or v.is_real]
+
+        columns = {v.id_code: RunLengthColumn(is_real = v.is_real) for v in variables}
+        current: dict[bytes, int | float] = {id_code: 0 for id_code in columns}
+        changed: set[bytes] = set(columns)  # signals that changed since the last sample
+        sample = 0
+
+        clock_id = None
+        if clock is not None:
+            clock_ids = [v.id_code for v in variables if v.name == clock]
+            if clock_ids == []:
+                raise ValueError(f"Clock \"{clock}\" is not declared in {file}")
+            clock_id = clock_ids[0]
+
+        def take_samples(n: int) -> None:
+            nonlocal sample
+            if n > 0:
+                for id_code in changed:
+                    columns[id_code].append(sample, current[id_code])
+                changed.clear()
+                sample += n
+
+        def apply(changes: list[tuple[bytes, int | float]]) -> None:
+            for id_code, value in changes:
+                current[id_code] = value
+                changed.add(id_code)
+
+        # Changes are collected per timestamp (block) and applied when the next timestamp starts
+        block: list[tuple[bytes, int | float]] = []
+        block_time: int | None = None
+        first_time: int | None = None
+
+        def end_block(next_time: int | None) -> None:
+            if clock_id is not None:
+                clock_values = [value for id_code, value in block if id_code == clock_id]
+                if block_time is not None and clock_values != [] and current[clock_id] == 0 and clock_values[-1] == 1:
+                    take_samples(1)
+                apply(block)
+            else:
+                apply(block)
+                if block_time is not None:
+                    if sample_period is None:
+                        take_samples(1)
+                    else:
+                        # samples on the grid in [block_time, next_time), i.e. while values stay as they are now
+                        end = block_time + 1 if next_time is None else next_time
+                        take_samples(
+                            -((first_time - end) // sample_period) - -((first_time - block_time) // sample_period)
+                        )
+            block.clear()
+
+        timestamps = 0
+        for token in ts:
+            c = token[0]
+            if c == ord("#"):
+                timestamps += 1
+                if timestamps % CANCEL_CHECK_INTERVAL == 0 and cancelled():
+                    raise IngestCancelled()
+                time = int(token[1:])
+                end_block(time)
+                block_time = time
+                first_time = time if first_time is None else first_time
+            elif c in SCALAR_VALUES:
+                if token[1:] in columns:
+                    block.append((token[1:], SCALAR_VALUES[c]))
+            elif c in b"bB":
+                id_code = next(ts)
+                if id_code in columns:
+                    block.append((id_code, int(token[1:].translate(UNKNOWN_BITS), 2)))
+            elif c in b"rR":
+                id_code = next(ts)
+                if id_code in columns:
+                    block.append((id_code, float(token[1:])))
+            elif token == b"$comment":
+                skip_to_end(ts)
+            # other keywords, i.e. $dumpvars, $dumpall, $dumpon, $dumpoff and $end, only group value changes
+        end_block(None)
+
+    def read_column(v: VCDVar) -> Series:
+        values = pl.Series(v.name, columns[v.id_code].materialize(sample))
+        if v.is_real:
+            return values
+        elif v.name in signed_columns and v.width < 64:
+            transform = sign_extend(pl.col(v.name).cast(pl.Int64), v.width)
+            return values.to_frame().select(transform.cast(narrowest_dtype(v.width, signed = True))).to_series()
+        else:
+            return values.cast(narrowest_dtype(v.width, signed = v.name in signed_columns))
+
+    names_seen = set()
+    readers: list[tuple[str, Callable[[], Series]]] = [
+        (SAMPLE_COLUMN, lambda: pl.Series(SAMPLE_COLUMN, numpy.arange(sample, dtype = numpy.int64)))
+    ]
+    for v in variables:
+        if v.name in names_seen or v.name == SAMPLE_COLUMN:
+            continue
+        names_seen.add(v.name)
+        readers.append((v.name, lambda v = v: read_column(v)))
+    return readers
@@ -5,6 +5,7 @@ from pathlib import Path
 from typing import Any, override
 
 from tt.data.domain_type import DomainType
+from tt.data.metadata_db import MetadataDB
 
 
 class Persisting(ABC):
@@ -410,23 +411,29 @@ class Views(Persisting):
     def __init__(self, views: list[ViewSpec] | None = None):
         self.__views: list[ViewSpec] = [] if views is None else views
         self.__source_file: Path | None = None
+        self.__db: MetadataDB | None = None
 
     def __repr__(self):
-        return json.dumps(self.__to_list(), indent = 2)
+        return json.dumps(self.to_list(), indent = 2)
 
-    def __to_list(self) -> list[Any]:
+    def to_list(self) -> list[Any]:
         return [v.to_dic() for v in self.__views]
 
     @override
     def persist(self, dst_file: Path | None = None) -> None:
         file = self.__source_file if dst_file is None else dst_file
         self.__source_file = file
-        if self.__source_file is not None:
-            self.__source_file.write_text(json.dumps(self.__to_list(), indent = 2))
+        if self.__db is not None and dst_file is None:
+            self.__db.replace_views(self.to_list())
+        elif self.__source_file is not None:
+            self.__source_file.write_text(json.dumps(self.to_list(), indent = 2))
 
     @staticmethod
     def from_json(src: str) -> "Views":
-        data = json.loads(src)
+        return Views.from_list(json.loads(src))
+
+    @staticmethod
+    def from_list(data: list[dict[str, Any]]) -> "Views":
         views_specs = []
         for view_spec_data in data:
             views_specs.append(ViewSpec.from_dict(view_spec_data))
@@ -444,9 +451,21 @@ class Views(Persisting):
         views.__source_file = file
         return views
 
+    @staticmethod
+    def from_db(db: MetadataDB) -> "Views":
+        views = Views.from_list(db.views())
+        views.__db = db
+        return views
+
     def get_view_spec_names(self) -> list[str]:
         return [v.name for v in self.__views]
 
+    def trace_versions(self) -> set[int]:
+        """
+        :return: versions of traces shown in any of the views.
+        """
+        return {ts["trace_version"] for vs in self.to_list() for sp in vs["sub_plots"] for ts in sp["traces"]}
+
     def add_view_spec(self, vs: ViewSpec) -> ViewSpec:
         if vs.name in self.get_view_spec_names():
             raise RuntimeError(f"View [{vs.name}] already exists")
@@ -16,7 +16,7 @@ class App:
         self.config = app_persistence.config
         self.state = app_persistence.state
         self.project: Optional[Project] = None
-        self.__ref_change_id: float | None = None
+        self.__ref_change_id: str | None = None
         self.taces_views_change_id: int = 0
 
         self.exit_application: Callable[[], bool] = lambda: True
@@ -32,6 +32,14 @@ class App:
         self.notify_views_require_change: Callable[[], None] = lambda: None
         self.notify_project_panel_on_project_load: Callable[[], None] = lambda: None
         self.edit_view: Callable[[str], None] = lambda _: None
+        self.watch_trace_source: Callable[[], None] = lambda: None
+        self.load_traces_in_background: Callable[[], None] = lambda: None
+        self.cancel_loading_traces: Callable[[], None] = lambda: None
+        self.compact_project_in_background: Callable[[], None] = lambda: None
+        self.show_ingest_progress: Callable[[int, str], None] = lambda percent, message: None
+        self.hide_ingest_progress: Callable[[], None] = lambda: None
+        # defers writing of traces config; by default it is written right away
+        self.schedule_config_flush: Callable[[Callable[[], None]], None] = lambda flush: flush()
 
         self.main_window: Callable[[], MainWindow] = lambda: None  # pyright: ignore [reportAttributeAccessIssue]
         self.super_parent: Callable[[], QWidget] = lambda: None  # pyright: ignore [reportAttributeAccessIssue]
@@ -41,6 +49,10 @@ class App:
         self.close_all_plots: Callable[[], None] = lambda: None
 
     def set_new_open_project(self, project: Project | None) -> None:
+        if self.project is not None:
+            self.project.traces_config.flush()
+        if project is not None:
+            project.traces_config.write_behind = lambda flush: self.schedule_config_flush(flush)
         self.project = project
         if project is None:
             self.set_opened_project_label("")
@@ -57,15 +69,17 @@ class App:
             self.notify_tables_require_change()
             self.notify_project_panel_on_project_load()
             self.reload_traces_menu_enable()
-            self.set_reference_change_id(project.trace_source.change_id())
+            # compared with the content that was loaded last, without reading the source here
+            self.set_reference_change_id(None)
             self.app_persistence.config.set_value("last_opened_project", project.name)
             self.project_opened_menus_enabled()
         self.notify_views_require_change()
+        self.watch_trace_source()
 
-    def set_reference_change_id(self, change_id: float) -> None:
+    def set_reference_change_id(self, change_id: str | None) -> None:
         self.__ref_change_id = change_id
 
-    def get_reference_change_id(self) -> float | None:
+    def get_reference_change_id(self) -> str | None:
         return self.__ref_change_id
 
     def mk_help_tool_button(self) -> QToolButton:
@@ -10,6 +10,11 @@ from tt.gui.main_window import TTMainWindow
 
 
 def main():
+    if len(sys.argv) > 1 and sys.argv[1] == "import":
+        # headless bulk import, see tt.importer
+        from tt.importer import main as import_main
+        sys.exit(import_main(sys.argv[2:]))
+
     app = QApplication(sys.argv)
     tt_png = Path(__file__).parent / "tt.png"
     app.setWindowIcon(QIcon(f"{tt_png.absolute()}"))
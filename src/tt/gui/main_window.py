@@ -1,7 +1,10 @@
+import os
+import threading
 from dataclasses import dataclass
 from pathlib import Path
+from typing import Callable
 
-from PySide6.QtCore import Signal, QTimer, QMutex, QPoint
+from PySide6.QtCore import Signal, QTimer, QMutex, QPoint, QFileSystemWatcher
 from PySide6.QtGui import QIcon
 from PySide6.QtWidgets import QMessageBox, QTabWidget, QLabel, QWidget
 from pytide6 import MainWindow, set_geometry, VBoxPanel, Dialog, VBoxLayout
@@ -9,6 +12,7 @@ from pytide6.buttons import PushButton
 from pytide6.panel_widget import W, HBoxPanel
 from sprats.config import AppPersistence
 
+from tt.data.project import Project
 from tt.data.trace import TraceState
 from tt.gui.app import App
 from tt.gui.help.help_window import HelpWindow
@@ -20,24 +24,21 @@ from tt.gui.panels.views_panel import ViewsPanel
 
 
 class TracesChangedDialog(Dialog):
-    def __init__(self, parent: "TTMainWindow", app: App):
+    def __init__(self, parent: "TTMainWindow", app: App, change_id: str):
+        """
+        :param change_id: change id of the source as it is now; source is not reported again until it changes from it
+        """
         super().__init__(parent, windowTitle = "Reload Traces", modal = True)
 
         def on_yes():
-            try:
-                assert app.project is not None
-                traces_loaded, change_id = app.project.load_traces()
-                if traces_loaded:
-                    app.set_showing_version_label(f"Traces Version #{app.project.latest_traces_version}")
-                    app.set_reference_change_id(change_id)
-            finally:
-                self.close()
-                parent.unblock_scanner()
+            self.close()
+            # scanner stays blocked until traces are loaded
+            app.load_traces_in_background()
 
         def on_no():
             self.close()
             assert app.project is not None
-            app.set_reference_change_id(app.project.trace_source.change_id(live = True))
+            app.set_reference_change_id(change_id)
             parent.unblock_scanner()
 
         yes_button = PushButton("Yes", on_clicked = on_yes)
@@ -53,9 +54,19 @@ class Icons:
 
 
 class TTMainWindow(MainWindow):
+    # Source file is considered completely written once its size and mtime stayed the same for this long
+    SOURCE_SETTLE_INTERVAL_MS = 250
+
+    # Changes to traces config made within this interval of each other are written to the disk together
+    CONFIG_FLUSH_DELAY_MS = 200
+
     signal_show_error = Signal(str)
     signal_prompt_user_to_reload_traces = Signal()
     signal_show_help = Signal(QWidget, str, QPoint)
+    signal_ingest_progress = Signal(int, str)
+    signal_traces_loaded = Signal(object, bool, str)
+    signal_project_compacted = Signal()
+    signal_source_checked = Signal(object, object, bool, str)
 
     def __init__(self, screen_dim: tuple[int, int], app_persistence: AppPersistence):
         super().__init__(objectName = "MainWindow", windowTitle = "Trace Tool")
@@ -97,12 +108,50 @@ class TTMainWindow(MainWindow):
             )
         )
 
+        self.__scanner_go = True
+
+        # Changes to the trace source files are picked up from file system notifications (inotify on Linux).
+        # Directories are watched as well, since Vivado might replace the file rather than write into it.
+        self.source_watcher = QFileSystemWatcher()
+        self.source_watcher.fileChanged.connect(self.on_source_file_event)
+        self.source_watcher.directoryChanged.connect(self.on_source_file_event)
+        self.source_settle_timer = QTimer()
+        self.source_settle_timer.setSingleShot(True)
+        self.source_settle_timer.setInterval(TTMainWindow.SOURCE_SETTLE_INTERVAL_MS)
+        self.source_settle_timer.timeout.connect(self.on_source_settled)
+        self.__source_files_stat: list[tuple[int, int] | None] | None = None
+
+        # Content of the source is compared with the reference in a separate thread, since it means reading source
+        # files in full. It is only compared if size or mtime of the files differ from those it was last compared at.
+        self.__source_check_thread: threading.Thread | None = None
+        self.__checked_source_files_stat: list[tuple[int, int] | None] | None = None
+        self.__source_change_id = ""
+        self.signal_source_checked.connect(self.on_source_checked)
+
+        # Polling is only used for files that cannot be watched
         self.scanner_timer = QTimer()
         self.scanner_timer.timeout.connect(self.scan_for_traces_change)
         self.scanner_timer.setSingleShot(False)
         self.scanner_timer.setInterval(1000)
-        self.scanner_timer.start()
-        self.__scanner_go = True
+
+        self.app.watch_trace_source = self.watch_trace_source
+
+        # Traces are loaded in a separate thread, which reports back through signals
+        self.__ingest_thread: threading.Thread | None = None
+        self.__ingest_cancelled = threading.Event()
+        self.signal_ingest_progress.connect(lambda percent, message: self.app.show_ingest_progress(percent, message))
+        self.signal_traces_loaded.connect(self.on_traces_loaded)
+        self.signal_project_compacted.connect(self.on_project_compacted)
+        self.app.load_traces_in_background = self.load_traces_in_background
+        self.app.compact_project_in_background = self.compact_project_in_background
+        self.app.cancel_loading_traces = self.__ingest_cancelled.set
+
+        self.__config_flush: Callable[[], None] | None = None
+        self.config_flush_timer = QTimer()
+        self.config_flush_timer.setSingleShot(True)
+        self.config_flush_timer.setInterval(TTMainWindow.CONFIG_FLUSH_DELAY_MS)
+        self.config_flush_timer.timeout.connect(self.flush_config)
+        self.app.schedule_config_flush = self.schedule_config_flush
 
     def is_scanner_allowed(self) -> bool:
         self.sync_mutex.lock()
@@ -125,11 +174,149 @@ class TTMainWindow(MainWindow):
         finally:
             self.sync_mutex.unlock()
 
+        # source might have changed again while scanner was blocked
+        self.source_settle_timer.start()
+
+    def watch_trace_source(self) -> None:
+        """
+        Starts watching files of the trace source of the opened project, if any, and stops watching everything else.
+        """
+        watched = self.source_watcher.files() + self.source_watcher.directories()
+        if watched != []:
+            self.source_watcher.removePaths(watched)
+        self.scanner_timer.stop()
+        self.__checked_source_files_stat = None
+
+        if self.app.project is not None:
+            files = [f"{file.absolute()}" for file in self.app.project.trace_source.watched_files()]
+            directories = sorted({f"{Path(file).parent}" for file in files})
+            not_watched = self.source_watcher.addPaths(files + directories) if files != [] else []
+            if any(file in not_watched for file in files):
+                self.scanner_timer.start()
+
+    def __stat_source_files(self) -> list[tuple[int, int] | None]:
+        stats = []
+        for file in self.app.project.trace_source.watched_files() if self.app.project is not None else []:
+            try:
+                stat = os.stat(file)
+                stats.append((stat.st_size, stat.st_mtime_ns))
+            except OSError:
+                stats.append(None)
+        return stats
+
+    def on_source_file_event(self, _: str) -> None:
+        # file that was deleted and re-created drops out of the watcher and has to be added again
+        if self.app.project is not None:
+            watched_files = self.source_watcher.files()
+            for file in self.app.project.trace_source.watched_files():
+                if f"{file.absolute()}" not in watched_files and file.exists():
+                    self.source_watcher.addPath(f"{file.absolute()}")
+
+        # (re)start settle timer; files are checked once they are no longer being written to
+        self.source_settle_timer.start()
+
+    def on_source_settled(self) -> None:
+        stats = self.__stat_source_files()
+        if stats != self.__source_files_stat:
+            # still being written to, check again later
+            self.__source_files_stat = stats
+            self.source_settle_timer.start()
+        else:
+            self.__source_files_stat = None
+            self.scan_for_traces_change()
+
+    def load_traces_in_background(self) -> None:
+        """
+        Loads traces of the opened project from its source without blocking the UI. Progress is shown in the info
+        panel and loading can be cancelled from there. New version becomes visible only once it is fully loaded.
+        """
+        project = self.app.project
+        if project is None or self.__ingest_thread is not None:
+            return
+
+        self.block_scanner()
+        self.app.reload_traces_menu_disable()
+        self.app.show_ingest_progress(0, "Loading traces")
+        self.__ingest_cancelled.clear()
+
+        def ingest():
+            try:
+                traces_loaded, change_id = project.load_traces(
+                    progress = self.signal_ingest_progress.emit, cancelled = self.__ingest_cancelled.is_set
+                )
+                self.signal_traces_loaded.emit(project, traces_loaded, change_id)
+            except Exception as ex:
+                self.signal_show_error.emit(f"Error loading traces. {ex}")
+                self.signal_traces_loaded.emit(project, False, "")
+
+        self.__ingest_thread = threading.Thread(target = ingest, name = "traces-ingest", daemon = True)
+        self.__ingest_thread.start()
+
+    def on_traces_loaded(self, project: Project, traces_loaded: bool, change_id: str) -> None:
+        self.__ingest_thread = None
+        self.app.hide_ingest_progress()
+        self.app.reload_traces_menu_enable()
+
+        # user might have opened another project while traces were loading
+        if traces_loaded and project is self.app.project:
+            self.app.set_showing_version_label(f"Traces Version #{project.latest_traces_version}")
+            self.app.set_reference_change_id(change_id)
+            self.app.notify_tables_require_change()
+        self.unblock_scanner()
+
+        if traces_loaded and project is self.app.project and project.retention.automatic:
+            self.compact_project_in_background()
+
+    def compact_project_in_background(self) -> None:
+        """
+        Applies retention policy of the opened project, see Project.compact(...), without blocking the UI. Runs in
+        place of loading of traces, so that the two never run at once, and is shown and cancelled the same way.
+        """
+        project = self.app.project
+        if project is None or self.__ingest_thread is not None:
+            return
+
+        self.block_scanner()
+        self.app.reload_traces_menu_disable()
+        self.app.show_ingest_progress(0, "Compacting project")
+        self.__ingest_cancelled.clear()
+
+        def compact():
+            try:
+                project.compact(progress = self.signal_ingest_progress.emit, cancelled = self.__ingest_cancelled.is_set)
+            except Exception as ex:
+                self.signal_show_error.emit(f"Error compacting project. {ex}")
+            self.signal_project_compacted.emit()
+
+        self.__ingest_thread = threading.Thread(target = compact, name = "project-compact", daemon = True)
+        self.__ingest_thread.start()
+
+    def on_project_compacted(self) -> None:
+        self.__ingest_thread = None
+        self.app.hide_ingest_progress()
+        self.app.reload_traces_menu_enable()
+        # versions might have been pruned
+        self.app.notify_tables_require_change()
+        self.unblock_scanner()
+
+    def schedule_config_flush(self, flush: Callable[[], None]) -> None:
+        self.__config_flush = flush
+        self.config_flush_timer.start()
+
+    def flush_config(self) -> None:
+        self.config_flush_timer.stop()
+        if self.__config_flush is not None:
+            flush, self.__config_flush = self.__config_flush, None
+            try:
+                flush()
+            except Exception as ex:
+                self.show_error(f"Failed to save traces config. {ex}")
+
     def show_error(self, message: str) -> None:
         QMessageBox.critical(self, "Error", message)
 
     def show_prompt_for_trace_reload(self) -> None:
-        TracesChangedDialog(self, self.app).show()
+        TracesChangedDialog(self, self.app, self.__source_change_id).show()
 
     def show_help(self, parent: QWidget, help_name: str, pos: QPoint) -> None:
         window = HelpWindow(parent, help_name)
@@ -152,15 +339,62 @@ class TTMainWindow(MainWindow):
             window.move(pos)
 
     def scan_for_traces_change(self) -> None:
+        """
+        Only size and mtime of the source files are looked at here, on the GUI thread. If they differ from those at
+        which source was last checked, its content is compared with the reference in a background thread, see
+        on_source_checked(...).
+        """
+        project = self.app.project
         try:
             watch_for_source_changes = self.app.config.get_value("watch_for_source_changes", bool) or False
-            if (watch_for_source_changes and self.app.project is not None and self.is_scanner_allowed()
-                    and self.app.project.trace_source.has_changed(change_id_ref = self.app.get_reference_change_id())):
-                self.block_scanner()
-                self.signal_prompt_user_to_reload_traces.emit()
         except:
-            pass
+            return
+        if (not watch_for_source_changes or project is None or not self.is_scanner_allowed()
+                or self.__source_check_thread is not None):
+            return
+
+        stats = self.__stat_source_files()
+        if stats == self.__checked_source_files_stat:
+            return
+
+        change_id_ref = self.app.get_reference_change_id()
+
+        def check():
+            try:
+                changed = project.trace_source.has_changed(change_id_ref = change_id_ref)
+                change_id = project.trace_source.change_id(live = True) if changed else ""
+                self.signal_source_checked.emit(project, stats, changed, change_id)
+            except:
+                # source might be in the middle of being replaced; it is checked again once it changes
+                self.signal_source_checked.emit(project, None, False, "")
+
+        self.__source_check_thread = threading.Thread(target = check, name = "source-check", daemon = True)
+        self.__source_check_thread.start()
+
+    def on_source_checked(self,
+                          project: Project,
+                          stats: list[tuple[int, int] | None] | None,
+                          changed: bool,
+                          change_id: str) -> None:
+        self.__source_check_thread = None
+        # user might have opened another project while source was checked
+        if project is not self.app.project:
+            return
+
+        if not changed:
+            self.__checked_source_files_stat = stats
+            if stats != self.__stat_source_files():
+                # source changed again while it was checked
+                self.source_settle_timer.start()
+        elif self.is_scanner_allowed():
+            # otherwise traces are being loaded; source is checked again once they are
+            self.__checked_source_files_stat = stats
+            self.block_scanner()
+            self.__source_change_id = change_id
+            self.signal_prompt_user_to_reload_traces.emit()
 
     def closeEvent(self, event):
+        self.__ingest_cancelled.set()
+        self.flush_config()
         super().closeEvent(event)
         self.app.close_all_plots()
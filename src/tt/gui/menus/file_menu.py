@@ -25,15 +25,10 @@ class FileMenu(QMenu):
 
         self.addAction("&Open Project", open_existing_project)
 
-        def reload_traces_from_source():
-            assert app.project is not None
-            if app.project.load_traces():
-                # traces were reloaded
-                app.set_showing_version_label(f"Traces Version #{app.project.latest_traces_version}")
-
         # noinspection PyTypeChecker
         reload_trs_action: QAction = self.addAction("&Reload traces from source",
-                                                    reload_traces_from_source)  # pyright: ignore [reportAssignmentType]
+                                                    lambda: app.load_traces_in_background()
+                                                    )  # pyright: ignore [reportAssignmentType]
 
         reload_trs_action.setEnabled(False)
         app.reload_traces_menu_enable = lambda: reload_trs_action.setEnabled(True)
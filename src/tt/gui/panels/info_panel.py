@@ -1,5 +1,6 @@
-from PySide6.QtWidgets import QHBoxLayout, QLabel
+from PySide6.QtWidgets import QHBoxLayout, QLabel, QProgressBar
 from pytide6 import Panel, RichTextLabel
+from pytide6.buttons import PushButton
 
 from tt.gui.app import App
 
@@ -10,10 +11,33 @@ class InfoPanel(Panel[QHBoxLayout]):
         self.opened_project_label = RichTextLabel("")
         self.showing_version_label = QLabel("")
 
+        # shown only while traces are being loaded
+        self.ingest_progress_bar = QProgressBar()
+        self.ingest_progress_bar.setRange(0, 100)
+        self.ingest_progress_bar.setMaximumWidth(300)
+        self.ingest_progress_bar.setVisible(False)
+        self.ingest_cancel_button = PushButton("Cancel", on_clicked = lambda: app.cancel_loading_traces())
+        self.ingest_cancel_button.setVisible(False)
+
         self.layout().addWidget(self.opened_project_label)
         self.layout().addStretch(stretch = 1)
+        self.layout().addWidget(self.ingest_progress_bar)
+        self.layout().addWidget(self.ingest_cancel_button)
         self.layout().addWidget(self.showing_version_label)
 
         # connect dispatching methods in App to relevant functions
         app.set_opened_project_label = self.opened_project_label.setText
         app.set_showing_version_label = self.showing_version_label.setText
+        app.show_ingest_progress = self.show_ingest_progress
+        app.hide_ingest_progress = self.hide_ingest_progress
+
+    def show_ingest_progress(self, percent: int, message: str) -> None:
+        self.ingest_progress_bar.setValue(percent)
+        self.ingest_progress_bar.setFormat(f"{message} %p%")
+        self.ingest_progress_bar.setVisible(True)
+        self.ingest_cancel_button.setEnabled(True)
+        self.ingest_cancel_button.setVisible(True)
+
+    def hide_ingest_progress(self) -> None:
+        self.ingest_progress_bar.setVisible(False)
+        self.ingest_cancel_button.setVisible(False)
@@ -1,9 +1,10 @@
 from PySide6.QtCore import Qt
-from PySide6.QtWidgets import QLineEdit, QTextEdit, QLabel, QComboBox
+from PySide6.QtWidgets import QLineEdit, QTextEdit, QLabel, QComboBox, QSpinBox, QCheckBox
 from pytide6 import VBoxPanel, HBoxPanel, Label, Dialog, LineTextInput, VBoxLayout
 from pytide6.buttons import PushButton
 from pytide6.widget_wrapper import W
 
+from tt.data.project import RetentionPolicy
 from tt.data.punits import Duration, Frequency, FrequencyUnit
 from tt.gui.app import App
 
@@ -124,7 +125,78 @@ class RenameProjectDialog(Dialog):
         ]))
 
 
+class RetentionDialog(Dialog):
+    def __init__(self, parent, app: App):
+        super().__init__(parent, windowTitle = "Old versions of traces", modal = True)
+
+        assert app.project is not None
+        retention = app.project.retention
+
+        keep_latest_input = QSpinBox()
+        keep_latest_input.setRange(2, 1_000_000)
+        keep_latest_input.setValue(retention.keep_latest)
+        delta_encode_checkbox = QCheckBox("Store integer traces as difference from the previous version")
+        delta_encode_checkbox.setChecked(retention.delta_encode)
+        disk_budget_input = QLineEdit("" if retention.disk_budget_mb is None else f"{retention.disk_budget_mb}")
+        disk_budget_input.setPlaceholderText("No limit")
+        pinned_versions_input = QLineEdit(", ".join(f"{v}" for v in app.project.pinned_versions))
+        pinned_versions_input.setMinimumWidth(300)
+        automatic_checkbox = QCheckBox("Compact each time traces are loaded")
+        automatic_checkbox.setChecked(retention.automatic)
+
+        def update_retention() -> bool:
+            assert app.project is not None
+            try:
+                disk_budget = disk_budget_input.text().strip()
+                pinned_versions = [int(v) for v in pinned_versions_input.text().split(",") if v.strip() != ""]
+                app.project.retention = RetentionPolicy(
+                    keep_latest = keep_latest_input.value(),
+                    delta_encode = delta_encode_checkbox.isChecked(),
+                    disk_budget_mb = None if disk_budget == "" else int(disk_budget),
+                    automatic = automatic_checkbox.isChecked()
+                )
+                app.project.pinned_versions = pinned_versions
+                return True
+            except ValueError as ex:
+                app.show_error(f"Invalid retention settings. {ex}")
+                return False
+
+        def on_ok():
+            if update_retention():
+                self.close()
+
+        def on_compact():
+            if update_retention():
+                app.compact_project_in_background()
+                self.close()
+
+        self.setLayout(VBoxLayout([
+            HBoxPanel([QLabel("Keep latest versions as they are"), keep_latest_input]),
+            QLabel("Older versions are recompressed to take less disk space."),
+            delta_encode_checkbox,
+            HBoxPanel([QLabel("Disk budget [MB]"), disk_budget_input]),
+            QLabel("Oldest versions are removed, unless pinned or shown in a view, to fit in the budget."),
+            HBoxPanel([QLabel("Pinned versions"), pinned_versions_input]),
+            automatic_checkbox,
+            HBoxPanel([
+                W(HBoxPanel(), stretch = 1),
+                PushButton("Compact Now", on_clicked = on_compact),
+                PushButton("Ok", on_clicked = on_ok, auto_default = True),
+                PushButton("Cancel", on_clicked = lambda: self.close())
+            ])
+        ]))
+
+
 class ProjectPanel(VBoxPanel):
+    STORAGE_FORMATS = {
+        "parquet": "Compressed (parquet)",
+        "ipc": "Memory mapped (Arrow IPC)",
+    }
+    METADATA_STORES = {
+        "json": "Files (json)",
+        "sqlite": "Database (SQLite)",
+    }
+
     def __init__(self, app: App):
         super().__init__(margins = 0)
         self.app = app
@@ -151,6 +223,43 @@ class ProjectPanel(VBoxPanel):
             on_clicked = lambda: ChangeDTDialog(self, self.app).show()
         )
 
+        storage_format_combo = QComboBox()
+        for storage_format, title in ProjectPanel.STORAGE_FORMATS.items():
+            storage_format_combo.addItem(title, storage_format)
+        storage_format_combo.setEnabled(False)
+
+        def change_storage_format(index: int):
+            if app.project is not None and app.project.storage_format != storage_format_combo.itemData(index):
+                try:
+                    app.project.storage_format = storage_format_combo.itemData(index)
+                except Exception as ex:
+                    app.show_error(f"Failed to change storage format. {ex}")
+                    return
+                # traces that are already stored are converted in background
+                app.compact_project_in_background()
+
+        storage_format_combo.currentIndexChanged.connect(change_storage_format)
+
+        metadata_store_combo = QComboBox()
+        for metadata_store, title in ProjectPanel.METADATA_STORES.items():
+            metadata_store_combo.addItem(title, metadata_store)
+        metadata_store_combo.setEnabled(False)
+
+        def change_metadata_store(index: int):
+            if app.project is not None and app.project.metadata_store != metadata_store_combo.itemData(index):
+                try:
+                    app.project.metadata_store = metadata_store_combo.itemData(index)
+                except Exception as ex:
+                    app.show_error(f"Failed to change metadata storage. {ex}")
+
+        metadata_store_combo.currentIndexChanged.connect(change_metadata_store)
+
+        retention_b = PushButton(
+            "Configure",
+            enabled = app.project is not None,
+            on_clicked = lambda: RetentionDialog(self, self.app).show()
+        )
+
         self.description_edit = QTextEdit("")
         self.description_edit.textChanged.connect(self.record_change_in_description)
         self.description_edit.setEnabled(False)
@@ -168,6 +277,18 @@ class ProjectPanel(VBoxPanel):
                 HBoxPanel([Label("Implied time step"), dt_line_edit, change_dt_b]),
                 alignment = Qt.AlignmentFlag.AlignLeft
             ),
+            W(
+                HBoxPanel([Label("Traces storage"), storage_format_combo]),
+                alignment = Qt.AlignmentFlag.AlignLeft
+            ),
+            W(
+                HBoxPanel([Label("Metadata storage"), metadata_store_combo]),
+                alignment = Qt.AlignmentFlag.AlignLeft
+            ),
+            W(
+                HBoxPanel([Label("Old versions"), retention_b]),
+                alignment = Qt.AlignmentFlag.AlignLeft
+            ),
             VBoxPanel([QLabel("Description"), self.description_edit]),
         )
 
@@ -179,10 +300,19 @@ class ProjectPanel(VBoxPanel):
             rename_project_b.setEnabled(app.project is not None)
             self.description_edit.setEnabled(app.project is not None)
             change_dt_b.setEnabled(app.project is not None)
+            storage_format_combo.setEnabled(app.project is not None)
+            metadata_store_combo.setEnabled(app.project is not None)
+            retention_b.setEnabled(app.project is not None)
 
             if app.project is not None:
                 self.description_edit.setText(app.project.description)
                 project_directory_line_edit.setText(f"{app.project.project_dir}")
+                storage_format_combo.blockSignals(True)
+                storage_format_combo.setCurrentIndex(storage_format_combo.findData(app.project.storage_format))
+                storage_format_combo.blockSignals(False)
+                metadata_store_combo.blockSignals(True)
+                metadata_store_combo.setCurrentIndex(metadata_store_combo.findData(app.project.metadata_store))
+                metadata_store_combo.blockSignals(False)
                 app.set_opened_project_label(
                     f"Project <em><b>{app.project.name}</b></em> tracking file "
                     f"<em><b>{app.project.trace_source.uri()}</b></em>"
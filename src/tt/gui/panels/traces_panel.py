@@ -3,8 +3,8 @@ from functools import cache
 from typing import override, Any
 
 from PySide6.QtCore import QAbstractTableModel, Qt, QModelIndex, QPersistentModelIndex
-from PySide6.QtGui import QContextMenuEvent, QColor
-from PySide6.QtWidgets import QTableView, QHeaderView, QAbstractItemView, QMenu, QMessageBox, QLabel
+from PySide6.QtGui import QContextMenuEvent, QColor, QFont
+from PySide6.QtWidgets import QTableView, QHeaderView, QAbstractItemView, QMenu, QMessageBox, QLabel, QCheckBox
 from pytide6 import VBoxPanel, Dialog, VBoxLayout, HBoxPanel, LineTextInput, RichTextLabel
 from pytide6.buttons import PushButton
 from pytide6.inputs import FloatTextInput
@@ -95,6 +95,9 @@ class TraceLabelChangeDialog(Dialog):
 
 class TracesFrameModel(QAbstractTableModel):
     DERIVATIVE_TRACE_COLOR = QColor("red")
+    # traces that changed since the previous version
+    CHANGED_TRACE_BACKGROUND = QColor("#fff3c4")
+    SUMMARY_KEYS = ["len", "null_count", "min", "max", "mean"]
 
     def __init__(self, app: App, trace_state: TraceState):
         super().__init__()
@@ -131,6 +134,38 @@ class TracesFrameModel(QAbstractTableModel):
         assert self.app.project is not None
         return [t for t in self.app.project.traces(-1) if t.state == self.trace_state]
 
+    @cache
+    def __changed(self, project_name: str, trace_version: int, change_id: int) -> set[str]:
+        assert self.app.project is not None
+        if trace_version < 2 or self.app.project.store.is_pruned(trace_version - 1):
+            return set()
+        else:
+            return set(self.app.project.changed_traces(-2, -1))
+
+    def is_changed(self, row: int) -> bool:
+        """
+        :return: True if trace in the row changed since the previous version.
+        """
+        assert self.app.project is not None
+        changed = self.__changed(
+            self.app.project.name, self.app.project.latest_traces_version, self.app.taces_views_change_id
+        )
+        return self.__tdata(
+            self.app.project.name, self.app.project.latest_traces_version, self.app.taces_views_change_id
+        )[row].name in changed
+
+    def __changes_summary(self, trace: Trace) -> str:
+        assert self.app.project is not None
+        lines = [f"Changed since version {self.app.project.latest_traces_version - 1}"]
+        prev = self.app.project.trace_summary(-2, trace.name)
+        latest = self.app.project.trace_summary(-1, trace.name)
+        if prev is not None and latest is not None:
+            fmt = lambda value: "N/A" if value is None else f"{value:g}"
+            for key in TracesFrameModel.SUMMARY_KEYS:
+                if prev.get(key) != latest.get(key):
+                    lines.append(f"{key}: {fmt(prev.get(key))} → {fmt(latest.get(key))}")
+        return "\n".join(lines)
+
     @override
     def data(self, index: QModelIndex | QPersistentModelIndex, role: int = 1) -> Any:
         if self.app.project is not None:
@@ -142,6 +177,22 @@ class TracesFrameModel(QAbstractTableModel):
                 d = self.__tdata(self.app.project.name, self.app.project.latest_traces_version,
                                  self.app.taces_views_change_id)[index.row()]
                 return TracesFrameModel.DERIVATIVE_TRACE_COLOR if d.is_derivative else None
+            elif role == Qt.ItemDataRole.BackgroundRole:
+                return TracesFrameModel.CHANGED_TRACE_BACKGROUND if self.is_changed(index.row()) else None
+            elif role == Qt.ItemDataRole.FontRole:
+                if self.is_changed(index.row()):
+                    font = QFont()
+                    font.setBold(True)
+                    return font
+                else:
+                    return None
+            elif role == Qt.ItemDataRole.ToolTipRole:
+                if self.is_changed(index.row()):
+                    return self.__changes_summary(self.__tdata(
+                        self.app.project.name, self.app.project.latest_traces_version, self.app.taces_views_change_id
+                    )[index.row()])
+                else:
+                    return None
             else:
                 return None
 
@@ -282,8 +333,9 @@ class TracesView(QTableView):
             traces_to_deactivate = [
                 self.app.project.traces(-1, TraceState.ACTIVE)[selected_row.row()] for selected_row in selection
             ]
-            for trace in traces_to_deactivate:
-                trace.state = TraceState.INACTIVE
+            with self.app.project.traces_config.batch():
+                for trace in traces_to_deactivate:
+                    trace.state = TraceState.INACTIVE
             self.app.notify_tables_require_change()
 
     def mark_as_active(self) -> None:
@@ -292,8 +344,9 @@ class TracesView(QTableView):
             traces_to_activate = [
                 self.app.project.traces(-1, TraceState.INACTIVE)[selected_row.row()] for selected_row in selection
             ]
-            for trace in traces_to_activate:
-                trace.state = TraceState.ACTIVE
+            with self.app.project.traces_config.batch():
+                for trace in traces_to_activate:
+                    trace.state = TraceState.ACTIVE
         self.app.notify_tables_require_change()
 
 
@@ -304,6 +357,9 @@ class TracesPanel(VBoxPanel):
         self.traces_view = TracesView(self, app, trace_state)
         self.traces_view.horizontalHeader().setSectionResizeMode(0, QHeaderView.ResizeMode.Stretch)
         self.traces_view.setSelectionMode(QAbstractItemView.SelectionMode.ExtendedSelection)
+        self.only_changed_checkbox = QCheckBox("Show only traces changed since the previous version")
+        self.only_changed_checkbox.toggled.connect(lambda _: self.filter_changed_traces())
+        self.layout().addWidget(self.only_changed_checkbox)
         self.layout().addWidget(self.traces_view)
         parent_change = app.notify_tables_require_change
 
@@ -311,9 +367,20 @@ class TracesPanel(VBoxPanel):
             self.app.taces_views_change_id += 1
             parent_change()
             self.traces_view.table_model.layoutChanged.emit()
+            self.filter_changed_traces()
             self.traces_view.resizeColumnsToContents()
             self.traces_view.clearSelection()
 
         app.notify_tables_require_change = notifier
 
         self.traces_view.doubleClicked.connect(self.traces_view.render_latest_trace)
+
+    def filter_changed_traces(self) -> None:
+        """
+        Hides rows of traces that did not change, if so requested. Rows are hidden rather than removed from the
+        model, so that row numbers keep matching positions of traces in the project.
+        """
+        model = self.traces_view.table_model
+        only_changed = self.only_changed_checkbox.isChecked()
+        for row in range(model.rowCount()):
+            self.traces_view.setRowHidden(row, only_changed and not model.is_changed(row))
@@ -21,12 +21,12 @@ class FilePicker(Panel[HBoxLayout]):
                 "last_opened_dir", f"{Path.home()}"
             )  # pyright: ignore [reportAssignmentType]
 
-            file_name, _ = QFileDialog.getOpenFileName(
-                self, caption = "Open CSV File", dir = last_opened_dir, filter = "*.csv"
+            file_names, _ = QFileDialog.getOpenFileNames(
+                self, caption = "Open CSV or VCD File(s)", dir = last_opened_dir, filter = "Traces (*.csv *.vcd)"
             )
-            if file_name != "":
-                self.__file_name_line_edit.setText(file_name)
-                app.state.set_value("last_opened_dir", f"{Path(file_name).parent.absolute()}")
+            if file_names != []:
+                self.__file_name_line_edit.setText("; ".join(file_names))
+                app.state.set_value("last_opened_dir", f"{Path(file_names[0]).parent.absolute()}")
 
         self.addWidget(QLabel(label))
         self.csv_file_dialog_button = PushButton(
@@ -37,8 +37,9 @@ class FilePicker(Panel[HBoxLayout]):
         self.addWidget(HBoxPanel([self.__file_name_line_edit, self.csv_file_dialog_button], spacing = 0, margins = 0))
         self.setMinimumWidth(500)
 
-    def file_name(self) -> str:
-        return self.__file_name_line_edit.text()
+    def file_names(self) -> list[str]:
+        """ More than one file can be picked, one per ILA core, in which case they are separated by ";" """
+        return [f.strip() for f in self.__file_name_line_edit.text().split(";") if f.strip() != ""]
 
 
 class CreateNewProject(Dialog):
@@ -46,32 +47,40 @@ class CreateNewProject(Dialog):
         super().__init__(parent, windowTitle = "Create New Project", modal = True)
 
         project_name_input = LineTextInput("Project Name")
-        file_picker = FilePicker("Traces CSV file", app)
+        file_picker = FilePicker("Traces CSV file(s) or VCD file", app)
+        vcd_clock_input = LineTextInput("VCD clock (optional)")
 
         def do_create_new_project():
             new_project_name = project_name_input.text()
-            cvs_file_name = file_picker.file_name()
+            cvs_file_names = file_picker.file_names()
+            missing_files = [f for f in cvs_file_names if not Path(f).exists()]
             if new_project_name.strip() == "":
                 app.show_error("Please enter a project name")
             elif new_project_name in app.pm.list_project_names():
                 app.show_error(f"Project named [{new_project_name}] already exists")
-            elif cvs_file_name.strip() == "":
+            elif cvs_file_names == []:
                 app.show_error("Please pick csv file that contains traces")
                 file_picker.csv_file_dialog_button.click()
-            elif not Path(cvs_file_name).exists():
-                app.show_error(f"File {cvs_file_name} does not exist")
+            elif missing_files != []:
+                app.show_error(f"File {missing_files[0]} does not exist")
+            elif len(cvs_file_names) > 1 and any(f.lower().endswith(".vcd") for f in cvs_file_names):
+                app.show_error("VCD file can not be combined with other files")
             else:
                 project = app.pm.create_new_project(new_project_name)
-                project.set_trace_source_from_csv_file(Path(cvs_file_name))
-                _, change_id = project.load_traces()
-                app.set_reference_change_id(change_id)
+                if cvs_file_names[0].lower().endswith(".vcd"):
+                    clock = vcd_clock_input.text().strip()
+                    project.set_trace_source_from_vcd_file(Path(cvs_file_names[0]), None if clock == "" else clock)
+                else:
+                    project.set_trace_source_from_csv_files([Path(f) for f in cvs_file_names])
                 app.set_new_open_project(project)
                 self.close()
+                app.load_traces_in_background()
 
         self.setLayout(VBoxLayout(
             widgets = [
                 project_name_input,
                 file_picker,
+                vcd_clock_input,
                 HBoxPanel([
                     W(HBoxPanel(), stretch = 1),
                     PushButton("Ok", on_clicked = do_create_new_project, auto_default = True),
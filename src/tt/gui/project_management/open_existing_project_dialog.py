@@ -10,14 +10,18 @@ from tt.gui.app import App
 
 
 class ProjectsTableModel(QAbstractTableModel):
+    COLUMNS = ["Project", "Versions", "Last Loaded", "Source"]
+
     def __init__(self, app: App):
         super().__init__()
-        self.project_names = app.pm.list_project_names()
+        # read from the registry of projects, so that project directories are not touched until one is opened
+        self.projects = app.pm.list_projects()
+        self.project_names = [p["name"] for p in self.projects]
 
     @override
     def headerData(self, section: int, orientation: Qt.Orientation, role = ...) -> Any:
         if role == Qt.ItemDataRole.DisplayRole and orientation == Qt.Orientation.Horizontal:
-            return ["Project"]
+            return ProjectsTableModel.COLUMNS[section]
         else:
             return None
 
@@ -27,12 +31,21 @@ class ProjectsTableModel(QAbstractTableModel):
 
     @override
     def columnCount(self, parent = ...) -> int:
-        return 1
+        return len(ProjectsTableModel.COLUMNS)
 
     @override
     def data(self, index, role = ...):
         if role == Qt.ItemDataRole.DisplayRole:
-            return self.project_names[index.row()]
+            project = self.projects[index.row()]
+            match index.column():
+                case 0:
+                    return project["name"]
+                case 1:
+                    return f"{project['versions']}"
+                case 2:
+                    return "" if project["last_ingest"] is None else project["last_ingest"].replace("T", " ")
+                case _:
+                    return "" if project["source"] == "Null" else project["source"]
         else:
             return None
 
@@ -42,13 +55,14 @@ class OpenProjectDialog(Dialog):
         super().__init__(parent, windowTitle = "Open Existing Project", modal = True)
 
         table_view = QTableView(self)
-        table_view.horizontalHeader().setVisible(False)
+        table_view.verticalHeader().setVisible(False)
         table_view.verticalScrollBar().setVisible(True)
         model = ProjectsTableModel(app)
         table_view.setModel(model)
         table_view.resizeColumnsToContents()
         table_view.setSelectionMode(QAbstractItemView.SelectionMode.SingleSelection)
-        table_view.horizontalHeader().setSectionResizeMode(0, QHeaderView.ResizeMode.Stretch)
+        table_view.setSelectionBehavior(QAbstractItemView.SelectionBehavior.SelectRows)
+        table_view.horizontalHeader().setSectionResizeMode(3, QHeaderView.ResizeMode.Stretch)
 
         def open_project_by_row(row: int):
             try:
@@ -78,4 +92,4 @@ class OpenProjectDialog(Dialog):
             ])
         ]))
 
-        self.setMinimumWidth(300)
+        self.setMinimumWidth(800)
@@ -227,6 +227,38 @@ class CreateNewTraceDialog(Dialog):
         self.panel_fourier.layout().addWidget(HBoxPanel([fourier_trace_label]))
         config_panel_layout.addWidget(self.panel_fourier)
 
+        ############### expression
+        self.panel_expression: Panel[QGridLayout] = Panel(QGridLayout())
+        self.panel_expression.setObjectName("Expression")
+        self.expression_input = LineTextInput("Expression", "", min_width = 300)
+
+        def insert_trace_into_expression(label: str):
+            name = label.strip()
+            quoted_name = name if name.isidentifier() else f"`{name}`"
+            self.expression_input.setText(f"{self.expression_input.text()}{quoted_name}")
+
+        self.panel_expression.layout().addWidget(self.expression_input, 0, 0)
+        self.panel_expression.layout().addWidget(
+            PushButton("Insert Trace", on_clicked = mk_show_trace_picker(self, app, insert_trace_into_expression)), 0, 1
+        )
+        self.panel_expression.layout().addWidget(QLabel(
+            "<em>i.e. <b>(a - b) * 0.5</b> or <b>`bus/data[15:0]` >> 8 & 0xff</b>; "
+            "operators + - * / // % ** & | ^ ~ << >> and comparisons, functions abs, sqrt, exp, log, sin, cos</em>"
+        ), 1, 0, 1, 2)
+        config_panel_layout.addWidget(self.panel_expression)
+
+        def mk_expression() -> Functions.Expression | None:
+            try:
+                function = Functions.Expression(project, self.expression_input.text())
+            except ValueError as ex:
+                app.show_error(f"{ex}")
+                return None
+            unknown = [name for name in function.source_traces if project.traces(-1, trace_name = name) == []]
+            if unknown != []:
+                app.show_error(f"Unknown traces in the expression: {', '.join(unknown)}")
+                return None
+            return function
+
         def set_function_name(name: str) -> None:
             match name:
                 case "Add":
@@ -241,6 +273,8 @@ class CreateNewTraceDialog(Dialog):
                     config_panel_layout.setCurrentIndex(4)
                 case "Fourier Transform":
                     config_panel_layout.setCurrentIndex(5)
+                case "Expression":
+                    config_panel_layout.setCurrentIndex(6)
 
         self.help_button = app.mk_help_tool_button()
 
@@ -323,6 +357,12 @@ class CreateNewTraceDialog(Dialog):
                         app.show_error("Please enter a valid frequency.")
                         return
 
+                case "Expression":
+                    function = mk_expression()
+                    if function is None:
+                        return
+                    project.update_derivative_trace(trace.name, function)
+
             self.close()
 
         def define_new_trace():
@@ -423,6 +463,14 @@ class CreateNewTraceDialog(Dialog):
                     app.notify_tables_require_change()
                     self.close()
 
+                case "Expression":
+                    function = mk_expression()
+                    if function is None:
+                        return
+                    project.add_derivative_trace(new_trace_name, function)
+                    app.notify_tables_require_change()
+                    self.close()
+
         header_title = "Create New Derivative Trace" if trace is None else "Edit Derivative Trace Definition"
 
         function_selector = ComboBox(items = Functions.NAMES, on_text_change = set_function_name, min_width = 150)
@@ -455,6 +503,9 @@ class CreateNewTraceDialog(Dialog):
                     trace_for_fourier(function.source_traces[0])
                     self.frequency_unit_selector.setCurrentText(function.params()["display_frequency_unit"])
 
+                case "expression":
+                    self.expression_input.setText(function.params()["expression"])
+
         self.setLayout(VBoxLayout([
             W(QLabel(header_title), stretch = 1, alignment = Qt.AlignmentFlag.AlignCenter),
             HLine(),
@@ -43,7 +43,7 @@ class PlotFigure(QWidget):
 
         v1 = QComboBox(self)
         v1.addItem("None")
-        v1.addItems([f"{v}" for v in reversed(range(1, app.project.latest_traces_version + 1))])
+        v1.addItems([f"{v}" for v in reversed(app.project.available_versions())])
 
         if trace_1 is not None:
             v1.setCurrentText(f"{trace_1.version}")
@@ -56,8 +56,8 @@ class PlotFigure(QWidget):
 
         v2 = QComboBox(self)
         v2.addItem("None")
-        v2.addItems([f"{v}" for v in reversed(range(1, app.project.latest_traces_version + 1))])
-        v2.setCurrentIndex(app.project.latest_traces_version - self.trace_2.version + 1)
+        v2.addItems([f"{v}" for v in reversed(app.project.available_versions())])
+        v2.setCurrentText(f"{self.trace_2.version}")
         v2.currentTextChanged.connect(self.set_v2_version)
         toolbar.addWidget(v2)
 
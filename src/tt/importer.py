@@ -0,0 +1,121 @@
+import argparse
+import multiprocessing
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+from tt.data.persistable import NoPersistence
+from tt.data.project import ProjectManager, Project
+from tt.data.trace_source import CSVFileTraceSource
+from tt.data.trace_store import TraceStore
+
+
+def encode_file(file: Path,
+                data_dir: Path,
+                blob_format: str,
+                signed_columns: list[str]) -> tuple[str, dict[str, list[str]]]:
+    """
+    Runs in a worker process. Parses csv file and writes its columns into blobs of the project store.
+    :return: change id of the file and blobs of each column, see TraceStore.write_blobs(...)
+    """
+    source = CSVFileTraceSource(file = file, persistence = NoPersistence(), signed_columns = signed_columns)
+    source_id = source.change_id(live = True)
+    return source_id, TraceStore(data_dir, blob_format).write_blobs(
+        source.scan_data(), dtypes = source.column_dtypes()
+    )
+
+
+def list_files(paths: list[Path], order: str) -> list[Path]:
+    """
+    :return: given csv files and csv files found in given directories, in the order they should be imported.
+    """
+    files = []
+    for path in paths:
+        if path.is_dir():
+            files.extend(f for f in path.glob("*.csv") if f.is_file())
+        elif path.exists():
+            files.append(path)
+        else:
+            raise ValueError(f"File {path} does not exist")
+
+    match order:
+        case "mtime":
+            return sorted(files, key = lambda f: (f.stat().st_mtime, f.name))
+        case "name":
+            return sorted(files, key = lambda f: f.name)
+        case _:
+            raise ValueError(f"Unsupported order: {order}")
+
+
+def import_files(project: Project, files: list[Path], workers: int, signed_columns: list[str]) -> None:
+    """
+    Imports each file as a new version of traces in the project. Files are parsed and encoded in parallel by
+    worker processes while versions are recorded here, one at a time, in the order of files.
+    """
+    # spawn rather than fork, since polars thread pool does not survive fork
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers = workers, mp_context = context) as executor:
+        results = executor.map(
+            encode_file,
+            files,
+            [project.store.data_dir] * len(files),
+            [project.store.blob_format] * len(files),
+            [signed_columns] * len(files)
+        )
+        for i, (file, (source_id, columns)) in enumerate(zip(files, results)):
+            version = project.import_version(source_id, columns)
+            print(f"[{i + 1}/{len(files)}] {file} -> Traces Version #{version}", flush = True)
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(
+        prog = "tt import",
+        description = "Import csv files with ILA traces into a project, one version per file."
+    )
+    parser.add_argument("project", help = "name of the project; it is created if it does not exist")
+    parser.add_argument("paths", nargs = "+", type = Path, help = "csv files or directories with csv files")
+    parser.add_argument(
+        "--order", choices = ["mtime", "name"], default = "mtime",
+        help = "order in which files become versions; by modification time (default) or by file name"
+    )
+    parser.add_argument(
+        "--workers", type = int, default = os.cpu_count() or 1, help = "number of worker processes"
+    )
+    parser.add_argument(
+        "--signed-columns", nargs = "*", default = None,
+        help = "columns holding signed buses; defaults to those configured for the project trace source"
+    )
+    args = parser.parse_args(argv)
+
+    try:
+        files = list_files(args.paths, args.order)
+        if files == []:
+            raise ValueError("No csv files to import")
+
+        pm = ProjectManager(Path.home() / ".tt" / "projects")
+        if args.project in pm.list_project_names():
+            project = pm.open_existing_project(args.project)
+        else:
+            project = pm.create_new_project(args.project)
+
+        signed_columns = args.signed_columns
+        if signed_columns is None:
+            signed_columns = getattr(project.trace_source, "signed_columns", [])
+
+        import_files(project, files, args.workers, signed_columns)
+        if project.retention.automatic:
+            print("Compacting project", flush = True)
+            project.compact()
+
+        if project.trace_source.is_null_trace_source():
+            # keep tracking the most recent file
+            project.set_trace_source_from_csv_file(files[-1])
+        return 0
+    except Exception as ex:
+        print(f"Error importing traces. {ex}", file = sys.stderr)
+        return 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,147 @@
+from pathlib import Path
+
+import pytest
+
+# project modules import GUI widgets of traces
+pytest.importorskip("pytide6")
+
+from tt.data.project import ProjectManager, Project
+from tt.data.trace_source import CSVFileTraceSource
+from tt.importer import encode_file
+
+
+def mk_project(tmp_path: Path, csv_file: Path) -> Project:
+    project = ProjectManager(tmp_path / "projects").create_new_project("test")
+    project.set_trace_source_from_csv_file(csv_file)
+    return project
+
+
+def column(project: Project, version: int, name: str) -> list:
+    return project.store.column(version, name).to_list()
+
+
+def test_appended_rows_are_stored_as_new_version_referring_to_previous_one(tmp_path):
+    csv_file = tmp_path / "traces.csv"
+    csv_file.write_text("Sample in Buffer,a\n0,1\n1,1\n2,1\n")
+    project = mk_project(tmp_path, csv_file)
+    assert project.load_traces()[0]
+
+    with csv_file.open("a") as f:
+        f.write("3,2\n")
+    assert project.load_traces()[0]
+
+    assert project.latest_traces_version == 2
+    assert project.store.manifest(2)["appended_to"] == 1
+    assert column(project, 2, "a") == [1, 1, 1, 2]
+    assert column(project, 1, "a") == [1, 1, 1]
+
+
+def test_partially_written_last_line_is_left_for_the_next_load(tmp_path):
+    csv_file = tmp_path / "traces.csv"
+    csv_file.write_text("Sample in Buffer,a\n0,1\n1,1\n")
+    project = mk_project(tmp_path, csv_file)
+    project.load_traces()
+
+    with csv_file.open("a") as f:
+        f.write("2,2\n3,")
+    assert project.load_traces()[0]
+    assert column(project, 2, "a") == [1, 1, 2]
+
+    with csv_file.open("a") as f:
+        f.write("3\n")
+    assert project.load_traces()[0]
+    assert project.store.manifest(3)["appended_to"] == 2
+    assert column(project, 3, "a") == [1, 1, 2, 3]
+
+
+def test_rows_are_not_appended_to_imported_version(tmp_path):
+    csv_file = tmp_path / "traces.csv"
+    csv_file.write_text("Sample in Buffer,a\n0,1\n1,1\n2,1\n")
+    other_file = tmp_path / "other.csv"
+    other_file.write_text("Sample in Buffer,a\n0,9\n1,9\n2,9\n3,9\n4,9\n5,9\n")
+    project = mk_project(tmp_path, csv_file)
+    project.load_traces()
+    project.import_version(*encode_file(other_file, project.store.data_dir, project.store.blob_format, []))
+
+    with csv_file.open("a") as f:
+        f.write("3,2\n")
+    assert project.load_traces()[0]
+
+    assert project.latest_traces_version == 3
+    assert "appended_to" not in project.store.manifest(3)
+    assert column(project, 3, "a") == [1, 1, 1, 2]
+
+
+def test_rewritten_file_is_loaded_in_full(tmp_path):
+    csv_file = tmp_path / "traces.csv"
+    csv_file.write_text("Sample in Buffer,a\n0,1\n1,1\n")
+    project = mk_project(tmp_path, csv_file)
+    project.load_traces()
+
+    csv_file.write_text("Sample in Buffer,a\n0,5\n1,5\n2,5\n")
+    assert project.load_traces()[0]
+    assert "appended_to" not in project.store.manifest(2)
+    assert column(project, 2, "a") == [5, 5, 5]
+
+
+def test_unchanged_file_is_not_loaded_again(tmp_path):
+    csv_file = tmp_path / "traces.csv"
+    csv_file.write_text("Sample in Buffer,a\n0,1\n")
+    project = mk_project(tmp_path, csv_file)
+    project.load_traces()
+
+    assert not project.load_traces()[0]
+    assert project.latest_traces_version == 1
+
+
+def test_blank_lines_are_not_samples(tmp_path):
+    csv_file = tmp_path / "traces.csv"
+    csv_file.write_text("Sample in Buffer,a\n0,1\n\n1,2\n\n")
+    project = mk_project(tmp_path, csv_file)
+    project.load_traces()
+    assert column(project, 1, "a") == [1, 2]
+
+    with csv_file.open("a") as f:
+        f.write("2,3\n\n")
+    assert project.load_traces()[0]
+    assert project.store.manifest(2)["appended_to"] == 1
+    assert column(project, 2, "a") == [1, 2, 3]
+
+
+def test_file_is_loaded_in_full_if_appended_values_are_wider_than_stored_ones(tmp_path):
+    csv_file = tmp_path / "traces.csv"
+    csv_file.write_text("Sample in Buffer,a[7:0]\nRadix - UNSIGNED,UNSIGNED\n0,1\n")
+    project = mk_project(tmp_path, csv_file)
+    project.load_traces()
+
+    with csv_file.open("a") as f:
+        f.write("1,300\n")
+    assert project.load_traces()[0]
+    assert "appended_to" not in project.store.manifest(2)
+    assert column(project, 2, "a[7:0]") == [1, 300]
+
+
+def test_unchanged_files_of_multiple_csv_files_are_taken_from_previous_version(tmp_path, monkeypatch):
+    a_file, b_file = tmp_path / "a.csv", tmp_path / "b.csv"
+    a_file.write_text("Sample in Buffer,x,TRIGGER\n0,1,0\n1,2,1\n")
+    b_file.write_text("Sample in Buffer,y,TRIGGER\n1,10,0\n2,20,0\n")
+    manager = ProjectManager(tmp_path / "projects")
+    project = manager.create_new_project("test")
+    project.set_trace_source_from_csv_files([a_file, b_file])
+    project.load_traces()
+    assert column(project, 1, "TRIGGER [b]") == [None, 0, 0]
+
+    scanned = []
+    scan_data = CSVFileTraceSource.scan_data
+    monkeypatch.setattr(CSVFileTraceSource, "scan_data", lambda self: scanned.append(self.file) or scan_data(self))
+    b_file.write_text("Sample in Buffer,y,TRIGGER\n1,10,0\n2,30,0\n3,40,1\n")
+    # parts of the source are found in the store, not in memory
+    project = manager.open_existing_project("test")
+    assert project.load_traces()[0]
+
+    assert scanned == [b_file]
+    assert column(project, 2, "Sample in Buffer") == [0, 1, 2, 3]
+    assert column(project, 2, "x") == [1, 2, None, None]
+    assert column(project, 2, "TRIGGER") == [0, 1, None, None]
+    assert column(project, 2, "y") == [None, 10, 30, 40]
+    assert column(project, 2, "TRIGGER [b]") == [None, 0, 0, 1]
@@ -0,0 +1,36 @@
+import polars as pl
+
+from tt.data.chipscope import narrow
+from tt.data.persistable import NoPersistence
+from tt.data.trace_source import CSVFileTraceSource
+from tt.data.trace_store import TraceStore
+
+# example of site/docs/chipscope_file_format.md
+CSV = """Sample in Buffer,Sample in Window,TRIGGER,aCore/Gen/foo[15:0],aCore/Gen/xyz[15:0]
+Radix - UNSIGNED,UNSIGNED,UNSIGNED,SIGNED,HEX
+0,0,0,83,39417
+1,1,0,96,394A7
+2,2,0,102,39410
+"""
+
+
+def test_values_wider_than_bus_are_stored_in_wider_dtype(tmp_path):
+    csv_file = tmp_path / "traces.csv"
+    csv_file.write_text(CSV)
+    source = CSVFileTraceSource(file = csv_file, persistence = NoPersistence())
+    store = TraceStore(tmp_path / "data")
+    store.stage(1)
+    store.write_version(1, source.scan_data(), source.change_id(live = True), dtypes = source.column_dtypes())
+    store.publish(1)
+
+    assert store.column(1, "aCore/Gen/foo[15:0]").dtype == pl.Int16
+    assert store.column(1, "aCore/Gen/foo[15:0]").to_list() == [83, 96, 102]
+    assert store.column(1, "aCore/Gen/xyz[15:0]").dtype == pl.UInt32
+    assert store.column(1, "aCore/Gen/xyz[15:0]").to_list() == [0x39417, 0x394A7, 0x39410]
+
+
+def test_values_are_narrowed_to_dtype_of_the_bus_if_they_fit():
+    assert narrow(pl.Series([0, 1, None]), pl.Boolean).to_list() == [False, True, None]
+    assert narrow(pl.Series([0, 2]), pl.Boolean).dtype == pl.UInt8
+    assert narrow(pl.Series([-1, 300]), pl.UInt8).dtype == pl.Int16
+    assert narrow(pl.Series([1, 300]), pl.UInt32).dtype == pl.UInt32
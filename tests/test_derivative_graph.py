@@ -0,0 +1,104 @@
+import math
+from pathlib import Path
+
+import numpy as np
+import polars as pl
+import pytest
+
+# project modules import GUI widgets of traces
+pytest.importorskip("pytide6")
+
+from tt.data.derivative_graph import DerivativeGraph
+from tt.data.function import Functions
+from tt.data.project import ProjectManager, Project
+from tt.data.punits import Frequency, FrequencyUnit
+
+
+def mk_project(tmp_path: Path) -> Project:
+    csv_file = tmp_path / "traces.csv"
+    csv_file.write_text(
+        "Sample in Buffer,a\n" + "".join(f"{i},{round(100 * math.sin(i / 3)) + (i % 5)}\n" for i in range(64))
+    )
+    project = ProjectManager(tmp_path / "projects").create_new_project("test")
+    project.set_trace_source_from_csv_file(csv_file)
+    project.load_traces()
+    project.implied_dt = 1.0
+    project.dt_unit = "ms"
+    project.add_derivative_trace("fft", Functions.FourierTransform(
+        project, ["a"],
+        frequency_min = Frequency.value_of("0 Hz"),
+        frequency_max = None,
+        display_frequency_unit = FrequencyUnit.Hz
+    ))
+    project.add_derivative_trace("lowpass", Functions.LowpassFilter(project, ["a"], Frequency.value_of("100 Hz")))
+    return project
+
+
+def xy(project: Project, trace_name: str) -> tuple[np.ndarray, np.ndarray]:
+    return project.traces(version = 1, trace_name = trace_name)[0].xy(project)
+
+
+def test_values_are_computed_again_when_unit_of_sampling_period_changes(tmp_path):
+    project = mk_project(tmp_path)
+    fft_x, _ = xy(project, "fft")
+    _, lowpass_y = xy(project, "lowpass")
+
+    project.dt_unit = "us"
+    assert np.allclose(xy(project, "fft")[0], fft_x * 1000)
+    assert not np.allclose(xy(project, "lowpass")[1], lowpass_y)
+
+
+def test_values_written_to_disk_are_read_back_only_under_the_same_key(tmp_path):
+    project = mk_project(tmp_path)
+    fft_x, fft_y = xy(project, "fft")
+
+    reopened = ProjectManager(tmp_path / "projects").open_existing_project("test")
+    assert np.array_equal(xy(reopened, "fft")[1], fft_y)
+
+    reopened.dt_unit = "us"
+    reopened = ProjectManager(tmp_path / "projects").open_existing_project("test")
+    assert np.allclose(xy(reopened, "fft")[0], fft_x * 1000)
+
+
+def test_values_written_under_keys_of_earlier_releases_are_not_read(tmp_path, monkeypatch):
+    from tt.data.derivative_graph import DerivativeGraph
+
+    project = mk_project(tmp_path)
+    fft_x, _ = xy(project, "fft")
+    monkeypatch.setattr(DerivativeGraph, "KEY_VERSION", DerivativeGraph.KEY_VERSION - 1)
+    fft = project.traces(version = 1, trace_name = "fft")[0]
+    old_key = project.traces_config.derivatives.keys(project.traces_config.derivatives.order(fft))["fft"]
+    project.store.write_derived(1, old_key, pl.Series([2.5, 5.0]), pl.Series([0.5, 0.5]))
+    monkeypatch.undo()
+
+    reopened = ProjectManager(tmp_path / "projects").open_existing_project("test")
+    assert np.array_equal(xy(reopened, "fft")[0], fft_x)
+
+
+def test_statistics_leave_out_missing_samples(tmp_path):
+    csv_file = tmp_path / "gaps.csv"
+    csv_file.write_text("Sample in Buffer,a\n0,1\n1,\n2,5\n")
+    project = ProjectManager(tmp_path / "projects").create_new_project("gaps")
+    project.set_trace_source_from_csv_file(csv_file)
+    project.load_traces()
+    stats = {f: project.apply_stat_function(f, "a", 1, "") for f in ["min", "max", "range", "mean", "stdev"]}
+    assert stats == {"min": 1.0, "max": 5.0, "range": 4.0, "mean": 3.0, "stdev": 2.0}
+
+
+def test_traces_of_same_length_share_x_values(tmp_path):
+    project = mk_project(tmp_path)
+    x, _ = xy(project, "a")
+    assert xy(project, "lowpass")[0] is x
+    assert not x.flags.writeable
+
+
+def test_least_recently_used_values_are_dropped_beyond_size_limit(tmp_path, monkeypatch):
+    project = mk_project(tmp_path)
+    _, y = xy(project, "a")
+    assert xy(project, "a")[1] is y
+
+    # values of a trace alone take more than that, so only the last computed ones are kept
+    monkeypatch.setattr(DerivativeGraph, "VALUES_BYTES", 1)
+    _, fft = xy(project, "fft")
+    assert xy(project, "fft")[1] is fft
+    assert xy(project, "a")[1] is not y
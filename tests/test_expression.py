@@ -0,0 +1,54 @@
+from pathlib import Path
+
+import pytest
+
+from tt.data.expression import TraceExpression
+
+
+def test_trace_names_are_collected_once():
+    assert sorted(TraceExpression("(a - `b[7:0]`) * 0.5 + a >> 3").trace_names) == ["a", "b[7:0]"]
+
+
+def test_placeholder_names_are_reserved():
+    with pytest.raises(ValueError):
+        TraceExpression("__trace_0 + 1")
+    with pytest.raises(ValueError):
+        TraceExpression("`a` + __trace_0")
+    assert TraceExpression("`__trace_0` + a__trace_0").trace_names == ["__trace_0", "a__trace_0"]
+
+
+@pytest.fixture
+def project(tmp_path: Path):
+    # project modules import GUI widgets of traces
+    pytest.importorskip("pytide6")
+    from tt.data.project import ProjectManager
+
+    csv_file = tmp_path / "traces.csv"
+    csv_file.write_text(
+        "Sample in Buffer,bus[7:0],a[0:0],b[0:0]\n"
+        "Radix - UNSIGNED,UNSIGNED,UNSIGNED,UNSIGNED\n"
+        "0,250,1,0\n"
+        "1,3,1,1\n"
+    )
+    project = ProjectManager(tmp_path / "projects").create_new_project("test")
+    project.set_trace_source_from_csv_file(csv_file)
+    project.load_traces()
+    return project
+
+
+@pytest.mark.parametrize("expression, expected", [
+    ("`bus[7:0]` * 10", [2500, 30]),
+    ("`bus[7:0]` + `bus[7:0]`", [500, 6]),
+    ("`bus[7:0]` - 100", [150, -97]),
+    ("-`bus[7:0]`", [-250, -3]),
+    ("~`bus[7:0]`", [-251, -4]),
+    ("`bus[7:0]` >> 1", [125, 1]),
+    ("`a[0:0]` - `b[0:0]`", [1, 0]),
+    ("`a[0:0]` ^ 1", [0, 0]),
+])
+def test_integer_traces_do_not_wrap_around(project, expression, expected):
+    from tt.data.function import Functions
+
+    assert project.store.column(1, "bus[7:0]").dtype.is_integer()
+    _, y = Functions.Expression(project, expression).xy(1)
+    assert y.tolist() == expected
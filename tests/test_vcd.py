@@ -0,0 +1,51 @@
+from pathlib import Path
+
+import pytest
+
+from tt.data import vcd
+from tt.data.trace_store import IngestCancelled
+from tt.data.vcd import read_vcd, sample_vcd
+
+VCD = """$timescale 1ns $end
+$scope module top $end
+$var wire 1 ! clk $end
+$var wire 4 " bus $end
+$var real 64 # temp $end
+$upscope $end
+$enddefinitions $end
+#0
+0!
+b1111 "
+r1.5 #
+#1
+1!
+#2
+0!
+b0011 "
+r-2.25 #
+"""
+
+
+def mk_vcd(tmp_path: Path) -> Path:
+    file = tmp_path / "trace.vcd"
+    file.write_text(VCD)
+    return file
+
+
+def test_columns_are_read_one_at_a_time(tmp_path):
+    columns = sample_vcd(mk_vcd(tmp_path), signed_columns = ["top/bus[3:0]"])
+    assert [name for name, _ in columns] == [vcd.SAMPLE_COLUMN, "top/clk", "top/bus[3:0]", "top/temp"]
+    assert dict(columns)["top/bus[3:0]"]().to_list() == [-1, -1, 3]
+    assert read_vcd(mk_vcd(tmp_path)).get_column("top/clk").to_list() == [0, 1, 0]
+
+
+def test_reading_is_cancelled(tmp_path, monkeypatch):
+    monkeypatch.setattr(vcd, "CANCEL_CHECK_INTERVAL", 1)
+    with pytest.raises(IngestCancelled):
+        sample_vcd(mk_vcd(tmp_path), cancelled = lambda: True)
+
+
+def test_real_variables_are_not_buses(tmp_path):
+    df = read_vcd(mk_vcd(tmp_path))
+    assert "top/temp[63:0]" not in df.columns
+    assert df.get_column("top/temp").to_list() == [1.5, 1.5, -2.25]